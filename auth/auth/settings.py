@@ -14,6 +14,8 @@ import os
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,7 +51,7 @@ AUTH_USER_MODEL = "auth_model.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "auth_model.authentication.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
@@ -122,11 +124,19 @@ CORS_ALLOW_HEADERS = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Shared by every service; a missing key must not fall back to this service's SECRET_KEY,
+# or tokens issued by auth_service would silently fail to verify here.
+JWT_SIGNING_KEY = os.environ.get("JWT_SIGNING_KEY")
+if not JWT_SIGNING_KEY:
+    raise ImproperlyConfigured("JWT_SIGNING_KEY must be set, to the same value in every service")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),      # access token valid 1 day
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),     # refresh token valid 7 days (adjust as needed)
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
+    # shared with the other services, which verify tokens without calling auth_service
+    "SIGNING_KEY": JWT_SIGNING_KEY,
 }
 
 # Password validation
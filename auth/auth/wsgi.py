@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth.settings')
 
 application = get_wsgi_application()
+
+# Deliver outbox entries (patient provisioning) from each serving process.
+# Set AUTH_OUTBOX_DISPATCHER=0 when `manage.py dispatch_outbox` runs separately.
+if os.environ.get('AUTH_OUTBOX_DISPATCHER', '1') == '1':
+    from auth_model.outbox import dispatcher
+
+    dispatcher.start()
@@ -0,0 +1,51 @@
+"""Parsing and password hashing for ``BulkCreateAccountView``.
+
+Hashing is the expensive part of creating an account (PBKDF2 with Django's
+default iteration count takes a good fraction of a second). ``hashlib``
+releases the GIL while it runs, so ``hash_passwords`` spreads a batch over a
+thread pool and the batch takes about ``rows / cpu_count`` hash times.
+"""
+import codecs
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", os.cpu_count() or 1))
+CSV_FIELDS = ("email", "full_name", "password", "role")
+
+
+def read_csv(stream, encoding="utf-8"):
+    """Rows of a CSV with a header line (``email,full_name,password,role``) as dicts."""
+    text = codecs.getreader(encoding)(stream) if not isinstance(stream, io.TextIOBase) else stream
+    try:
+        reader = csv.DictReader(text)
+        missing = {"email", "full_name", "password"} - set(reader.fieldnames or ())
+        if missing:
+            raise ParseError(f"CSV header is missing: {', '.join(sorted(missing))}")
+        return [
+            {key: row[key] if key == "password" else row[key].strip() for key in CSV_FIELDS if row.get(key)}
+            for row in reader
+        ]
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ParseError(f"Invalid CSV: {exc}")
+
+
+class CSVParser(BaseParser):
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        return read_csv(stream, encoding)
+
+
+def hash_passwords(passwords):
+    """``make_password`` for each password, in order, on ``HASH_WORKERS`` threads."""
+    if len(passwords) < 2 or HASH_WORKERS < 2:
+        return [make_password(p) for p in passwords]
+    with ThreadPoolExecutor(min(HASH_WORKERS, len(passwords)), thread_name_prefix="hash") as pool:
+        return list(pool.map(make_password, passwords))
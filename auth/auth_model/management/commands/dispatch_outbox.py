@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from auth_model.outbox import dispatcher
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox entries (runs until interrupted unless --once is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Deliver what is due now and exit.")
+
+    def handle(self, *args, once=False, **options):
+        if not once:
+            dispatcher.run_forever()
+        total = 0
+        while True:
+            claimed = dispatcher.dispatch_once()
+            total += claimed
+            if claimed < dispatcher.batch_size:
+                break
+        self.stdout.write(f"Processed {total} outbox entries")
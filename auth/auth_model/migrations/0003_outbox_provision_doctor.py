@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_model', '0002_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxentry',
+            name='topic',
+            field=models.CharField(choices=[('provision_patient', 'Provision patient'), ('provision_doctor', 'Provision doctor')], max_length=32),
+        ),
+    ]
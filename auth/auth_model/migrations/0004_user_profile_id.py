@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_model', '0003_outbox_provision_doctor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # auth_service/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 
 class UserManager(BaseUserManager):
@@ -30,6 +31,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # id của record Patient/Doctor tương ứng (theo role) ở patient_service/doctor_service;
+    # outbox dispatcher ghi lại khi provisioning thành công
+    profile_id = models.PositiveIntegerField(null=True, blank=True)
 
     objects = UserManager()
 
@@ -38,3 +42,67 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+    def profile_ids(self):
+        """``{"patient_id": ...}`` or ``{"doctor_id": ...}`` by role (``None`` until provisioned)."""
+        if self.role in ("patient", "doctor"):
+            return {f"{self.role}_id": self.profile_id}
+        return {}
+
+
+class OutboxEntry(models.Model):
+    """A downstream call recorded in the same transaction as the change that needs it.
+
+    ``outbox.OutboxDispatcher`` delivers pending entries in the background; the
+    idempotency key travels with every attempt so a retried delivery does not
+    create a second record downstream.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DELIVERED, 'Delivered'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    TOPIC_PROVISION_PATIENT = 'provision_patient'
+    TOPIC_PROVISION_DOCTOR = 'provision_doctor'
+    TOPIC_CHOICES = (
+        (TOPIC_PROVISION_PATIENT, 'Provision patient'),
+        (TOPIC_PROVISION_DOCTOR, 'Provision doctor'),
+    )
+
+    topic = models.CharField(max_length=32, choices=TOPIC_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outbox_entries')
+    payload = models.JSONField()
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.topic} {self.idempotency_key} ({self.status})"
+
+
+class RevokedToken(models.Model):
+    """A JWT (by ``jti``) that must no longer be accepted, e.g. after logout.
+
+    Rows are only needed until ``expires_at``; after that the token is rejected
+    for being expired anyway. Services sync the ``id`` order into their Bloom
+    filters, so ``id`` doubles as the sync cursor.
+    """
+    jti = models.CharField(max_length=64, unique=True)
+    user_id = models.BigIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
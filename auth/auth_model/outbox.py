@@ -0,0 +1,198 @@
+"""Background delivery of ``OutboxEntry`` rows to the other services.
+
+A view writes its own rows and the outbox entries in one transaction (see
+``enqueue`` and ``build_entry``), so either both exist or neither does, and
+returns without calling anyone. ``OutboxDispatcher`` then claims due entries
+and posts them, one request per topic, to that service's batch endpoint
+(``{"records": [...]}``, each record carrying its ``idempotency_key``). The
+services key their records on ``user_id``, so a redelivered entry returns the
+existing record instead of creating another. Connection errors, 429 and 5xx
+retry the whole batch with exponential backoff; a record the service rejects
+marks only its own entry failed.
+
+Entries are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased by
+pushing ``next_attempt_at`` forward, so several workers (or the
+``dispatch_outbox`` command) can run dispatchers side by side without
+delivering the same entry twice at once, and an entry whose worker died is
+picked up again when its lease runs out.
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+import requests
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEntry
+
+PATIENT_SERVICE_URL = "http://patient_service:8000/api/patient/"  # endpoint tạo patient
+DOCTOR_SERVICE_URL = "http://doctor_service:8000/api/doctor/"
+
+TOPIC_URLS = {
+    OutboxEntry.TOPIC_PROVISION_PATIENT: PATIENT_SERVICE_URL + "batch/",
+    OutboxEntry.TOPIC_PROVISION_DOCTOR: DOCTOR_SERVICE_URL + "batch/",
+}
+
+BATCH_SIZE = 100
+POLL_INTERVAL = 5  # seconds between scans when nothing wakes the dispatcher
+LEASE = 60  # seconds an entry stays claimed by one dispatcher
+MAX_ATTEMPTS = 10
+BACKOFF_BASE = 2  # seconds
+BACKOFF_MAX = 15 * 60  # seconds
+TIMEOUT = 10  # seconds per request
+
+logger = logging.getLogger(__name__)
+
+
+def build_entry(topic, user, payload):
+    """An unsaved entry for ``payload``, e.g. for ``bulk_create``."""
+    return OutboxEntry(topic=topic, user=user, payload=payload, idempotency_key=f"{topic}-{user.pk}")
+
+
+def enqueue(topic, user, payload):
+    """Record ``payload`` for delivery; call inside the transaction that created ``user``."""
+    entry = build_entry(topic, user, payload)
+    entry.save()
+    return entry
+
+
+class OutboxDispatcher:
+    def __init__(self, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, lease=LEASE,
+                 max_attempts=MAX_ATTEMPTS, timeout=TIMEOUT):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Run the dispatcher in a daemon thread of this process (once per process)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._wakeup = threading.Event()
+                self._thread = threading.Thread(target=self.run_forever, name='outbox-dispatcher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def wake(self):
+        """Deliver new entries now instead of at the next poll (a no-op if not started here)."""
+        self._wakeup.set()
+
+    def run_forever(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                while self.dispatch_once() == self.batch_size:
+                    pass
+            except Exception:
+                # Typically the database being unreachable; try again at the next poll.
+                logger.exception("outbox dispatch failed")
+
+    def dispatch_once(self):
+        """Claim and deliver one batch of due entries; returns how many were claimed."""
+        entries = self._claim()
+        by_topic = {}
+        for entry in entries:
+            by_topic.setdefault(entry.topic, []).append(entry)
+        for topic, batch in by_topic.items():
+            self._deliver(topic, batch)
+        return len(entries)
+
+    def _claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            entries = list(
+                OutboxEntry.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEntry.STATUS_PENDING, next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:self.batch_size]
+            )
+            if entries:
+                OutboxEntry.objects.filter(pk__in=[e.pk for e in entries]).update(
+                    next_attempt_at=now + timedelta(seconds=self.lease))
+        return entries
+
+    def _deliver(self, topic, entries):
+        records = [{**entry.payload, "idempotency_key": entry.idempotency_key} for entry in entries]
+        for entry in entries:
+            entry.attempts += 1
+        try:
+            resp = requests.post(
+                TOPIC_URLS[topic],
+                json={"records": records},
+                headers={"Host": "localhost"},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as exc:
+            self._retry(entries, str(exc))
+            return
+        if resp.status_code == 429 or resp.status_code >= 500:
+            self._retry(entries, f"HTTP {resp.status_code}: {resp.text[:500]}")
+            return
+        if resp.status_code != 200:
+            self._fail(entries, f"HTTP {resp.status_code}: {resp.text[:500]}")
+            return
+        try:
+            results = resp.json()["results"]
+        except (ValueError, KeyError, TypeError):
+            results = None
+        if (not isinstance(results, list) or len(results) != len(entries)
+                or not all(isinstance(result, dict) for result in results)):
+            self._retry(entries, f"Unexpected response: {resp.text[:500]}")
+            return
+
+        now = timezone.now()
+        failed = []
+        for entry, result in zip(entries, results):
+            if result.get("status") in ("created", "existing"):
+                entry.status = OutboxEntry.STATUS_DELIVERED
+                entry.response = result.get("record")
+                entry.delivered_at = now
+                entry.last_error = ""
+            else:
+                entry.status = OutboxEntry.STATUS_FAILED
+                entry.last_error = str(result.get("errors", result))[:2000]
+                failed.append(entry)
+        OutboxEntry.objects.bulk_update(entries, ['status', 'attempts', 'response', 'delivered_at', 'last_error'])
+        profiles = {
+            entry.user_id: entry.response["id"] for entry in entries
+            if entry.status == OutboxEntry.STATUS_DELIVERED and isinstance(entry.response, dict)
+            and isinstance(entry.response.get("id"), int)
+        }
+        if profiles:
+            from .profiles import remember  # profiles imports the service URLs from here
+            remember(profiles)
+        if failed:
+            logger.error("%s rejected %d outbox entries, e.g. %s: %s",
+                         topic, len(failed), failed[0].idempotency_key, failed[0].last_error)
+
+    def _retry(self, entries, error):
+        for entry in entries:
+            entry.last_error = error
+            if entry.attempts >= self.max_attempts:
+                entry.status = OutboxEntry.STATUS_FAILED
+            else:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (entry.attempts - 1))
+                entry.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        OutboxEntry.objects.bulk_update(entries, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+        given_up = sum(entry.status == OutboxEntry.STATUS_FAILED for entry in entries)
+        if given_up:
+            logger.error("%d outbox entries failed after %d attempts: %s", given_up, self.max_attempts, error)
+
+    def _fail(self, entries, error):
+        for entry in entries:
+            entry.status = OutboxEntry.STATUS_FAILED
+            entry.last_error = error
+        OutboxEntry.objects.bulk_update(entries, ['status', 'attempts', 'last_error'])
+        logger.error("%d outbox entries rejected: %s", len(entries), error)
+
+dispatcher = OutboxDispatcher()
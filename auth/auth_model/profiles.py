@@ -0,0 +1,50 @@
+"""The ``User.profile_id`` mapping to patient_service / doctor_service records.
+
+The outbox dispatcher fills it in when provisioning succeeds, so a login
+normally finds it on the user row it has already loaded. Users provisioned
+some other way (accounts created before the outbox, records added by hand)
+are looked up once, at login, and the id is stored for next time.
+"""
+import logging
+
+import requests
+
+from .models import User
+from .outbox import DOCTOR_SERVICE_URL, PATIENT_SERVICE_URL
+
+PROFILE_URLS = {
+    "patient": PATIENT_SERVICE_URL + "user/{}/",
+    "doctor": DOCTOR_SERVICE_URL + "user/{}/",
+}
+LOOKUP_TIMEOUT = 2  # seconds; login goes ahead without the id if this fails
+
+logger = logging.getLogger(__name__)
+
+
+def remember(user_ids_to_profiles):
+    """Store ``{user_id: profile_id}`` (called when provisioning is delivered)."""
+    User.objects.bulk_update(
+        [User(pk=user_id, profile_id=profile_id) for user_id, profile_id in user_ids_to_profiles.items()],
+        ["profile_id"],
+    )
+
+
+def ensure_profile_id(user):
+    """Fill in ``user.profile_id`` from the downstream service if it is still unknown."""
+    if user.profile_id is not None or user.role not in PROFILE_URLS:
+        return user.profile_id
+    try:
+        resp = requests.get(PROFILE_URLS[user.role].format(user.pk), headers={"Host": "localhost"},
+                            timeout=LOOKUP_TIMEOUT)
+    except requests.RequestException as exc:
+        logger.warning("could not look up %s profile of user %s: %s", user.role, user.pk, exc)
+        return None
+    if resp.status_code != 200:
+        return None  # chưa provision xong (404) hoặc service lỗi
+    try:
+        profile_id = resp.json()["id"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    user.profile_id = profile_id
+    User.objects.filter(pk=user.pk).update(profile_id=profile_id)
+    return profile_id
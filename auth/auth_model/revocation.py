@@ -0,0 +1,187 @@
+"""Revoked-token check with an in-memory Bloom filter in front of the ``RevokedToken`` table.
+
+``revoked.is_revoked(jti)`` costs one hash when the token was not revoked,
+which is almost every request. Only when the Bloom filter says "maybe" is the
+JTI looked up in the table, and that answer is remembered. A positive that
+cannot be confirmed (database unavailable) counts as revoked: most positives
+are real revocations. The other services keep the same filter, fed from
+``RevokedTokenListView``.
+
+A daemon thread per process pulls newly revoked JTIs every
+``refresh_interval`` seconds (``?after=<cursor>``, so each sync only carries
+what is new) and rebuilds the filter from scratch every ``rebuild_interval``
+so that expired revocations drop out. A token revoked elsewhere is therefore
+rejected here within ``refresh_interval`` seconds.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import RevokedToken
+
+CAPACITY = 100_000  # revocations before the false-positive rate rises above ERROR_RATE
+ERROR_RATE = 0.001
+REFRESH_INTERVAL = 10  # seconds
+REBUILD_INTERVAL = 60 * 60  # seconds
+CONFIRMED_SIZE = 10_000
+PAGE_SIZE = 10_000  # revocations per sync page
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity=CAPACITY, error_rate=ERROR_RATE):
+        # m = -n ln p / (ln 2)^2 bits, k = m/n ln 2 hash functions
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # One digest, k positions by double hashing.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, fetch_since, confirm, refresh_interval=REFRESH_INTERVAL,
+                 rebuild_interval=REBUILD_INTERVAL, capacity=CAPACITY):
+        """``fetch_since(cursor) -> (jtis, cursor)`` lists revocations after ``cursor``
+        (``None`` = all live ones); ``confirm(jti) -> bool`` checks one exactly."""
+        self.fetch_since = fetch_since
+        self.confirm = confirm
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._cursor = None
+        self._rebuilt_at = 0.0
+        self._confirmed = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.syncs = 0
+        self.sync_errors = 0
+        self.confirmations = 0
+
+    def _ensure_worker(self):
+        # Started lazily so that each forked worker has its own sync thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                close_old_connections()
+                self.sync()
+            except Exception:
+                self.sync_errors += 1
+                logger.exception("could not sync revoked tokens")
+            time.sleep(self.refresh_interval)
+
+    def sync(self):
+        """Pull new revocations (or all live ones, when due for a rebuild)."""
+        if time.monotonic() - self._rebuilt_at >= self.rebuild_interval or self._filter.count >= self.capacity:
+            jtis, cursor = self.fetch_since(None)
+            fresh = BloomFilter(self.capacity)
+            for jti in jtis:
+                fresh.add(jti)
+            self._filter, self._cursor = fresh, cursor
+            self._rebuilt_at = time.monotonic()
+        else:
+            jtis, self._cursor = self.fetch_since(self._cursor)
+            for jti in jtis:
+                self._filter.add(jti)
+        with self._lock:
+            # a token confirmed "not revoked" earlier may have been revoked since
+            for jti in jtis:
+                if jti in self._confirmed:
+                    self._confirmed[jti] = True
+        self.syncs += 1
+
+    def add(self, jti):
+        """Revoked in this process; take effect here without waiting for the next sync."""
+        self._filter.add(jti)
+        self._remember(jti, True)
+
+    def is_revoked(self, jti):
+        self._ensure_worker()
+        if jti not in self._filter:
+            return False
+        known = self._confirmed.get(jti)
+        if known is not None:
+            return known
+        self.confirmations += 1
+        try:
+            revoked = self.confirm(jti)
+        except Exception:
+            logger.exception("could not confirm revocation of %s; rejecting the token", jti)
+            return True
+        self._remember(jti, revoked)
+        return revoked
+
+    def _remember(self, jti, revoked):
+        with self._lock:
+            self._confirmed[jti] = revoked
+            while len(self._confirmed) > CONFIRMED_SIZE:
+                self._confirmed.popitem(last=False)
+
+    def stats(self):
+        return {
+            "entries": self._filter.count,
+            "bits": self._filter.size,
+            "hashes": self._filter.hashes,
+            "cursor": self._cursor,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "confirmations": self.confirmations,
+        }
+
+
+def live_revocations(after=None, limit=PAGE_SIZE):
+    """``(jtis, cursor, more)`` for unexpired revocations with ``id > after``, in id order."""
+    rows = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+    if after is not None:
+        rows = rows.filter(id__gt=after)
+    rows = list(rows.order_by("id").values_list("id", "jti")[:limit])
+    cursor = rows[-1][0] if rows else (after or 0)
+    return [jti for _, jti in rows], cursor, len(rows) == limit
+
+
+def _fetch_since(cursor):
+    jtis = []
+    while True:
+        page, cursor, more = live_revocations(cursor)
+        jtis.extend(page)
+        if not more:
+            return jtis, cursor
+
+
+def _confirm(jti):
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+revoked = RevocationList(_fetch_since, _confirm)
@@ -37,6 +37,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "email", "full_name", "role", "is_active", "created_at", "password"]
         read_only_fields = ["id", "created_at"]
 
+    def to_representation(self, instance):
+        # patient_id / doctor_id theo role, để frontend không phải gọi thêm service khác
+        data = super().to_representation(instance)
+        data.update(instance.profile_ids())
+        return data
+
     def create(self, validated_data):
         password = validated_data.pop("password", None)
         user = User(**validated_data)
@@ -69,4 +75,12 @@ class CreateAccountSerializer(serializers.ModelSerializer):
         password = validated_data.pop("password")
         role = validated_data.pop("role", "patient")
         validated_data["role"] = role
-        return User.objects.create_user(password=password, **validated_data)
\ No newline at end of file
+        return User.objects.create_user(password=password, **validated_data)
+
+class BulkAccountSerializer(serializers.Serializer):
+    """Một dòng của BulkCreateAccountView; email trùng được kiểm tra cho cả batch."""
+    email = serializers.EmailField()
+    full_name = serializers.CharField(max_length=100)
+    password = serializers.CharField(write_only=True)
+    role = serializers.ChoiceField(choices=[("patient", "patient"), ("doctor", "doctor"), ("admin", "admin")],
+                                   default="patient")
@@ -1,3 +1,421 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication, profiles, revocation, views
+from .authentication import StatelessJWTAuthentication, claims_cache
+from .models import OutboxEntry, RevokedToken, User
+from .outbox import TOPIC_URLS, OutboxDispatcher, enqueue
+from .tokens import UserRefreshToken
+
+
+def downstream_response(status_code=200, results=None):
+    resp = mock.Mock(status_code=status_code, text="")
+    resp.json.return_value = {"results": results or []}
+    return resp
+
+
+def created(*ids, status="created"):
+    return [{"status": status, "record": {"id": record_id}} for record_id in ids]
+
+
+FAST_HASHER = override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+
+
+@FAST_HASHER
+class OutboxDispatchTests(TestCase):
+    def setUp(self):
+        self.dispatcher = OutboxDispatcher()
+        patcher = mock.patch("auth_model.outbox.requests.post")
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def register(self, email):
+        resp = APIClient().post("/api/auth/register/",
+                                {"email": email, "full_name": "Test User", "password": "Passw0rd!x"},
+                                format="json")
+        self.assertEqual(resp.status_code, 201)
+        return User.objects.get(email=email)
+
+    def entry(self, user):
+        return OutboxEntry.objects.get(user=user)
+
+    def make_due(self):
+        OutboxEntry.objects.update(next_attempt_at=timezone.now())
+
+    def test_register_enqueues_without_calling_patient_service(self):
+        with mock.patch("auth_model.views.dispatcher.wake") as wake:
+            with self.captureOnCommitCallbacks(execute=True):
+                user = self.register("a@example.com")
+        self.post.assert_not_called()
+        wake.assert_called_once()
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_PENDING)
+        self.assertEqual(entry.topic, OutboxEntry.TOPIC_PROVISION_PATIENT)
+        self.assertEqual(entry.idempotency_key, f"provision_patient-{user.pk}")
+
+    def test_dispatch_delivers_one_batch_and_stores_profile_id(self):
+        users = [self.register(f"u{i}@example.com") for i in range(3)]
+        self.post.return_value = downstream_response(results=created(11, 12, 13))
+
+        self.assertEqual(self.dispatcher.dispatch_once(), 3)
+
+        self.post.assert_called_once()
+        url = self.post.call_args.args[0]
+        records = self.post.call_args.kwargs["json"]["records"]
+        self.assertEqual(url, TOPIC_URLS[OutboxEntry.TOPIC_PROVISION_PATIENT])
+        self.assertEqual([r["user_id"] for r in records], [u.pk for u in users])
+        self.assertEqual([r["idempotency_key"] for r in records], [f"provision_patient-{u.pk}" for u in users])
+        for user, profile_id in zip(users, (11, 12, 13)):
+            self.assertEqual(self.entry(user).status, OutboxEntry.STATUS_DELIVERED)
+            user.refresh_from_db()
+            self.assertEqual(user.profile_id, profile_id)
+        self.assertEqual(self.dispatcher.dispatch_once(), 0)
+
+    def test_connection_error_is_retried_with_backoff(self):
+        user = self.register("retry@example.com")
+        self.post.side_effect = requests.ConnectionError("patient_service down")
+
+        self.dispatcher.dispatch_once()
+
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_PENDING)
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("patient_service down", entry.last_error)
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+        # not due yet, so nothing is claimed before the backoff runs out
+        self.assertEqual(self.dispatcher.dispatch_once(), 0)
+
+        self.make_due()
+        self.post.side_effect = None
+        self.post.return_value = downstream_response(results=created(7))
+        self.assertEqual(self.dispatcher.dispatch_once(), 1)
+
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_DELIVERED)
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(entry.last_error, "")
+        self.assertEqual(entry.response, {"id": 7})
+
+    def test_server_error_is_retried_and_gives_up_after_max_attempts(self):
+        user = self.register("flaky@example.com")
+        self.post.return_value = downstream_response(status_code=503)
+        dispatcher = OutboxDispatcher(max_attempts=2)
+
+        dispatcher.dispatch_once()
+        self.assertEqual(self.entry(user).status, OutboxEntry.STATUS_PENDING)
+        self.make_due()
+        with self.assertLogs("auth_model.outbox", "ERROR"):
+            dispatcher.dispatch_once()
+
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_FAILED)
+        self.assertEqual(entry.attempts, 2)
+        self.assertIn("HTTP 503", entry.last_error)
+
+    def test_rejected_record_fails_only_its_own_entry(self):
+        ok, bad = self.register("ok@example.com"), self.register("bad@example.com")
+        self.post.return_value = downstream_response(results=[
+            {"status": "created", "record": {"id": 1}},
+            {"status": "rejected", "errors": {"full_name": ["This field is required."]}},
+        ])
+
+        with self.assertLogs("auth_model.outbox", "ERROR"):
+            self.dispatcher.dispatch_once()
+
+        self.assertEqual(self.entry(ok).status, OutboxEntry.STATUS_DELIVERED)
+        self.assertEqual(self.entry(bad).status, OutboxEntry.STATUS_FAILED)
+        self.assertIn("full_name", self.entry(bad).last_error)
+
+    def test_malformed_response_is_retried(self):
+        user = self.register("odd@example.com")
+        self.post.return_value = downstream_response(results=[])  # fewer results than records
+
+        self.dispatcher.dispatch_once()
+
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_PENDING)
+        self.assertIn("Unexpected response", entry.last_error)
+
+    def test_redelivery_of_an_existing_record_counts_as_delivered(self):
+        # The service created the record but the response was lost, so the
+        # entry goes out again and the service answers with the existing one.
+        user = self.register("dup@example.com")
+        self.post.side_effect = requests.Timeout("read timed out")
+        self.dispatcher.dispatch_once()
+
+        self.make_due()
+        self.post.side_effect = None
+        self.post.return_value = downstream_response(results=created(42, status="existing"))
+        self.dispatcher.dispatch_once()
+
+        entry = self.entry(user)
+        self.assertEqual(entry.status, OutboxEntry.STATUS_DELIVERED)
+        user.refresh_from_db()
+        self.assertEqual(user.profile_id, 42)
+        sent = [c.kwargs["json"]["records"][0]["idempotency_key"] for c in self.post.call_args_list]
+        self.assertEqual(sent, [entry.idempotency_key] * 2)
+
+    def test_an_entry_is_enqueued_once_per_user_and_topic(self):
+        user = self.register("once@example.com")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            enqueue(OutboxEntry.TOPIC_PROVISION_PATIENT, user, {"user_id": user.pk})
+        self.assertEqual(OutboxEntry.objects.filter(user=user).count(), 1)
+
+    def test_claimed_entries_are_leased(self):
+        self.register("lease@example.com")
+        with mock.patch.object(self.dispatcher, "_deliver"):
+            self.assertEqual(self.dispatcher.dispatch_once(), 1)
+        # a second dispatcher does not pick the entry up while the lease runs
+        self.assertEqual(OutboxDispatcher().dispatch_once(), 0)
+        OutboxEntry.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.post.return_value = downstream_response(results=created(1))
+        self.assertEqual(OutboxDispatcher().dispatch_once(), 1)
+
+
+@FAST_HASHER
+class BulkCreateAccountTests(TestCase):
+    url = "/api/auth/create-account/bulk/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user("admin@example.com", "Passw0rd!x", full_name="Admin",
+                                              role="admin", is_staff=True, is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def account(self, email, role="patient"):
+        return {"email": email, "full_name": email.split("@")[0], "password": "Passw0rd!x", "role": role}
+
+    def test_invalid_rows_do_not_block_the_valid_ones(self):
+        User.objects.create_user("taken@example.com", "Passw0rd!x", full_name="Taken")
+        rows = [
+            self.account("p1@example.com"),
+            self.account("not-an-email"),
+            self.account("d1@example.com", role="doctor"),
+            self.account("P1@EXAMPLE.com"),  # only the domain is lowercased, so this is another address
+            self.account("p1@example.com"),
+            self.account("taken@example.com"),
+            self.account("a1@example.com", role="admin"),
+        ]
+        resp = self.client.post(self.url, {"accounts": rows}, format="json")
+
+        self.assertEqual(resp.status_code, 201)
+        body = resp.json()
+        self.assertEqual((body["created"], body["failed"]), (4, 3))
+        results = body["results"]
+        self.assertEqual([r["row"] for r in results], list(range(1, 8)))
+        self.assertEqual([r["status"] for r in results],
+                         ["created", "error", "created", "created", "error", "error", "created"])
+        self.assertIn("email", results[1]["errors"])
+        self.assertEqual(results[4]["errors"]["email"], ["Duplicate of row 1"])
+        self.assertIn("already exists", results[5]["errors"]["email"][0])
+        self.assertEqual(results[6]["provisioning"], "not_required")
+
+        admin = User.objects.get(email="a1@example.com")
+        self.assertTrue(admin.is_staff)
+        self.assertTrue(User.objects.get(email="p1@example.com").check_password("Passw0rd!x"))
+        topics = dict(OutboxEntry.objects.values_list("user__email", "topic"))
+        self.assertEqual(topics, {
+            "p1@example.com": OutboxEntry.TOPIC_PROVISION_PATIENT,
+            "P1@example.com": OutboxEntry.TOPIC_PROVISION_PATIENT,
+            "d1@example.com": OutboxEntry.TOPIC_PROVISION_DOCTOR,
+        })
+
+    def test_nothing_valid_is_a_bad_request(self):
+        resp = self.client.post(self.url, {"accounts": [self.account("nope")]}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["created"], 0)
+        self.assertFalse(OutboxEntry.objects.exists())
+
+    def test_provisioning_is_batched_per_service(self):
+        rows = [self.account(f"p{i}@example.com") for i in range(5)]
+        rows += [self.account(f"d{i}@example.com", role="doctor") for i in range(3)]
+        with mock.patch("auth_model.views.dispatcher.wake") as wake:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.post(self.url, rows, format="json").status_code, 201)
+        wake.assert_called_once()
+
+        def reply(url, json, **kwargs):
+            return downstream_response(results=created(*(100 + r["user_id"] for r in json["records"])))
+
+        with mock.patch("auth_model.outbox.requests.post", side_effect=reply) as post:
+            self.assertEqual(OutboxDispatcher().dispatch_once(), 8)
+
+        self.assertEqual(post.call_count, 2)
+        sizes = {c.args[0]: len(c.kwargs["json"]["records"]) for c in post.call_args_list}
+        self.assertEqual(sizes, {TOPIC_URLS[OutboxEntry.TOPIC_PROVISION_PATIENT]: 5,
+                                 TOPIC_URLS[OutboxEntry.TOPIC_PROVISION_DOCTOR]: 3})
+        self.assertFalse(OutboxEntry.objects.exclude(status=OutboxEntry.STATUS_DELIVERED).exists())
+        for user in User.objects.exclude(pk=self.admin.pk):
+            self.assertEqual(user.profile_id, 100 + user.pk)
+
+    def test_csv_upload(self):
+        csv_body = "email,full_name,password,role\nc1@example.com,C One,Passw0rd!x,doctor\nc2@example.com,C Two,Passw0rd!x,\n"
+        resp = self.client.post(self.url, csv_body, content_type="text/csv")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(dict(User.objects.filter(email__startswith="c").values_list("email", "role")),
+                         {"c1@example.com": "doctor", "c2@example.com": "patient"})
+
+    def test_admins_only(self):
+        patient = User.objects.create_user("p@example.com", "Passw0rd!x", full_name="P")
+        self.client.force_authenticate(patient)
+        resp = self.client.post(self.url, [self.account("x@example.com")], format="json")
+        self.assertEqual(resp.status_code, 403)
+        self.assertFalse(User.objects.filter(email="x@example.com").exists())
+
+
+@FAST_HASHER
+class LoginProfileTests(TestCase):
+    """The login response and access token carry the user's role and patient/doctor id."""
+
+    def login(self, email):
+        resp = APIClient().post("/api/auth/login/", {"email": email, "password": "Passw0rd!x"}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        return body["user"], AccessToken(body["access"])
+
+    def test_patient_login(self):
+        user = User.objects.create_user("p@example.com", "Passw0rd!x", full_name="Pat", profile_id=3)
+        with mock.patch.object(profiles.requests, "get") as get:
+            body, claims = self.login("p@example.com")
+        get.assert_not_called()
+        self.assertEqual(body, {"id": user.pk, "email": "p@example.com", "full_name": "Pat", "role": "patient",
+                                "is_active": True, "created_at": body["created_at"], "patient_id": 3})
+        self.assertEqual((claims["user_id"], claims["role"], claims["full_name"], claims["patient_id"]),
+                         (user.pk, "patient", "Pat", 3))
+        self.assertEqual((claims["is_staff"], claims["is_superuser"]), (False, False))
+        self.assertNotIn("doctor_id", claims)
+
+    def test_doctor_login_looks_up_a_missing_profile_once(self):
+        user = User.objects.create_user("d@example.com", "Passw0rd!x", full_name="Doc", role="doctor")
+        found = mock.Mock(status_code=200)
+        found.json.return_value = {"id": 8}
+        with mock.patch.object(profiles.requests, "get", return_value=found) as get:
+            body, claims = self.login("d@example.com")
+            self.login("d@example.com")
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(get.call_args.args[0], profiles.DOCTOR_SERVICE_URL + f"user/{user.pk}/")
+        self.assertEqual((body["role"], body["doctor_id"]), ("doctor", 8))
+        self.assertEqual((claims["role"], claims["doctor_id"]), ("doctor", 8))
+        self.assertNotIn("patient_id", body)
+        user.refresh_from_db()
+        self.assertEqual(user.profile_id, 8)
+
+    def test_login_goes_ahead_when_the_lookup_fails(self):
+        User.objects.create_user("d@example.com", "Passw0rd!x", full_name="Doc", role="doctor")
+        with mock.patch.object(profiles.requests, "get", side_effect=requests.ConnectionError):
+            body, claims = self.login("d@example.com")
+        self.assertIsNone(body["doctor_id"])
+        self.assertIsNone(claims["doctor_id"])
+
+    def test_admin_login_has_staff_claims_and_no_profile(self):
+        User.objects.create_superuser("a@example.com", "Passw0rd!x", full_name="Admin", role="admin")
+        body, claims = self.login("a@example.com")
+        self.assertEqual((claims["is_staff"], claims["is_superuser"]), (True, True))
+        self.assertNotIn("patient_id", claims)
+        self.assertNotIn("doctor_id", body)
+
+
+class ProtectedView(APIView):
+    permission_classes = [IsAuthenticated]
+
+
+class RevocationTests(TestCase):
+    def setUp(self):
+        # A fresh list per test, without its background sync thread.
+        self.revoked = revocation.RevocationList(revocation._fetch_since, revocation._confirm)
+        self.revoked._ensure_worker = lambda: None
+        for module in (authentication, views):
+            patcher = mock.patch.object(module, "revoked", self.revoked)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        claims_cache.clear()
+        self.addCleanup(claims_cache.clear)
+        self.user = User.objects.create_user("p@example.com", "Passw0rd!x", full_name="P", profile_id=3)
+        self.refresh = UserRefreshToken.for_user(self.user)
+        self.access_token = self.refresh.access_token
+        self.access = str(self.access_token)
+
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return client
+
+    def authenticate(self, access):
+        request = ProtectedView().initialize_request(
+            APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access}"))
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_token_is_rejected_after_logout(self):
+        client = self.client_for(self.access)
+        resp = client.post("/api/auth/logout/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(RevokedToken.objects.values_list("jti", flat=True)),
+                         {self.refresh["jti"], self.access_token["jti"]})
+
+        resp = client.post("/api/auth/logout/", {}, format="json")
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json()["detail"], "Token has been revoked")
+        # endpoints open to anyone ignore the stale token instead of failing
+        resp = client.post("/api/auth/login/", {"email": "p@example.com", "password": "Passw0rd!x"}, format="json")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_token_revoked_elsewhere_is_rejected_after_sync(self):
+        self.assertIsNotNone(self.authenticate(self.access))
+        claims = self.access_token.payload
+        RevokedToken.objects.create(jti=claims["jti"], user_id=self.user.pk,
+                                    expires_at=timezone.now() + timedelta(hours=1))
+
+        self.revoked.sync()
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Token has been revoked"):
+            self.authenticate(self.access)
+
+    def test_unrevoked_token_passes_the_bloom_filter_without_a_lookup(self):
+        for i in range(100):
+            self.revoked.add(f"other-{i}")
+        self.authenticate(self.access)  # decodes and caches the claims
+        with self.assertNumQueries(0):
+            principal, claims = self.authenticate(self.access)
+        self.assertEqual(principal.user_id, self.user.pk)
+        self.assertEqual(principal.patient_id, 3)
+        self.assertEqual(self.revoked.confirmations, 0)
+
+    def test_bloom_false_positive_is_confirmed_once(self):
+        jti = self.access_token["jti"]
+        self.revoked._filter.add(jti)  # in the filter, but not in RevokedToken
+
+        self.assertIsNotNone(self.authenticate(self.access))
+        self.assertIsNotNone(self.authenticate(self.access))
+        self.assertEqual(self.revoked.confirmations, 1)
+
+    def test_refresh_token_of_another_user_is_refused(self):
+        other = User.objects.create_user("o@example.com", "Passw0rd!x", full_name="O")
+        resp = self.client_for(self.access).post(
+            "/api/auth/logout/", {"refresh": str(UserRefreshToken.for_user(other))}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(RevokedToken.objects.exists())
+
+    def test_revoked_list_pages_by_cursor(self):
+        expires = timezone.now() + timedelta(hours=1)
+        RevokedToken.objects.create(jti="old", user_id=1, expires_at=timezone.now() - timedelta(seconds=1))
+        RevokedToken.objects.create(jti="a", user_id=1, expires_at=expires)
+        client = APIClient()
+
+        page = client.get("/api/auth/revoked/").json()
+        self.assertEqual((page["jtis"], page["more"]), (["a"], False))
+        RevokedToken.objects.create(jti="b", user_id=1, expires_at=expires)
+        page = client.get("/api/auth/revoked/", {"after": page["cursor"]}).json()
+        self.assertEqual(page["jtis"], ["b"])
+
+        self.assertEqual(client.get("/api/auth/revoked/a/").status_code, 200)
+        self.assertEqual(client.get("/api/auth/revoked/zzz/").status_code, 404)
@@ -0,0 +1,22 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the claims other services authorize on.
+
+    ``StatelessJWTAuthentication`` never loads the user, so anything a service
+    or the web app needs right after login - the role, the display name, the
+    ``is_staff`` / ``is_superuser`` flags that ``IsAdminUser`` checks and the
+    linked ``patient_id`` / ``doctor_id`` - has to be in the token itself.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["role"] = user.role
+        token["full_name"] = user.full_name
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        for claim, value in user.profile_ids().items():
+            token[claim] = value
+        return token
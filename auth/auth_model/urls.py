@@ -1,7 +1,10 @@
 # auth_service/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, LoginView, UserViewSet, CreateAccountView, UserSearchAPIView
+from .views import (
+    RegisterView, LoginView, LogoutView, UserViewSet, CreateAccountView, BulkCreateAccountView,
+    UserSearchAPIView, ProvisioningStatusView, RevokedTokenListView, RevokedTokenDetailView,
+)
 
 router = DefaultRouter()
 router.register(r'api/auth/users', UserViewSet, basename='user')
@@ -9,7 +12,12 @@ router.register(r'api/auth/users', UserViewSet, basename='user')
 urlpatterns = [
     path("api/auth/register/", RegisterView.as_view(), name="register"),
     path("api/auth/login/", LoginView.as_view(), name="login"),
+    path("api/auth/logout/", LogoutView.as_view(), name="logout"),
+    path("api/auth/revoked/", RevokedTokenListView.as_view(), name="revoked-tokens"),
+    path("api/auth/revoked/<str:jti>/", RevokedTokenDetailView.as_view(), name="revoked-token"),
     path("api/auth/create-account/", CreateAccountView.as_view(), name="create-account"),
+    path("api/auth/create-account/bulk/", BulkCreateAccountView.as_view(), name="create-account-bulk"),
     path("api/auth/users/search/", UserSearchAPIView.as_view(), name="user-search"),
+    path("api/auth/users/<int:user_id>/provisioning/", ProvisioningStatusView.as_view(), name="user-provisioning"),
     path("", include(router.urls)),
 ]
@@ -1,87 +1,80 @@
 # auth_service/views.py
+from datetime import datetime, timezone as dt_timezone
+
 import requests
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import User
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
-
-PATIENT_SERVICE_URL = "http://patient_service:8000/api/patient/"  # endpoint tạo patient
-DOCTOR_SERVICE_URL = "http://doctor_service:8000/api/doctor/"
+from .tokens import UserRefreshToken
+from .models import OutboxEntry, RevokedToken, User
+from .bulk_accounts import CSVParser, hash_passwords, read_csv
+from .outbox import DOCTOR_SERVICE_URL, PATIENT_SERVICE_URL, build_entry, dispatcher, enqueue
+from .profiles import ensure_profile_id
+from .revocation import live_revocations, revoked
+from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, BulkAccountSerializer
 
 class RegisterView(APIView):
     """
-    Tạo user (role mặc định = 'patient' trong serializer),
-    sau đó gọi patient_service để tạo record Patient.
-    Nếu tạo patient thất bại, xóa user (rollback) và trả lỗi.
+    Tạo user (role mặc định = 'patient' trong serializer) và một outbox entry
+    "provision patient" trong cùng một transaction, rồi trả về ngay.
+    Record Patient được outbox dispatcher tạo ở background (có retry và
+    idempotency key), nên patient_service chậm hoặc lỗi không làm chậm đăng ký.
     """
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Lưu user trước
         try:
             with transaction.atomic():
                 user = serializer.save()  # create_user => user đã lưu vào DB
+                entry = enqueue(OutboxEntry.TOPIC_PROVISION_PATIENT, user, {
+                    "user_id": user.id,
+                    "full_name": getattr(user, "full_name", ""),
+                    "email": getattr(user, "email", ""),
+                })
+                transaction.on_commit(dispatcher.wake)
         except Exception as e:
             return Response({"error": "Failed to create user", "details": str(e)},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Chuẩn bị payload cho patient_service (chỉ map những trường có sẵn)
-        patient_payload = {
-            "user_id": user.id,
-            "full_name": getattr(user, "full_name", ""),
-            "email": getattr(user, "email", ""),
-        }
-
-        # Gọi patient_service
-        try:
-            resp = requests.post(
-                PATIENT_SERVICE_URL,
-                json=patient_payload,
-                headers={"Host": "localhost"},  # giữ theo snippet của bạn nếu cần
-                timeout=5
-            )
-        except requests.RequestException as exc:
-            # Không thể reach patient_service => rollback user
-            user.delete()
-            return Response({"error": "Patient service unreachable", "details": str(exc)},
-                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-        # Nếu patient_service trả mã lỗi => rollback user
-        if resp.status_code not in (200, 201):
-            # xóa user vừa tạo
-            user.delete()
-            # trả lỗi chi tiết từ patient_service để debug
-            try:
-                detail = resp.json()
-            except Exception:
-                detail = resp.text
-            return Response({"error": "Failed to create patient record",
-                             "patient_service_response": detail},
-                            status=status.HTTP_502_BAD_GATEWAY)
-
-        # Thành công: parse thông tin patient trả về (vd chứa id)
-        try:
-            patient_data = resp.json()
-        except ValueError:
-            patient_data = {"raw": resp.text}
-
         # Tạo token JWT và trả về
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response({
-            "message": "Registered and patient record created",
+            "message": "Registered; patient record is being provisioned",
             "refresh": str(refresh),
             "access": str(refresh.access_token),
-            "patient": patient_data
+            "user": UserSerializer(user).data,
+            "provisioning": provisioning_status(entry),
         }, status=status.HTTP_201_CREATED)
 
 
+class ProvisioningStatusView(APIView):
+    """Trạng thái tạo record downstream (patient) cho một user."""
+
+    def get(self, request, user_id):
+        entries = OutboxEntry.objects.filter(user_id=user_id).order_by("created_at")
+        if not entries:
+            return Response({"error": "No provisioning for this user"}, status=status.HTTP_404_NOT_FOUND)
+        return Response([provisioning_status(entry) for entry in entries])
+
+
+def provisioning_status(entry):
+    return {
+        "topic": entry.topic,
+        "status": entry.status,
+        "attempts": entry.attempts,
+        "last_error": entry.last_error or None,
+        "result": entry.response,
+    }
+
+
 class CreateAccountView(APIView):
     """Admin-only endpoint to create users with a specified role (patient|doctor|admin).
 
@@ -153,24 +146,177 @@ class CreateAccountView(APIView):
             created_data = resp.json()
         except ValueError:
             created_data = {"raw": resp.text}
+        if isinstance(created_data, dict) and isinstance(created_data.get("id"), int):
+            User.objects.filter(pk=user.pk).update(profile_id=created_data["id"])
 
         return Response({"message": f"User and {role} record created", "user_id": user.id, role: created_data}, status=status.HTTP_201_CREATED)
 
 
+class BulkCreateAccountView(APIView):
+    """Admin-only bulk version of CreateAccountView.
+
+    Accepts ``{"accounts": [{email, full_name, password, role}, ...]}`` (or a bare
+    list), a ``text/csv`` body, or a multipart upload field ``file`` with a CSV
+    header ``email,full_name,password,role``. Every row is validated and checked
+    against existing emails with one query, passwords are hashed on a thread
+    pool, and all valid users plus their "provision patient/doctor" outbox
+    entries are written with ``bulk_create`` in one transaction. The outbox
+    dispatcher then provisions them in batches of up to 100 per downstream call.
+    Returns one result per input row, in order; invalid rows do not block the others.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, CSVParser, MultiPartParser, FormParser]
+    MAX_ROWS = 1000
+
+    def post(self, request):
+        if "file" in request.FILES:
+            rows = read_csv(request.FILES["file"])
+        elif isinstance(request.data, dict):
+            rows = request.data.get("accounts")
+        else:
+            rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Provide a non-empty 'accounts' list or a CSV file"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.MAX_ROWS:
+            return Response({"error": f"At most {self.MAX_ROWS} accounts per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(rows)
+        valid = {}  # row index -> validated data
+        seen = {}  # email -> first row index
+        for i, row in enumerate(rows):
+            serializer = BulkAccountSerializer(data=row)
+            if not serializer.is_valid():
+                results[i] = {"errors": serializer.errors}
+                continue
+            data = serializer.validated_data
+            data["email"] = User.objects.normalize_email(data["email"])
+            if data["email"] in seen:
+                results[i] = {"errors": {"email": [f"Duplicate of row {seen[data['email']] + 1}"]}}
+                continue
+            seen[data["email"]] = i
+            valid[i] = data
+
+        taken = set(User.objects.filter(email__in=seen).values_list("email", flat=True))
+        for i in [i for i, data in valid.items() if data["email"] in taken]:
+            results[i] = {"errors": {"email": ["user with this email already exists."]}}
+            del valid[i]
+
+        hashes = hash_passwords([data["password"] for data in valid.values()])
+        users = [
+            User(email=data["email"], full_name=data["full_name"], role=data["role"], password=password,
+                 is_staff=data["role"] == "admin", is_superuser=data["role"] == "admin")
+            for data, password in zip(valid.values(), hashes)
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                topics = {"patient": OutboxEntry.TOPIC_PROVISION_PATIENT, "doctor": OutboxEntry.TOPIC_PROVISION_DOCTOR}
+                OutboxEntry.objects.bulk_create([
+                    build_entry(topics[user.role], user, {
+                        "user_id": user.id,
+                        "full_name": user.full_name,
+                        "created_at": user.created_at.isoformat() if user.created_at else None,
+                    })
+                    for user in users if user.role in topics
+                ])
+                transaction.on_commit(dispatcher.wake)
+        except IntegrityError as e:
+            # Một email vừa được tạo bởi request khác giữa lúc kiểm tra và lúc ghi
+            return Response({"error": "Some emails were registered concurrently; retry the batch",
+                             "details": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        for i, user in zip(valid, users):
+            results[i] = {
+                "user_id": user.id,
+                "role": user.role,
+                "provisioning": "not_required" if user.role == "admin" else OutboxEntry.STATUS_PENDING,
+            }
+        report = []
+        for i, (row, result) in enumerate(zip(rows, results)):
+            email = row.get("email") if isinstance(row, dict) else None
+            report.append({"row": i + 1, "email": email,
+                           "status": "error" if "errors" in result else "created", **result})
+        created = len(users)
+        return Response({"created": created, "failed": len(rows) - created, "results": report},
+                        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
 class LoginView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            refresh = RefreshToken.for_user(user)
+            ensure_profile_id(user)
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 "message": "Login successful",
                 "refresh": str(refresh),
-                "access": str(refresh.access_token)
+                "access": str(refresh.access_token),
+                "user": UserSerializer(user).data,
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LogoutView(APIView):
+    """Thu hồi access token đang dùng, và refresh token nếu gửi kèm ``{"refresh": ...}``.
+
+    JTI được ghi vào bảng RevokedToken; mọi service từ chối token đó trong vòng
+    vài giây (Bloom filter của từng service đồng bộ từ RevokedTokenListView).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        claims = [request.auth]
+        refresh = request.data.get("refresh") if isinstance(request.data, dict) else None
+        if refresh:
+            try:
+                refresh_claims = RefreshToken(refresh).payload
+            except TokenError as e:
+                return Response({"error": "Invalid refresh token", "details": str(e)},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if refresh_claims.get("user_id") != request.user.user_id:
+                return Response({"error": "Refresh token belongs to another user"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            claims.append(refresh_claims)
+
+        RevokedToken.objects.bulk_create([
+            RevokedToken(jti=c["jti"], user_id=c["user_id"],
+                         expires_at=datetime.fromtimestamp(c["exp"], tz=dt_timezone.utc))
+            for c in claims
+        ], ignore_conflicts=True)
+        for c in claims:
+            revoked.add(c["jti"])
+        return Response({"message": "Logged out"}, status=status.HTTP_200_OK)
+
+
+class RevokedTokenListView(APIView):
+    """JTI bị thu hồi còn hạn, theo thứ tự id: ``?after=<cursor>`` chỉ trả phần mới (cho các service khác)."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        after = request.query_params.get("after")
+        try:
+            after = int(after) if after is not None else None
+        except ValueError:
+            return Response({"error": "'after' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        jtis, cursor, more = live_revocations(after)
+        return Response({"jtis": jtis, "cursor": cursor, "more": more})
+
+
+class RevokedTokenDetailView(APIView):
+    """200 nếu JTI đã bị thu hồi, 404 nếu không (xác nhận khi Bloom filter báo "có thể")."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, jti):
+        if RevokedToken.objects.filter(jti=jti).exists():
+            return Response({"jti": jti, "revoked": True})
+        return Response({"jti": jti, "revoked": False}, status=status.HTTP_404_NOT_FOUND)
+
+
 class UserSearchAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -0,0 +1,147 @@
+"""Non-interactive screening of NDJSON intake records for ``chat_bot.py --batch``.
+
+Each input line is ``{"symptoms": [...], "days": 3}`` (an ``id`` is echoed
+back if present). A record goes through the same steps as the CLI
+conversation: the tree walk on the first symptom, the follow-up questions for
+that disease (answered "yes" for the symptoms the record lists), the second
+prediction on those answers and the ``calc_condition`` severity score.
+
+Lines are read lazily and sent to a process pool in chunks, with a bounded
+number of chunks in flight; results are written in input order as soon as the
+oldest chunk is done. Memory therefore stays flat however large the file is,
+and every worker memory-maps the same model artifact.
+"""
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from model_artifact import load_model
+from triage import ADVICE, score_indices, severity_vector, tier
+
+CHUNK_SIZE = 512  # records per task
+IN_FLIGHT_PER_WORKER = 2
+
+_screener = None
+
+
+class Screener:
+    def __init__(self, model):
+        self.model = model
+        self.severity = severity_vector(model.symptoms, model.severity)
+        freq = model.arrays['disease_symptom_freq']
+        # Follow-up symptoms per disease: every symptom seen with it in training.
+        self.follow_ups = [row.nonzero()[0].tolist() for row in freq]
+
+    def resolve(self, names):
+        indices, unknown = [], []
+        for name in names:
+            index = self.model.symptom_index.get(name) if isinstance(name, str) else None
+            if index is None and isinstance(name, str):
+                index = self.model.symptom_index.get(name.strip().replace(' ', '_'))
+            if index is None:
+                unknown.append(name)
+            elif index not in indices:
+                indices.append(index)
+        return indices, unknown
+
+    def screen(self, record):
+        symptoms, days = record.get('symptoms'), record.get('days')
+        if not isinstance(symptoms, list) or isinstance(days, bool) or not isinstance(days, int) or days < 0:
+            return {"error": "Each record needs a 'symptoms' list and a non-negative integer 'days'."}
+        indices, unknown = self.resolve(symptoms)
+        if not indices:
+            return {"error": "No known symptoms.", "unknown_symptoms": unknown}
+
+        tree = self.model.tree
+        present = tree.predict_indices(indices[:1])
+        reported = set(indices)
+        answered_yes = [i for i in self.follow_ups[present] if i in reported]
+        second = tree.predict_indices(answered_yes)
+        score = score_indices(answered_yes, days, self.severity)
+
+        disease = self.model.classes[present].strip()
+        second_disease = self.model.classes[second].strip()
+        result = {
+            "disease": disease,
+            "second_prediction": second_disease,
+            "agree": disease == second_disease,
+            "symptoms_confirmed": [self.model.symptoms[i] for i in answered_yes],
+            "score": round(score, 2),
+            "advice": ADVICE[tier(score)],
+            "precautions": self.model.precautions.get(disease, ["Consult a doctor."]),
+        }
+        if unknown:
+            result["unknown_symptoms"] = unknown
+        return result
+
+
+def _init_worker(model_path):
+    global _screener
+    _screener = Screener(load_model(model_path))
+
+
+def screen_lines(numbered_lines):
+    """Screen ``(line number, raw line)`` pairs; returns one NDJSON string for the chunk."""
+    out = []
+    for number, line in numbered_lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            result = _screener.screen(record)
+            if 'id' in record:
+                result = {"id": record['id'], **result}
+        else:
+            result = {"error": "Invalid JSON object."}
+        out.append(json.dumps({"line": number, **result}) + "\n")
+    return "".join(out)
+
+
+def _numbered(lines):
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            yield number, line
+
+
+def run(model_path, infile, outfile, workers=None, chunk_size=CHUNK_SIZE):
+    """Screen every record of ``infile`` into ``outfile``; returns the number of chunks."""
+    records = _numbered(infile)
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    written = 0
+
+    if workers == 1:
+        _init_worker(model_path)
+        for chunk in chunks:
+            outfile.write(screen_lines(chunk))
+            written += 1
+        return written
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        limit = workers * IN_FLIGHT_PER_WORKER
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(screen_lines, chunk))
+            if len(pending) >= limit:
+                outfile.write(pending.popleft().result())
+                written += 1
+        while pending:
+            outfile.write(pending.popleft().result())
+            written += 1
+    return written
+
+
+def main(model_path, input_path, output_path=None, workers=None, chunk_size=CHUNK_SIZE):
+    infile = sys.stdin if input_path == '-' else open(input_path, encoding='utf-8')
+    outfile = sys.stdout if output_path in (None, '-') else open(output_path, 'w', encoding='utf-8')
+    try:
+        run(model_path, infile, outfile, workers, chunk_size)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
@@ -0,0 +1,234 @@
+"""Offline build step for the chatbot symptom model.
+
+Trains the decision tree on ``Training.csv`` and writes a single versioned
+artifact (see ``model_artifact.py``) containing the flattened tree arrays, the
+disease labels, the symptom index and the description/precaution/severity/
+synonym tables. The disease x symptom frequencies and a logistic regression are
+stored alongside the tree, with the weights that blend them into calibrated
+differentials (see ``ensemble.py``). The API only memory-maps the result, so
+pandas and scikit-learn are needed here and not at serving time.
+
+Usage:
+    python build_model.py [--data-dir DIR] [--output PATH]
+"""
+import argparse
+import csv
+import hashlib
+import os
+import time
+
+from model_artifact import BASE_DIR, DEFAULT_MODEL_PATH, write_artifact
+
+
+def load_severity(data_dir):
+    severity = {}
+    with open(os.path.join(data_dir, 'Symptom_severity.csv')) as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=',')
+        for row in csv_reader:
+            if len(row) > 1:
+                severity[row[0]] = int(row[1])
+    return severity
+
+
+def load_descriptions(data_dir):
+    descriptions = {}
+    with open(os.path.join(data_dir, 'symptom_Description.csv')) as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=',')
+        for row in csv_reader:
+            descriptions[row[0]] = row[1]
+    return descriptions
+
+
+def load_precautions(data_dir):
+    precautions = {}
+    with open(os.path.join(data_dir, 'symptom_precaution.csv')) as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=',')
+        for row in csv_reader:
+            precautions[row[0]] = row[1:]
+    return precautions
+
+
+def load_synonyms(data_dir):
+    synonyms = {}
+    with open(os.path.join(data_dir, 'symptom_synonyms.csv')) as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=',')
+        for row in csv_reader:
+            if len(row) > 1:
+                synonyms[row[0]] = row[1]
+    return synonyms
+
+
+def make_model_id(training_path):
+    with open(training_path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:8]
+    return f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{digest}"
+
+
+def load_training(training_path):
+    """Read ``Training.csv`` as a uint8 symptom matrix, the symptom names and the labels."""
+    import numpy as np
+    import pandas as pd
+
+    columns = pd.read_csv(training_path, nrows=0).columns
+    symptoms = list(columns[:-1])
+    training = pd.read_csv(training_path, dtype={name: np.uint8 for name in symptoms})
+    X = training[symptoms].to_numpy(dtype=np.uint8)
+    labels = training[columns[-1]].to_numpy()
+    return X, symptoms, labels
+
+
+def unique_patterns(X, y):
+    """Collapse duplicate ``(symptoms, label)`` rows.
+
+    Returns ``(patterns, pattern_labels, inverse)`` where ``inverse[i]`` is the
+    pattern of row ``i``; ``np.bincount(inverse)`` gives each pattern's weight.
+    """
+    import numpy as np
+
+    label_bytes = y.astype('<u4').view(np.uint8).reshape(-1, 4)
+    keyed = np.hstack([np.packbits(X, axis=1), label_bytes])
+    _, first, inverse = np.unique(keyed, axis=0, return_index=True, return_inverse=True)
+    return X[first], y[first], inverse.ravel()
+
+
+def train(training_path):
+    """Fit the tree exactly as the API used to at import time, plus the linear model.
+
+    Training.csv repeats a few hundred distinct symptom patterns many times, so
+    both models are fitted on the unique patterns weighted by how often each
+    occurs in the training split. That is the same objective as fitting on the
+    repeated rows, over a matrix ~16x smaller. Returns ``(arrays, tables)``.
+    """
+    import numpy as np
+    from sklearn import preprocessing
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, symptoms, labels = load_training(training_path)
+    le = preprocessing.LabelEncoder()
+    y = le.fit_transform(labels)
+    del labels
+
+    patterns, pattern_y, inverse = unique_patterns(X, y)
+    # Split rows as before, then weight each pattern by its rows in the training part.
+    train_rows, test_rows = train_test_split(np.arange(len(y)), test_size=0.33, random_state=42)
+    weights = np.bincount(inverse[train_rows], minlength=len(patterns))
+    fit = weights > 0
+    x_fit, y_fit, w_fit = patterns[fit], pattern_y[fit], weights[fit].astype(np.float64)
+    x_test, y_test = X[test_rows], y[test_rows]
+
+    clf = DecisionTreeClassifier().fit(x_fit, y_fit, sample_weight=w_fit)
+
+    tree_ = clf.tree_
+    arrays = {
+        'children_left': tree_.children_left.astype(np.int32),
+        'children_right': tree_.children_right.astype(np.int32),
+        'feature': tree_.feature.astype(np.int32),
+        'threshold': tree_.threshold.astype(np.float64),
+        'value': tree_.value[:, 0, :].astype(np.float64),
+    }
+    # value columns follow clf.classes_, which may be a subset of the encoder's labels
+    classes = [str(label) for label in le.inverse_transform(clf.classes_)]
+    check_parity(clf, arrays, patterns)
+
+    # Share of each disease's rows showing each symptom, for follow-up planning
+    # and the naive Bayes half of the differential.
+    counts = np.bincount(inverse, minlength=len(patterns)).astype(np.float64)
+    totals = np.zeros((len(le.classes_), len(symptoms)))
+    np.add.at(totals, pattern_y, patterns * counts[:, None])
+    rows_per_class = np.bincount(pattern_y, weights=counts, minlength=len(le.classes_))
+    freq = totals / np.maximum(rows_per_class, 1)[:, None]
+    arrays['disease_symptom_freq'] = freq[clf.classes_].astype(np.float32)
+    del X, y, inverse, counts, totals
+
+    # Linear half of the differential, trained on the same weighted patterns. Its
+    # rows are aligned with the tree's classes so every array indexes the same labels.
+    linear = LogisticRegression(max_iter=1000).fit(x_fit, y_fit, sample_weight=w_fit)
+    rows = np.searchsorted(linear.classes_, clf.classes_)
+    arrays['linear_coef'] = linear.coef_[rows].astype(np.float32)
+    arrays['linear_intercept'] = linear.intercept_[rows].astype(np.float32)
+    calibration = calibrate_ensemble(clf, arrays, x_test, y_test)
+
+    tables = {'symptoms': symptoms, 'classes': classes, 'ensemble': calibration}
+    return arrays, tables
+
+
+def partial_reports(x, rng):
+    """Held-out rows as patients report them: ``(present, absent, row)`` matrices and row indices.
+
+    Each row appears twice: once reduced to one to three of its symptoms (half
+    of those with one to five "no" answers to symptoms it lacks), and once with
+    each symptom dropped with probability 0.3.
+    """
+    import numpy as np
+
+    n = len(x)
+    present = np.zeros((2 * n, x.shape[1]), dtype=np.float32)
+    absent = np.zeros_like(present)
+    for r, row in enumerate(x):
+        shown, lacking = np.flatnonzero(row), np.flatnonzero(row == 0)
+        present[r, rng.choice(shown, min(len(shown), rng.integers(1, 4)), replace=False)] = 1
+        if rng.random() < 0.5:
+            absent[r, rng.choice(lacking, rng.integers(1, 6), replace=False)] = 1
+    present[n:] = x * (rng.random(x.shape) >= 0.3)
+    return present, absent, np.concatenate([np.arange(n), np.arange(n)])
+
+
+def calibrate_ensemble(clf, arrays, x_test, y_test):
+    """Choose the naive Bayes and linear blend weights on held-out partial reports."""
+    import numpy as np
+    from ensemble import Ensemble, calibrate
+
+    present, absent, rows = partial_reports(x_test, np.random.default_rng(0))
+    labels = np.searchsorted(clf.classes_, y_test[rows])
+    ensemble = Ensemble(arrays['disease_symptom_freq'], arrays['linear_coef'], arrays['linear_intercept'],
+                        {'naive_bayes': 1.0, 'linear': 1.0})
+    return calibrate(*ensemble.components(present, absent), labels)
+
+
+def check_parity(clf, arrays, x):
+    """Refuse to write an artifact whose flat-tree predictions differ from sklearn."""
+    import numpy as np
+    from tree_engine import FlatTree
+
+    tree = FlatTree(arrays['children_left'], arrays['children_right'], arrays['feature'],
+                    arrays['threshold'], arrays['value'])
+    rng = np.random.default_rng(0)
+    samples = np.vstack([x, rng.random((2000, x.shape[1])) < 0.05]).astype(np.float64)
+    expected = clf.predict(samples)
+    if not np.array_equal(clf.classes_[tree.predict(samples)], expected):
+        raise RuntimeError("flat tree batch predictions do not match sklearn")
+    for row, label in zip(samples[:500], expected[:500]):
+        if clf.classes_[tree.predict_indices(np.flatnonzero(row).tolist())] != label:
+            raise RuntimeError("flat tree single predictions do not match sklearn")
+
+
+def build(output=DEFAULT_MODEL_PATH, data_dir=BASE_DIR):
+    training_path = os.path.join(data_dir, 'Training.csv')
+    arrays, tables = train(training_path)
+    tables.update({
+        'descriptions': load_descriptions(data_dir),
+        'precautions': load_precautions(data_dir),
+        'severity': load_severity(data_dir),
+        'synonyms': load_synonyms(data_dir),
+    })
+    model_id = make_model_id(training_path)
+    write_artifact(output, arrays, tables, model_id)
+    return model_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the chatbot symptom model artifact.')
+    parser.add_argument('--data-dir', default=BASE_DIR, help='directory containing Training.csv and the lookup CSVs')
+    parser.add_argument('--output', default=os.environ.get('CHATBOT_MODEL_PATH', DEFAULT_MODEL_PATH))
+    args = parser.parse_args()
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    model_id = build(args.output, args.data_dir)
+    print(f"Wrote model {model_id} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,73 @@
-import re
-import pandas as pd
-import pyttsx3
-from sklearn import preprocessing
-from sklearn.tree import DecisionTreeClassifier,_tree
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.model_selection import cross_val_score
-from sklearn.svm import SVC
+"""Command-line HealthCare ChatBot.
+
+    python chat_bot.py            # original flow: trains the models from the CSVs at start-up
+    python chat_bot.py --kiosk    # loads the prebuilt artifact (see build_model.py) instead
+    python chat_bot.py --batch intake.ndjson --output results.ndjson   # non-interactive screening
+
+pandas, scikit-learn and pyttsx3 are imported only by the code paths that need
+them, so kiosk mode starts with just numpy and a memory-mapped model, and uses
+that one model for both the first and the second prediction.
+"""
+import argparse
 import csv
+import os
 import warnings
+from symptom_index import SymptomIndex
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 
-training = pd.read_csv('Training.csv')
-testing= pd.read_csv('Testing.csv')
-cols= training.columns
-cols= cols[:-1]
-x = training[cols]
-y = training['prognosis']
-y1= y
+def train_models():
+    """The original start-up: fit the tree from Training.csv and print its scores and an SVM's."""
+    global cols, symptom_index, reduced_data, le, clf, symptoms_dict
+    import pandas as pd
+    from sklearn import preprocessing
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.model_selection import cross_val_score
+    from sklearn.svm import SVC
 
+    training = pd.read_csv('Training.csv')
+    testing= pd.read_csv('Testing.csv')
+    cols= training.columns
+    cols= cols[:-1]
+    symptom_index = SymptomIndex(cols)
+    x = training[cols]
+    y = training['prognosis']
 
-reduced_data = training.groupby(training['prognosis']).max()
 
-#mapping strings to numbers
-le = preprocessing.LabelEncoder()
-le.fit(y)
-y = le.transform(y)
+    reduced_data = training.groupby(training['prognosis']).max()
 
+    #mapping strings to numbers
+    le = preprocessing.LabelEncoder()
+    le.fit(y)
+    y = le.transform(y)
 
-x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.33, random_state=42)
-testx    = testing[cols]
-testy    = testing['prognosis']  
-testy    = le.transform(testy)
 
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.33, random_state=42)
+    testx    = testing[cols]
+    testy    = testing['prognosis']
+    testy    = le.transform(testy)
 
-clf1  = DecisionTreeClassifier()
-clf = clf1.fit(x_train,y_train)
-# print(clf.score(x_train,y_train))
-# print ("cross result========")
-scores = cross_val_score(clf, x_test, y_test, cv=3)
-# print (scores)
-print (scores.mean())
 
+    clf1  = DecisionTreeClassifier()
+    clf = clf1.fit(x_train,y_train)
+    # print(clf.score(x_train,y_train))
+    # print ("cross result========")
+    scores = cross_val_score(clf, x_test, y_test, cv=3)
+    # print (scores)
+    print (scores.mean())
 
-model=SVC()
-model.fit(x_train,y_train)
-print("for svm: ")
-print(model.score(x_test,y_test))
 
-importances = clf.feature_importances_
-indices = np.argsort(importances)[::-1]
-features = cols
+    model=SVC()
+    model.fit(x_train,y_train)
+    print("for svm: ")
+    print(model.score(x_test,y_test))
+
+    for index, symptom in enumerate(x):
+        symptoms_dict[symptom] = index
 
 def readn(nstr):
+    import pyttsx3
     engine = pyttsx3.init()
 
     engine.setProperty('voice', "english+f5")
@@ -70,12 +84,10 @@ precautionDictionary=dict()
 
 symptoms_dict = {}
 
-for index, symptom in enumerate(x):
-       symptoms_dict[symptom] = index
 def calc_condition(exp,days):
     sum=0
     for item in exp:
-         sum=sum+severityDictionary[item]
+         sum=sum+severityDictionary.get(item, 0)
     if((sum*days)/(len(exp)+1)>13):
         print("You should take the consultation from doctor. ")
     else:
@@ -125,17 +137,18 @@ def getInfo():
     name=input("")
     print("Hello, ",name)
 
-def check_pattern(dis_list,inp):
-    pred_list=[]
-    inp=inp.replace(' ','_')
-    patt = f"{inp}"
-    regexp = re.compile(patt)
-    pred_list=[item for item in dis_list if regexp.search(item)]
+def check_pattern(index,inp):
+    pred_list=index.search(inp)
     if(len(pred_list)>0):
         return 1,pred_list
     else:
         return 0,[]
 def sec_predict(symptoms_exp):
+    import numpy as np
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.tree import DecisionTreeClassifier
+
     df = pd.read_csv('Training.csv')
     X = df.iloc[:, :-1]
     y = df['prognosis']
@@ -151,27 +164,12 @@ def sec_predict(symptoms_exp):
     return rf_clf.predict([input_vector])
 
 
-def print_disease(node):
-    node = node[0]
-    val  = node.nonzero() 
-    disease = le.inverse_transform(val[0])
-    return list(map(lambda x:x.strip(),list(disease)))
-
-def tree_to_code(tree, feature_names):
-    tree_ = tree.tree_
-    feature_name = [
-        feature_names[i] if i != _tree.TREE_UNDEFINED else "undefined!"
-        for i in tree_.feature
-    ]
-
-    chk_dis=",".join(feature_names).split(",")
-    symptoms_present = []
-
+def ask_symptom(index):
     while True:
 
         print("\nEnter the symptom you are experiencing  \t\t",end="->")
         disease_input = input("")
-        conf,cnf_dis=check_pattern(chk_dis,disease_input)
+        conf,cnf_dis=check_pattern(index,disease_input)
         if conf==1:
             print("searches related to input: ")
             for num,it in enumerate(cnf_dis):
@@ -182,8 +180,7 @@ def tree_to_code(tree, feature_names):
             else:
                 conf_inp=0
 
-            disease_input=cnf_dis[conf_inp]
-            break
+            return cnf_dis[conf_inp]
             # print("Did you mean: ",cnf_dis,"?(yes/no) :",end="")
             # conf_inp = input("")
             # if(conf_inp=="yes"):
@@ -191,12 +188,69 @@ def tree_to_code(tree, feature_names):
         else:
             print("Enter valid symptom.")
 
+
+def ask_days():
     while True:
         try:
-            num_days=int(input("Okay. From how many days ? : "))
-            break
+            return int(input("Okay. From how many days ? : "))
         except:
             print("Enter valid input.")
+
+
+def ask_follow_ups(symptoms_given):
+    print("Are you experiencing any ")
+    symptoms_exp=[]
+    for syms in list(symptoms_given):
+        inp=""
+        print(syms,"? : ",end='')
+        while True:
+            inp=input("")
+            if(inp=="yes" or inp=="no"):
+                break
+            else:
+                print("provide proper answers i.e. (yes/no) : ",end="")
+        if(inp=="yes"):
+            symptoms_exp.append(syms)
+    return symptoms_exp
+
+
+def print_result(present_disease, second_prediction):
+    if(present_disease==second_prediction):
+        print("You may have ", present_disease)
+        print(description_list.get(present_disease, "No description available."))
+
+        # readn(f"You may have {present_disease}")
+        # readn(f"{description_list[present_disease]}")
+
+    else:
+        print("You may have ", present_disease, "or ", second_prediction)
+        print(description_list.get(present_disease, "No description available."))
+        print(description_list.get(second_prediction, "No description available."))
+
+    precution_list=precautionDictionary.get(present_disease, ["Consult a doctor."])
+    print("Take following measures : ")
+    for  i,j in enumerate(precution_list):
+        print(i+1,")",j)
+
+
+def print_disease(node):
+    node = node[0]
+    val  = node.nonzero() 
+    disease = le.inverse_transform(val[0])
+    return list(map(lambda x:x.strip(),list(disease)))
+
+def tree_to_code(tree, feature_names):
+    from sklearn.tree import _tree
+
+    tree_ = tree.tree_
+    feature_name = [
+        feature_names[i] if i != _tree.TREE_UNDEFINED else "undefined!"
+        for i in tree_.feature
+    ]
+
+    symptoms_present = []
+    disease_input = ask_symptom(symptom_index)
+    num_days = ask_days()
     def recurse(node, depth):
         indent = "  " * depth
         if tree_.feature[node] != _tree.TREE_UNDEFINED:
@@ -221,49 +275,78 @@ def tree_to_code(tree, feature_names):
             # if len(dis_list)!=0:
             #     print("symptoms present  " + str(list(symptoms_present)))
             # print("symptoms given "  +  str(list(symptoms_given)) )
-            print("Are you experiencing any ")
-            symptoms_exp=[]
-            for syms in list(symptoms_given):
-                inp=""
-                print(syms,"? : ",end='')
-                while True:
-                    inp=input("")
-                    if(inp=="yes" or inp=="no"):
-                        break
-                    else:
-                        print("provide proper answers i.e. (yes/no) : ",end="")
-                if(inp=="yes"):
-                    symptoms_exp.append(syms)
+            symptoms_exp = ask_follow_ups(symptoms_given)
 
             second_prediction=sec_predict(symptoms_exp)
             # print(second_prediction)
             calc_condition(symptoms_exp,num_days)
-            if(present_disease[0]==second_prediction[0]):
-                print("You may have ", present_disease[0])
-                print(description_list[present_disease[0]])
-
-                # readn(f"You may have {present_disease[0]}")
-                # readn(f"{description_list[present_disease[0]]}")
-
-            else:
-                print("You may have ", present_disease[0], "or ", second_prediction[0])
-                print(description_list[present_disease[0]])
-                print(description_list[second_prediction[0]])
-
-            # print(description_list[present_disease[0]])
-            precution_list=precautionDictionary[present_disease[0]]
-            print("Take following measures : ")
-            for  i,j in enumerate(precution_list):
-                print(i+1,")",j)
+            print_result(present_disease[0], second_prediction[0])
 
             # confidence_level = (1.0*len(symptoms_present))/len(symptoms_given)
             # print("confidence level is " + str(confidence_level))
 
     recurse(0, 1)
-getSeverityDict()
-getDescription()
-getprecautionDict()
-getInfo()
-tree_to_code(clf,cols)
-print("----------------------------------------------------------------------------------------")
+
+
+def kiosk(model_path):
+    """The same conversation, answered by the prebuilt artifact with no training.
+
+    Walking the tree with only the entered symptom set (as ``recurse`` does) is
+    a plain prediction on that one symptom, and the second prediction reuses the
+    same model instead of retraining one.
+    """
+    from model_artifact import load_model
+
+    model = load_model(model_path)
+    severityDictionary.update(model.severity)
+    description_list.update({disease.strip(): text for disease, text in model.descriptions.items()})
+    precautionDictionary.update({disease.strip(): steps for disease, steps in model.precautions.items()})
+    freq = model.arrays['disease_symptom_freq']
+
+    getInfo()
+    disease_input = ask_symptom(SymptomIndex(model.symptoms))
+    num_days = ask_days()
+
+    present = model.tree.predict_indices([model.symptom_index[disease_input]])
+    symptoms_given = [model.symptoms[i] for i in freq[present].nonzero()[0]]
+    symptoms_exp = ask_follow_ups(symptoms_given)
+
+    second = model.tree.predict_indices([model.symptom_index[name] for name in symptoms_exp])
+    calc_condition(symptoms_exp, num_days)
+    print_result(model.classes[present].strip(), model.classes[second].strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HealthCare ChatBot (command line).')
+    parser.add_argument('--kiosk', action='store_true',
+                        help='use the prebuilt model artifact instead of training at start-up')
+    parser.add_argument('--batch', metavar='INPUT',
+                        help='screen NDJSON records ({"symptoms": [...], "days": N} per line, - for stdin)')
+    parser.add_argument('--output', default='-', help='NDJSON results for --batch (default: stdout)')
+    parser.add_argument('--workers', type=int, default=None, help='processes for --batch (default: one per CPU)')
+    parser.add_argument('--model', default=None,
+                        help='artifact path for --kiosk/--batch (default: $CHATBOT_MODEL_PATH or symptom_model.bin)')
+    args = parser.parse_args()
+
+    if args.batch:
+        from batch_screening import main as screen_batch
+        from model_artifact import DEFAULT_MODEL_PATH
+        screen_batch(args.model or os.environ.get('CHATBOT_MODEL_PATH', DEFAULT_MODEL_PATH),
+                     args.batch, args.output, args.workers)
+        return
+    if args.kiosk:
+        from model_artifact import DEFAULT_MODEL_PATH
+        kiosk(args.model or os.environ.get('CHATBOT_MODEL_PATH', DEFAULT_MODEL_PATH))
+    else:
+        train_models()
+        getSeverityDict()
+        getDescription()
+        getprecautionDict()
+        getInfo()
+        tree_to_code(clf,cols)
+    print("----------------------------------------------------------------------------------------")
+
+
+if __name__ == '__main__':
+    main()
 
@@ -1,172 +1,569 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, g, request, jsonify, session, stream_with_context
 from flask_cors import CORS
 from flask_session import Session
-import pandas as pd
-from sklearn import preprocessing
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.model_selection import train_test_split
+from concurrent.futures import TimeoutError as FutureTimeout
+from itertools import islice
+import hmac
+import json
 import numpy as np
-import csv
-import re
+import os
+import time
 import uuid
+from conversation_state import MAX_DAYS, ConversationState, TokenCodec
+from event_log import EventLog
+from session_store import MemoryStore, SQLiteStore, StateSessionInterface, start_sweeper
+from model_artifact import BASE_DIR, DEFAULT_MODEL_PATH
+from microbatcher import MicroBatcher
+from model_registry import ModelRegistry
+from patient_auth import PatientAuthenticator
+from record_handoff import RecordHandoff
+from result_cache import ResultCache, symptom_mask
+from symptom_extractor import parse_days
+import triage
 
 app = Flask(__name__)
-CORS(app, resources={r"/chatbot/*": {"origins": "http://localhost:3000", "headers": "Content-Type", "supports_credentials": True}})
-app.config['SESSION_TYPE'] = 'filesystem'
-app.secret_key = 'your-secret-key-hihihihiiihihihihiihihihihihihihihihihi'  # Secure secret key for sessions
-Session(app)
-
-# Load and prepare data
-training = pd.read_csv('Training.csv')
-cols = training.columns[:-1]  # All symptoms (features)
-x = training[cols]
-y = training['prognosis']
-
-le = preprocessing.LabelEncoder()
-le.fit(y)
-y = le.transform(y)
-
-x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.33, random_state=42)
-clf = DecisionTreeClassifier().fit(x_train, y_train)
-
-# Load additional data
-severityDictionary = {}
-description_list = {}
-precautionDictionary = {}
-symptoms_dict = {symptom: index for index, symptom in enumerate(cols)}
-
-def load_severity():
-    with open('Symptom_severity.csv') as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        for row in csv_reader:
-            if len(row) > 1:
-                severityDictionary[row[0]] = int(row[1])
-
-def load_descriptions():
-    with open('symptom_Description.csv') as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        for row in csv_reader:
-            description_list[row[0]] = row[1]
-
-def load_precautions():
-    with open('symptom_precaution.csv') as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        for row in csv_reader:
-            precautionDictionary[row[0]] = row[1:]
-
-load_severity()
-load_descriptions()
-load_precautions()
-
-def check_pattern(dis_list, inp):
-    pred_list = []
-    inp = inp.replace(' ', '_')
-    patt = f"{inp}"
-    regexp = re.compile(patt, re.IGNORECASE)
-    pred_list = [item for item in dis_list if regexp.search(item)]
+CORS(app, resources={r"/chatbot/*": {"origins": "http://localhost:3000", "headers": ["Content-Type", "Authorization"], "supports_credentials": True}})
+# Signs session cookies and conversation tokens; every replica needs the same key.
+app.secret_key = os.environ.get('CHATBOT_SECRET_KEY')
+if not app.secret_key:
+    raise RuntimeError("CHATBOT_SECRET_KEY is not set; use a long random string shared by all replicas.")
+
+# 'session': conversation state lives server-side (Flask-Session).
+# 'token': the state travels as a signed token in each request/response, so the
+#          server does no storage I/O per turn and any replica can answer.
+STATE_MODE = os.environ.get('CHATBOT_STATE_MODE', 'session')
+
+# Session backend for 'session' mode:
+# 'filesystem' (Flask-Session files), 'memory' (in-process LRU+TTL, single worker)
+# or 'sqlite' (WAL database shared by all workers on the host).
+SESSION_BACKEND = os.environ.get('CHATBOT_SESSION_BACKEND', 'filesystem')
+SESSION_TTL = int(os.environ.get('CHATBOT_SESSION_TTL', 3600))
+if STATE_MODE == 'session':
+    if SESSION_BACKEND == 'memory':
+        session_store = MemoryStore(SESSION_TTL, int(os.environ.get('CHATBOT_SESSION_MAX', 100000)))
+    elif SESSION_BACKEND == 'sqlite':
+        session_store = SQLiteStore(os.environ.get('CHATBOT_SESSION_DB', 'chatbot_sessions.db'), SESSION_TTL)
+    else:
+        session_store = None
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    if session_store is not None:
+        app.session_interface = StateSessionInterface(session_store, SESSION_TTL)
+        start_sweeper(session_store)
+token_codec = TokenCodec(app.secret_key)
+
+# Opt-in: finished conversations linked to a patient are queued and
+# batch-posted to medical_record as draft records, off the request path.
+RECORDS_URL = os.environ.get('CHATBOT_RECORDS_URL')
+record_handoff = RecordHandoff(
+    RECORDS_URL,
+    batch_size=int(os.environ.get('CHATBOT_RECORDS_BATCH', 50)),
+    concurrency=int(os.environ.get('CHATBOT_RECORDS_CONCURRENCY', 2)),
+    headers={'Host': 'localhost'},
+) if RECORDS_URL else None
+
+# Conversations are linked to a patient only through the patient_id claim of a
+# verified auth_service access token (see patient_auth.py).
+patient_auth = PatientAuthenticator(
+    os.environ.get('JWT_SIGNING_KEY'),
+    os.environ.get('AUTH_REVOKED_URL', 'http://auth_service:8000/api/auth/revoked/'),
+    headers={'Host': 'localhost'},
+)
+
+# Conversation events (one compact record per turn) for drop-off analysis,
+# written in the background to rotating gzip NDJSON segments. Off unless a
+# directory is configured.
+EVENT_LOG_DIR = os.environ.get('CHATBOT_EVENT_LOG_DIR')
+event_log = EventLog(
+    EVENT_LOG_DIR,
+    max_queue=int(os.environ.get('CHATBOT_EVENT_QUEUE', 10000)),
+    segment_bytes=int(os.environ.get('CHATBOT_EVENT_SEGMENT_MB', 64)) * 1024 * 1024,
+    segment_seconds=int(os.environ.get('CHATBOT_EVENT_SEGMENT_SECONDS', 3600)),
+) if EVENT_LOG_DIR else None
+
+# Load the prebuilt model artifact (see build_model.py). It is memory-mapped, so
+# every worker shares the same pages and no training happens at import time.
+# The registry serves the version named in CHATBOT_MODEL_DIR/CURRENT once a
+# retrain has produced one, and swaps in new versions without a restart.
+MODEL_PATH = os.environ.get('CHATBOT_MODEL_PATH', DEFAULT_MODEL_PATH)
+MODEL_DIR = os.environ.get('CHATBOT_MODEL_DIR', os.path.join(BASE_DIR, 'models'))
+ADMIN_TOKEN = os.environ.get('CHATBOT_ADMIN_TOKEN')
+registry = ModelRegistry(MODEL_DIR, seed_path=MODEL_PATH,
+                         data_dir=os.environ.get('CHATBOT_DATA_DIR', BASE_DIR))
+registry.load()
+
+def check_pattern(bundle, inp):
+    pred_list = bundle.matcher.search(inp)
+    if not pred_list:
+        # No literal match: fall back to synonyms and near-miss spellings.
+        pred_list = bundle.typo_index.lookup(inp)
     return 1 if len(pred_list) > 0 else 0, pred_list
 
-def predict_disease(symptoms_exp):
-    input_vector = np.zeros(len(symptoms_dict))
-    for item in symptoms_exp:
-        input_vector[symptoms_dict[item]] = 1
-    pred = clf.predict([input_vector])[0]
-    disease = le.inverse_transform([pred])[0]
-    description = description_list.get(disease, "No description available.")
-    precautions = precautionDictionary.get(disease, ["Consult a doctor."])
+TOP_K = int(os.environ.get('CHATBOT_TOP_K', 3))  # diseases in the differential
+
+# Formatted predictions keyed by (model version, present and absent symptom
+# bitmasks, k). A swap
+# empties it; the model id in the key keeps a racing request from caching a
+# stale result under the new version.
+prediction_cache = ResultCache(int(os.environ.get('CHATBOT_CACHE_SIZE', 4096)))
+registry.on_swap(lambda bundle: prediction_cache.clear())
+
+# Optional microbatching: concurrent cache misses are queued for a couple of
+# milliseconds and scored with one pair of matrix products.
+MICROBATCH = os.environ.get('CHATBOT_MICROBATCH', '0') == '1'
+MICROBATCH_TIMEOUT = 5  # seconds to wait for a batched result before computing inline
+
+def predict_disease(bundle, present, absent=(), k=TOP_K):
+    key = (bundle.model_id, symptom_mask(present), symptom_mask(absent), k)
+    result = prediction_cache.get(key)
+    if result is None:
+        future = microbatcher.submit((bundle, list(present), list(absent), k)) if microbatcher else None
+        try:
+            result = future.result(MICROBATCH_TIMEOUT) if future is not None else None
+        except FutureTimeout:
+            result = None
+        if result is None:
+            result = compute_prediction(bundle, present, absent, k)
+        prediction_cache.put(key, result)
+    return result
+
+def format_prediction(model, differential):
+    # The headline disease is the top of the differential, so the two always agree.
+    # Diseases the answers rule out (probability 0 at 4 decimals) are left out.
+    differential = differential[:1] + [d for d in differential[1:] if d["probability"] > 0]
+    disease = differential[0]["disease"]
     return {
         "disease": disease,
-        "description": description,
-        "precautions": precautions
+        "description": model.descriptions.get(disease, "No description available."),
+        "precautions": model.precautions.get(disease, ["Consult a doctor."]),
+        "differential": differential
     }
 
+def indicator_matrix(n_symptoms, symptom_lists):
+    X = np.zeros((len(symptom_lists), n_symptoms), dtype=np.uint8)
+    X[np.repeat(np.arange(len(symptom_lists)), [len(s) for s in symptom_lists]),
+      [i for s in symptom_lists for i in s]] = 1
+    return X
+
+def score(bundle, present, absent=None, k=TOP_K):
+    """Formatted predictions for every row of 0/1 present (and absent) symptom matrices.
+
+    Conversations, the microbatcher and batch scoring all come through here, so
+    one set of symptoms gets the same calibrated answer on every endpoint.
+    """
+    model = bundle.model
+    proba = model.ensemble.proba(present, absent)
+    return [format_prediction(model, differential) for differential in model.differentials(proba, k)]
+
+def compute_prediction(bundle, present, absent=(), k=TOP_K):
+    n = bundle.model.n_symptoms
+    return score(bundle, indicator_matrix(n, [present]), indicator_matrix(n, [absent]), k)[0]
+
+def compute_predictions(items):
+    """Microbatch handler: ``(bundle, present, absent, k)`` items in, results out in order."""
+    results = [None] * len(items)
+    groups = {}
+    for position, (bundle, present, absent, k) in enumerate(items):
+        groups.setdefault((id(bundle), k), []).append(position)
+    for positions in groups.values():
+        bundle, _, _, k = items[positions[0]]
+        n = bundle.model.n_symptoms
+        present = indicator_matrix(n, [items[position][1] for position in positions])
+        absent = indicator_matrix(n, [items[position][2] for position in positions])
+        for position, result in zip(positions, score(bundle, present, absent, k)):
+            results[position] = result
+    return results
+
+microbatcher = MicroBatcher(
+    compute_predictions,
+    max_batch=int(os.environ.get('CHATBOT_MICROBATCH_MAX', 64)),
+    max_wait=float(os.environ.get('CHATBOT_MICROBATCH_WAIT_MS', 2)) / 1000,
+    max_queue=int(os.environ.get('CHATBOT_MICROBATCH_QUEUE', 1024)),
+) if MICROBATCH else None
+
+def load_state():
+    if STATE_MODE == 'token':
+        return token_codec.loads((request.get_json(silent=True) or {}).get('token'))
+    packed = session.get('state')
+    return ConversationState.unpack(packed) if packed else None
+
+def log_turn(state, payload):
+    turn = g.get('turn')
+    if event_log is None or turn is None:
+        return
+    event = {
+        "ts": round(time.time(), 3),
+        "cid": format(turn['cid'], '016x'),
+        "step": turn['step'],
+        "next": state.step if state is not None else None,
+        "ms": round((time.perf_counter() - turn['started']) * 1000, 2),
+    }
+    if state is not None:
+        event["present"] = bin(state.present).count('1')
+        event["asked"] = state.asked
+    if turn.get('model'):
+        event["model"] = turn['model']
+    if payload.get('finished'):
+        event["disease"] = payload['differential'][0]['disease']
+        event["tier"] = payload['triage']['tier']
+    event_log.emit(event)
+
+def reply(state, payload):
+    """Persist ``state`` (``None`` ends the conversation) and return ``payload`` as JSON."""
+    log_turn(state, payload)
+    if STATE_MODE == 'token':
+        if state is not None:
+            payload['token'] = token_codec.dumps(state)
+    elif state is None:
+        session.clear()
+    else:
+        session['state'] = state.pack()
+    return jsonify(payload)
+
+def symptom_name(bundle, index):
+    return bundle.model.symptoms[index].replace('_', ' ')
+
 @app.route('/chatbot/start', methods=['POST'])
 def start_conversation():
-    session.clear()
-    session['symptoms_exp'] = []
-    session['step'] = 'greet'
-    return jsonify({"message": "Hello! I’m your HealthCare ChatBot. What’s your name?"})
+    if STATE_MODE == 'session':
+        session.clear()
+    state = ConversationState(patient_id=patient_auth.patient_id(request.headers.get('Authorization')))
+    g.turn = {'cid': state.conversation_id, 'step': None, 'started': time.perf_counter()}
+    return reply(state, {"message": "Hello! I’m your HealthCare ChatBot. What’s your name?"})
 
 @app.route('/chatbot/respond', methods=['POST'])
 def respond():
     user_input = request.json.get('input', '').strip()
-    if 'step' not in session:
+    started = time.perf_counter()
+    state = load_state()
+    if state is None:
+        if event_log is not None:
+            event_log.emit({"ts": round(time.time(), 3), "step": "no_state"})
         return jsonify({"error": "Please start the conversation first."}), 400
 
-    step = session['step']
-    symptoms_exp = session['symptoms_exp']
+    # Pin one model version for the whole turn, even if a retrain swaps it meanwhile.
+    bundle = registry.current
+    step = state.step
+    g.turn = {'cid': state.conversation_id, 'step': step, 'started': started, 'model': bundle.model_id}
 
     if step == 'greet':
-        session['name'] = user_input
-        session['step'] = 'initial_symptom'
-        return jsonify({"message": f"Hello, {user_input}! Please tell me the first symptom you’re experiencing."})
+        state.name = user_input
+        state.step = 'initial_symptom'
+        return reply(state, {"message": f"Hello, {user_input}! Please tell me the symptoms you’re experiencing and for how many days."})
 
     elif step == 'initial_symptom':
-        found, matches = check_pattern(cols, user_input)
+        # A full sentence ("fever, headache and joint pain for 3 days") is parsed
+        # in one pass; a single bare symptom keeps the pick-from-matches flow.
+        extracted, days = bundle.extractor.extract_ids(user_input)
+        if len(extracted) > 1 or (extracted and days is not None):
+            for index in extracted:
+                state.add_present(index)
+            names = ", ".join(symptom_name(bundle, i) for i in extracted)
+            if days is None:
+                state.step = 'days'
+                return reply(state, {"message": f"Okay, you’ve had {names}. For how many days?"})
+            state.days = days
+            return begin_follow_up(bundle, state, f"Okay, you’ve had {names} for {days} days.\n")
+
+        found, matches = check_pattern(bundle, user_input)
         if not found:
-            return jsonify({"message": "Sorry, I didn’t recognize that symptom. Please try again."})
-        session['matches'] = matches
-        session['step'] = 'select_symptom'
+            return reply(state, {"message": "Sorry, I didn’t recognize that symptom. Please try again."})
+        state.candidates = [bundle.model.symptom_index[m] for m in matches]
+        state.step = 'select_symptom'
         matches_list = "\n".join([f"{i}) {m.replace('_', ' ')}" for i, m in enumerate(matches)])
-        return jsonify({"message": f"I found these related symptoms:\n{matches_list}\nSelect the one you meant (enter the number):"})
+        return reply(state, {"message": f"I found these related symptoms:\n{matches_list}\nSelect the one you meant (enter the number):"})
 
     elif step == 'select_symptom':
         try:
             choice = int(user_input)
-            matches = session['matches']
-            if 0 <= choice < len(matches):
-                selected_symptom = matches[choice]
-                symptoms_exp.append(selected_symptom)
-                session['symptoms_exp'] = symptoms_exp
-                session['days'] = None
-                session['step'] = 'days'
-                return jsonify({"message": f"Okay, you’ve had {selected_symptom.replace('_', ' ')}. For how many days?"})
-            else:
-                return jsonify({"message": "Invalid selection. Please enter a valid number."})
         except ValueError:
-            return jsonify({"message": "Please enter a number."})
+            return reply(state, {"message": "Please enter a number."})
+        if 0 <= choice < len(state.candidates):
+            selected = state.candidates[choice]
+            state.add_present(selected)
+            state.candidates = []
+            state.days = None
+            state.step = 'days'
+            return reply(state, {"message": f"Okay, you’ve had {symptom_name(bundle, selected)}. For how many days?"})
+        else:
+            return reply(state, {"message": "Invalid selection. Please enter a valid number."})
 
     elif step == 'days':
         try:
             days = int(user_input)
-            session['days'] = days
-            session['remaining_questions'] = [s for s in cols if s not in symptoms_exp][:10]  # Limit to 10 follow-ups
-            session['step'] = 'follow_up'
-            if session['remaining_questions']:
-                next_symptom = session['remaining_questions'].pop(0)
-                session['current_question'] = next_symptom
-                return jsonify({"message": f"Are you experiencing {next_symptom.replace('_', ' ')}? (yes/no)"})
-            else:
-                return end_conversation()
         except ValueError:
-            return jsonify({"message": "Please enter a valid number of days."})
+            days = parse_days(user_input)
+        if days is None or not 0 <= days <= MAX_DAYS:
+            return reply(state, {"message": "Please enter a valid number of days."})
+        state.days = days
+        return begin_follow_up(bundle, state)
 
     elif step == 'follow_up':
-        current_question = session['current_question']
         if user_input.lower() in ['yes', 'y']:
-            symptoms_exp.append(current_question)
-            session['symptoms_exp'] = symptoms_exp
-        remaining_questions = session['remaining_questions']
-        if remaining_questions:
-            next_symptom = remaining_questions.pop(0)
-            session['current_question'] = next_symptom
-            session['remaining_questions'] = remaining_questions
-            return jsonify({"message": f"Are you experiencing {next_symptom.replace('_', ' ')}? (yes/no)"})
+            state.add_present(state.current)
         else:
-            return end_conversation()
+            state.add_absent(state.current)
+        return ask_next_question(bundle, state)
 
     return jsonify({"error": "Something went wrong."}), 500
 
-def end_conversation():
-    symptoms_exp = session['symptoms_exp']
-    result = predict_disease(symptoms_exp)
+def begin_follow_up(bundle, state, prefix=""):
+    state.absent = 0
+    state.asked = 0
+    state.step = 'follow_up'
+    return ask_next_question(bundle, state, prefix)
+
+def ask_next_question(bundle, state, prefix=""):
+    # Ask whichever symptom best separates the diseases still in play; stop once
+    # one disease dominates or after planner.max_questions questions.
+    next_index = bundle.planner.next_question(state.present_indices(), state.absent_indices(), state.asked)
+    if next_index is None:
+        return end_conversation(bundle, state)
+    state.current = next_index
+    state.asked += 1
+    return reply(state, {"message": f"{prefix}Are you experiencing {symptom_name(bundle, next_index)}? (yes/no)"})
+
+def end_conversation(bundle, state):
+    result = predict_disease(bundle, state.present_indices(), state.absent_indices())
+    others = [d for d in result['differential'] if d['disease'] != result['disease']]
     message = (
         f"Based on your symptoms, you may have {result['disease']}.\n"
         f"{result['description']}\n"
         "Take these measures:\n" + "\n".join([f"{i+1}) {p}" for i, p in enumerate(result['precautions'])])
     )
-    session.clear()
-    return jsonify({"message": message, "finished": True})
+    if others:
+        message += "\nOther possibilities: " + ", ".join(f"{d['disease']} ({d['probability']:.0%})" for d in others)
+    present = indicator_matrix(bundle.model.n_symptoms, [state.present_indices()])
+    assessment = triage.assessment(triage.scores(present, [state.days or 0], bundle.severity)[0])
+    message += "\n" + assessment['advice']
+    if record_handoff is not None and state.patient_id:
+        record_handoff.submit(assessment_record(bundle, state, result, assessment, message))
+    return reply(None, {"message": message, "finished": True, "differential": result['differential'],
+                        "triage": assessment})
+
+def assessment_record(bundle, state, result, assessment, message):
+    """Draft medical record for a finished conversation linked to a patient."""
+    symptoms = [symptom_name(bundle, i) for i in state.present_indices()]
+    content = f"{message}\nReported for {state.days} days. Triage score {assessment['score']} ({assessment['tier']})."
+    return {
+        # The conversation id makes redelivery idempotent on the receiving side.
+        "external_id": f"chatbot-{state.conversation_id:016x}",
+        "patient_id": state.patient_id,
+        "subject": f"Chatbot assessment: {result['disease']}"[:200],
+        "content": content,
+        "diagnosis": result['disease'],
+        "symtoms": ", ".join(symptoms),
+        "source": "chatbot",
+    }
+
+BATCH_CHUNK = 4096  # rows per vectorized prediction
+NDJSON = 'application/x-ndjson'
+
+def resolve_symptoms(bundle, names):
+    symptoms_dict = bundle.model.symptom_index
+    indices, unknown = [], []
+    for name in names:
+        # Anything but a string (a number, a nested list or object) is just unknown.
+        index = symptoms_dict.get(name) if isinstance(name, str) else None
+        if index is None and isinstance(name, str):
+            index = symptoms_dict.get(name.strip().replace(' ', '_'))
+        if index is None:
+            unknown.append(name)
+        else:
+            indices.append(index)
+    return indices, unknown
+
+def iter_body_lines(chunk_size=1 << 16):
+    # request.stream iterates byte by byte; read large chunks and split ourselves.
+    pending = b''
+    while True:
+        chunk = request.stream.read(chunk_size)
+        if not chunk:
+            break
+        *lines, pending = (pending + chunk).split(b'\n')
+        yield from lines
+    if pending:
+        yield pending
+
+def iter_batch_rows():
+    """Yield each row's symptom list (``None`` for a malformed row) from a JSON or NDJSON body."""
+    if request.mimetype == NDJSON:
+        for line in iter_body_lines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            row = row.get('symptoms') if isinstance(row, dict) else row
+            yield row if isinstance(row, list) else None
+    else:
+        # predict_batch has checked that the body is an object with a 'symptoms' list.
+        for row in request.get_json(silent=True)['symptoms']:
+            yield row if isinstance(row, list) else None
+
+def predict_rows(bundle, rows, k=TOP_K):
+    # One boolean matrix and one matrix product per chunk. Rows without a single
+    # known symptom are not scored: any disease would be a guess.
+    X = np.zeros((len(rows), bundle.model.n_symptoms), dtype=np.uint8)
+    unknown = []
+    for r, names in enumerate(rows):
+        indices, missing = resolve_symptoms(bundle, names or [])
+        X[r, indices] = 1
+        unknown.append(missing)
+    known = X.any(axis=1)
+    scored = iter(score(bundle, X[known], k=k))
+    for names, has_symptoms, missing in zip(rows, known.tolist(), unknown):
+        if names is None:
+            yield {"error": "Each row must be a list of symptoms."}
+            continue
+        result = next(scored) if has_symptoms else {"error": "No known symptoms in this row."}
+        if missing:
+            result["unknown_symptoms"] = missing
+        yield result
+
+def iter_batch_results(k=TOP_K):
+    bundle = registry.current
+    rows = iter_batch_rows()
+    while True:
+        chunk = list(islice(rows, BATCH_CHUNK))
+        if not chunk:
+            return
+        yield from predict_rows(bundle, chunk, k)
+
+@app.route('/chatbot/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many symptom sets at once.
+
+    Body: ``{"symptoms": [["itching", "skin_rash"], ...]}`` or NDJSON with one
+    symptom list (or ``{"symptoms": [...]}``) per line. Results come back in
+    input order, streamed as NDJSON when the request is NDJSON or accepts it.
+    ``?top_k=N`` sets the size of each row's differential.
+    """
+    k = max(1, request.args.get('top_k', TOP_K, type=int))
+    if request.mimetype != NDJSON:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('symptoms'), list):
+            return jsonify({"error": "Send a JSON body with a 'symptoms' list or NDJSON lines."}), 400
+    if request.mimetype == NDJSON or request.accept_mimetypes.best == NDJSON:
+        lines = (json.dumps(result) + "\n" for result in iter_batch_results(k))
+        return Response(stream_with_context(lines), mimetype=NDJSON)
+    return jsonify({"results": list(iter_batch_results(k))})
+
+def parse_triage_days(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        days = value
+    elif isinstance(value, str):
+        days = int(value) if value.strip().isdigit() else parse_days(value)
+    else:
+        return None
+    # The conversation's bound; the comparison also rejects NaN and infinity.
+    return days if days is not None and 0 <= days <= MAX_DAYS else None
+
+def triage_matrix(bundle, patients):
+    """0/1 symptom matrix, day counts and per-row errors/unknown names for ``patients``."""
+    X = np.zeros((len(patients), bundle.model.n_symptoms), dtype=np.uint8)
+    days = np.zeros(len(patients))
+    errors, unknown = [], []
+    for r, patient in enumerate(patients):
+        names = patient.get('symptoms') if isinstance(patient, dict) else None
+        day_count = parse_triage_days(patient.get('days')) if isinstance(patient, dict) else None
+        if not isinstance(names, list) or day_count is None:
+            errors.append(f"Each entry needs a 'symptoms' list and a 'days' between 0 and {MAX_DAYS}.")
+            unknown.append([])
+            continue
+        indices, missing = resolve_symptoms(bundle, names)
+        X[r, indices] = 1
+        days[r] = day_count
+        errors.append(None)
+        unknown.append(missing)
+    return X, days, errors, unknown
+
+@app.route('/chatbot/triage', methods=['POST'])
+def triage_one():
+    """Urgency score and tier for ``{"symptoms": [...], "days": 3}``."""
+    bundle = registry.current
+    X, days, errors, unknown = triage_matrix(bundle, [request.get_json(silent=True)])
+    if errors[0]:
+        return jsonify({"error": errors[0]}), 400
+    result = triage.assessment(triage.scores(X, days, bundle.severity)[0])
+    if unknown[0]:
+        result["unknown_symptoms"] = unknown[0]
+    return jsonify(result)
+
+@app.route('/chatbot/triage/batch', methods=['POST'])
+def triage_batch():
+    """Rank a waiting list: ``{"patients": [{"id": ..., "symptoms": [...], "days": 3}, ...]}``.
+
+    Results come back most urgent first; ``index`` is the position in the
+    request and ``id`` is echoed when given. Invalid entries come last.
+    """
+    body = request.get_json(silent=True)
+    patients = body.get('patients') if isinstance(body, dict) else None
+    if not isinstance(patients, list):
+        return jsonify({"error": "Send a JSON body with a 'patients' list."}), 400
+    bundle = registry.current
+    X, days, errors, unknown = triage_matrix(bundle, patients)
+    score = triage.scores(X, days, bundle.severity)
+    valid = np.array([e is None for e in errors], dtype=bool)
+    # Most urgent first; stable, so equal scores keep their waiting-list order.
+    order = np.argsort(np.where(valid, -score, np.inf), kind='stable')
+    results = []
+    for index in order.tolist():
+        patient = patients[index]
+        result = {"index": index}
+        if isinstance(patient, dict) and 'id' in patient:
+            result["id"] = patient['id']
+        if errors[index]:
+            result["error"] = errors[index]
+        else:
+            result.update(triage.assessment(score[index]))
+            if unknown[index]:
+                result["unknown_symptoms"] = unknown[index]
+        results.append(result)
+    return jsonify({"results": results})
+
+@app.route('/chatbot/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the worker is up and answering."""
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@app.route('/chatbot/readyz', methods=['GET'])
+def readyz():
+    """Readiness: a model is loaded and requests can be served."""
+    if not registry.ready:
+        return jsonify({"status": "loading"}), 503
+    return jsonify({"status": "ready", "model_id": registry.current.model_id})
+
+def admin_allowed():
+    # No token configured means no admin access at all.
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode())
+
+@app.route('/chatbot/model', methods=['GET'])
+def model_status():
+    return jsonify({
+        **registry.status(),
+        "prediction_cache": prediction_cache.stats(),
+        "microbatcher": microbatcher.stats() if microbatcher else None,
+        "event_log": event_log.stats() if event_log else None,
+        "record_handoff": record_handoff.stats() if record_handoff else None,
+    })
+
+@app.route('/chatbot/model/retrain', methods=['POST'])
+def retrain_model():
+    """Retrain from CHATBOT_DATA_DIR in the background and swap the new version in."""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if not registry.retrain_async():
+        return jsonify({"message": "Retraining already in progress.", "model_id": registry.current.model_id}), 409
+    return jsonify({"message": "Retraining started.", "model_id": registry.current.model_id}), 202
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py).
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Compact conversation state for the chatbot.
+
+A conversation is reduced to a few integers: a random conversation id, the
+current step, bitmasks of the symptoms reported present/absent, the day count,
+the symptom being asked about, the candidate symptoms offered for selection and
+the number of follow-ups asked, plus the patient id when the conversation is
+linked to one. ``pack``/``unpack`` turn that into a few dozen bytes, which is
+what the server-side session stores and what the stateless token carries. A
+state of any other ``STATE_VERSION`` is refused, which ends that conversation.
+
+``TokenCodec`` signs the packed state (with a timestamp, so abandoned tokens
+expire) for ``CHATBOT_STATE_MODE=token``, where the whole state travels with
+each request and the server keeps nothing between turns.
+"""
+import base64
+import secrets
+import struct
+
+from itsdangerous import BadSignature, SignatureExpired, TimestampSigner
+
+STEPS = ('greet', 'initial_symptom', 'select_symptom', 'days', 'follow_up')
+STATE_VERSION = 3
+NO_VALUE = 0xFFFF
+MAX_DAYS = NO_VALUE - 1  # days is a uint16 and NO_VALUE means "not given"
+MAX_NAME_BYTES = 64
+TOKEN_MAX_AGE = 60 * 60  # seconds
+
+# version, step, asked, days, current question, mask length, candidates, name length,
+# conversation id, patient id (0 for none)
+_HEAD = struct.Struct('<BBBHHBBBQI')
+
+
+class ConversationState:
+    def __init__(self, step='greet', present=0, absent=0, days=None, current=None,
+                 candidates=(), asked=0, name='', conversation_id=None, patient_id=None):
+        # Random, so events from one conversation can be grouped without identifying anyone.
+        self.conversation_id = secrets.randbits(64) if conversation_id is None else conversation_id
+        self.patient_id = patient_id
+        self.step = step
+        self.present = present      # bitmask of symptom indices reported present
+        self.absent = absent        # bitmask of symptom indices reported absent
+        self.days = days
+        self.current = current      # symptom index of the pending yes/no question
+        self.candidates = list(candidates)  # symptom indices offered in select_symptom
+        self.asked = asked
+        self.name = name
+
+    @staticmethod
+    def indices(mask):
+        result = []
+        i = 0
+        while mask:
+            if mask & 1:
+                result.append(i)
+            mask >>= 1
+            i += 1
+        return result
+
+    def present_indices(self):
+        return self.indices(self.present)
+
+    def absent_indices(self):
+        return self.indices(self.absent)
+
+    def add_present(self, index):
+        self.present |= 1 << index
+
+    def add_absent(self, index):
+        self.absent |= 1 << index
+
+    def pack(self):
+        mask_len = max(self.present.bit_length(), self.absent.bit_length(), 1)
+        mask_len = (mask_len + 7) // 8
+        name = self.name.encode('utf-8')[:MAX_NAME_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+        candidates = self.candidates[:255]
+        head = _HEAD.pack(
+            STATE_VERSION,
+            STEPS.index(self.step),
+            min(self.asked, 255),
+            NO_VALUE if self.days is None else min(self.days, MAX_DAYS),
+            NO_VALUE if self.current is None else self.current,
+            mask_len,
+            len(candidates),
+            len(name),
+            self.conversation_id,
+            self.patient_id or 0,
+        )
+        return b''.join([
+            head,
+            self.present.to_bytes(mask_len, 'little'),
+            self.absent.to_bytes(mask_len, 'little'),
+            struct.pack(f'<{len(candidates)}H', *candidates),
+            name,
+        ])
+
+    @classmethod
+    def unpack(cls, data):
+        if data[0] != STATE_VERSION:
+            raise ValueError(f"unsupported conversation state version {data[0]}")
+        _, step, asked, days, current, mask_len, n_candidates, name_len, conversation_id, patient_id = \
+            _HEAD.unpack_from(data, 0)
+        offset = _HEAD.size
+        present = int.from_bytes(data[offset:offset + mask_len], 'little')
+        offset += mask_len
+        absent = int.from_bytes(data[offset:offset + mask_len], 'little')
+        offset += mask_len
+        candidates = struct.unpack_from(f'<{n_candidates}H', data, offset)
+        offset += 2 * n_candidates
+        name = bytes(data[offset:offset + name_len]).decode('utf-8')
+        return cls(
+            step=STEPS[step],
+            present=present,
+            absent=absent,
+            days=None if days == NO_VALUE else days,
+            current=None if current == NO_VALUE else current,
+            candidates=candidates,
+            asked=asked,
+            name=name,
+            conversation_id=conversation_id,
+            patient_id=patient_id or None,
+        )
+
+
+class TokenCodec:
+    """Signs packed states into URL-safe tokens and verifies them back."""
+
+    def __init__(self, secret_key, max_age=TOKEN_MAX_AGE):
+        self.signer = TimestampSigner(secret_key, salt='chatbot-conversation')
+        self.max_age = max_age
+
+    def dumps(self, state):
+        payload = base64.urlsafe_b64encode(state.pack()).rstrip(b'=')
+        return self.signer.sign(payload).decode('ascii')
+
+    def loads(self, token):
+        """Return the state carried by ``token``, or ``None`` if it is missing, forged or expired."""
+        if not token:
+            return None
+        try:
+            payload = self.signer.unsign(token, max_age=self.max_age)
+            payload += b'=' * (-len(payload) % 4)
+            return ConversationState.unpack(base64.urlsafe_b64decode(payload))
+        except (BadSignature, SignatureExpired, ValueError, struct.error, IndexError, UnicodeDecodeError):
+            return None
@@ -0,0 +1,103 @@
+"""Calibrated disease probabilities from two blended models.
+
+Every prediction path (finished conversations, the microbatcher and batch
+scoring) calls ``Ensemble.proba``, and the follow-up planner stops on the
+same probabilities, so one set of symptoms gets one answer everywhere.
+
+The blend is a weighted sum of two log-scores, passed through a softmax:
+
+* naive Bayes over the disease x symptom frequency matrix. It is the only
+  part that counts "no" answers, and a disease that never shows a reported
+  symptom gets probability 0.
+* the multinomial logistic regression, which ranks diseases from a few
+  reported symptoms better than naive Bayes does.
+
+``build_model.py`` picks both weights (which also set the temperature) to
+minimise log-loss on held-out rows reduced to partial reports: random
+subsets of one to three symptoms, some with "no" answers, and rows with
+symptoms randomly dropped.
+"""
+import numpy as np
+
+EPS = 1e-3  # frequency floor: a disease can show a symptom none of its training rows had
+NB_WEIGHTS = (0.25, 0.5, 0.75, 1.0, 1.5)
+LINEAR_WEIGHTS = (0.0, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0)
+
+
+def softmax(scores, temperature=1.0):
+    z = np.asarray(scores, dtype=np.float64) / temperature
+    z = z - z.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def log_loss(proba, labels):
+    picked = proba[np.arange(len(labels)), labels]
+    return float(-np.log(np.clip(picked, 1e-15, None)).mean())
+
+
+def blend(log_nb, linear_scores, nb_weight, linear_weight):
+    """Probabilities from the two log-scores; ``nb_weight`` must be positive."""
+    return softmax(nb_weight * log_nb + linear_weight * linear_scores)
+
+
+def calibrate(log_nb, linear_scores, labels, nb_weights=NB_WEIGHTS, linear_weights=LINEAR_WEIGHTS):
+    """The blend weights with the lowest log-loss on ``labels``."""
+    best = None
+    for nb_weight in nb_weights:
+        for linear_weight in linear_weights:
+            loss = log_loss(blend(log_nb, linear_scores, nb_weight, linear_weight), labels)
+            if best is None or loss < best[0]:
+                best = (loss, float(nb_weight), float(linear_weight))
+    return {'naive_bayes': best[1], 'linear': best[2], 'log_loss': best[0]}
+
+
+class Ensemble:
+    def __init__(self, disease_symptom_freq, linear_coef, linear_intercept, weights):
+        freq = np.asarray(disease_symptom_freq, dtype=np.float64)
+        clipped = np.clip(freq, EPS, 1 - EPS)
+        # (n_symptoms, n_classes), so a 0/1 symptom matrix multiplies straight in
+        self._log_yes = np.log(clipped).T
+        self._log_no = np.log1p(-clipped).T
+        self._never = (freq <= 0).T.astype(np.float64)
+        self._coef = np.asarray(linear_coef, dtype=np.float64).T
+        self._intercept = np.asarray(linear_intercept, dtype=np.float64)
+        self.nb_weight = weights['naive_bayes']
+        self.linear_weight = weights['linear']
+
+    @property
+    def n_symptoms(self):
+        return self._coef.shape[0]
+
+    def components(self, present, absent):
+        """``(log_nb, linear_scores)`` for every row of two 0/1 (n_samples, n_symptoms) matrices."""
+        present = np.asarray(present, dtype=np.float64)
+        absent = np.asarray(absent, dtype=np.float64)
+        log_nb = present @ self._log_yes + absent @ self._log_no
+        # Rule out diseases that never show a reported symptom, unless that rules out all of them.
+        excluded = present @ self._never > 0
+        excluded[excluded.all(axis=1)] = False
+        log_nb[excluded] = -np.inf
+        log_nb -= log_nb.max(axis=1, keepdims=True)
+        return log_nb, present @ self._coef + self._intercept
+
+    def proba(self, present, absent=None):
+        """Class probabilities for every row; ``absent`` defaults to no "no" answers."""
+        if absent is None:
+            absent = np.zeros_like(present)
+        return blend(*self.components(present, absent), self.nb_weight, self.linear_weight)
+
+    def proba_indices(self, present, absent=()):
+        """Class probabilities for one set of present (and absent) symptom indices."""
+        rows = np.zeros((2, self.n_symptoms))
+        rows[0, list(present)] = 1
+        rows[1, list(absent)] = 1
+        return self.proba(rows[:1], rows[1:])[0]
+
+
+def top_k(proba, k):
+    """Indices of the ``k`` most probable classes, most probable first."""
+    k = min(k, proba.shape[-1])
+    idx = np.argpartition(-proba, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(proba, idx, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(idx, order, axis=-1)
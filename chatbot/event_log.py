@@ -0,0 +1,155 @@
+"""Non-blocking structured event log.
+
+``emit`` puts a small dict on a bounded in-memory queue and returns at once;
+when the queue is full the event is dropped and counted, so logging never
+blocks or slows a request. A daemon thread drains the queue in batches and
+appends them as NDJSON to gzip segments named
+``events-<UTC start>-<pid>-<n>.ndjson.gz`` in ``directory``. A segment is closed
+and a new one started once it holds ``segment_bytes`` of uncompressed data or
+is ``segment_seconds`` old. Every batch is flushed with a gzip sync point, so
+a segment is readable up to its last batch even if the process dies.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_BATCH = 500
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_SECONDS = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    def __init__(self, directory, max_queue=DEFAULT_MAX_QUEUE, batch=DEFAULT_BATCH,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 segment_seconds=DEFAULT_SEGMENT_SECONDS):
+        self.directory = directory
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._segment = None
+        self._segment_path = None
+        self._segment_size = 0
+        self._segment_opened = 0.0
+        self.emitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.segments = 0
+        self.write_errors = 0
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def _ensure_writer(self):
+        # Started lazily so that each forked worker gets its own writer and segments.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize)
+                self._segment = None
+                self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def emit(self, event):
+        """Queue ``event`` (a JSON-serialisable dict); never blocks."""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(event)
+            self.emitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        events = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(events) < self.batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        while True:
+            events = self._drain()
+            if None in events:  # close() sentinel
+                self._write([e for e in events if e is not None])
+                self._close_segment()
+                return
+            self._write(events)
+
+    def _write(self, events):
+        if not events:
+            return
+        data = "".join(json.dumps(e, separators=(',', ':')) + "\n" for e in events).encode('utf-8')
+        try:
+            self._rotate_if_needed()
+            self._segment.write(data)
+            self._segment.flush()
+            self._segment_size += len(data)
+            self.written += len(events)
+        except OSError:
+            self.write_errors += 1
+            logger.exception("could not write %d events to %s", len(events), self._segment_path)
+            self._close_segment()
+
+    def _rotate_if_needed(self):
+        if self._segment is not None and (
+                self._segment_size >= self.segment_bytes
+                or time.monotonic() - self._segment_opened >= self.segment_seconds):
+            self._close_segment()
+        if self._segment is None:
+            stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+            name = f"events-{stamp}-{os.getpid()}-{self.segments}.ndjson.gz"
+            self._segment_path = os.path.join(self.directory, name)
+            self._segment = gzip.open(self._segment_path, 'ab')
+            self._segment_size = 0
+            self._segment_opened = time.monotonic()
+            self.segments += 1
+
+    def _close_segment(self):
+        if self._segment is not None:
+            try:
+                self._segment.close()
+            except OSError:
+                logger.exception("could not close %s", self._segment_path)
+            self._segment = None
+
+    def close(self, timeout=5):
+        """Flush what is queued and close the current segment (called at exit)."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "segments": self.segments,
+            "write_errors": self.write_errors,
+            "segment": self._segment_path,
+        }
@@ -0,0 +1,50 @@
+"""Production settings: ``gunicorn -c gunicorn.conf.py chatbot_api:app``.
+
+The app (and with it the memory-mapped model and the lookup structures built
+from it) is loaded once in the master before workers are forked, so every
+worker shares those pages copy-on-write instead of holding its own copy.
+
+``kill -HUP <master>`` reloads gracefully: the master first picks up any model
+version activated since it started, then replaces the workers one by one while
+the old ones finish their in-flight requests.
+"""
+import gc
+import logging
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get('CHATBOT_BIND', '0.0.0.0:5000')
+preload_app = True
+# The in-process session store cannot be shared across workers.
+_single_process = (os.environ.get('CHATBOT_STATE_MODE', 'session') == 'session'
+                   and os.environ.get('CHATBOT_SESSION_BACKEND') == 'memory')
+workers = int(os.environ.get('CHATBOT_WORKERS', 1 if _single_process else multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('CHATBOT_THREADS', 4))
+timeout = int(os.environ.get('CHATBOT_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('CHATBOT_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('CHATBOT_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def when_ready(server):
+    # Move everything allocated while loading into the permanent generation, so
+    # the collector in each worker never writes to (and un-shares) those pages.
+    gc.collect()
+    gc.freeze()
+    if _single_process and workers > 1:
+        logger.warning("CHATBOT_SESSION_BACKEND=memory keeps sessions per worker; use one worker or sqlite")
+
+
+def on_reload(server):
+    api = sys.modules.get('chatbot_api')
+    if api is not None:
+        api.registry.refresh()
+        logger.info("reloading workers with model %s", api.registry.current.model_id)
+        gc.collect()
+        gc.freeze()
@@ -0,0 +1,110 @@
+"""Collect concurrent prediction requests into one vectorized call.
+
+``MicroBatcher(fn)`` runs a daemon thread that waits for the first queued
+item, keeps collecting until ``max_batch`` items or ``max_wait`` seconds have
+passed, then calls ``fn(items)`` once and resolves each caller's future with
+its result. Under a burst, a hundred single-row predictions become a couple of
+matrix walks; when traffic is light an item waits at most ``max_wait``.
+
+When the queue is full ``submit`` returns ``None`` and the caller computes the
+result itself, so the batcher never turns into a source of errors.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.002  # seconds
+DEFAULT_MAX_QUEUE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT, max_queue=DEFAULT_MAX_QUEUE):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+        self.overflow = 0
+        self.max_depth = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self):
+        # Started lazily so that it also runs in processes forked after import.
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self._queue.maxsize)
+                self._thread = threading.Thread(target=self._run, name='microbatcher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, item):
+        """Queue ``item``; returns a ``Future`` for its result, or ``None`` if the queue is full."""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            self.overflow += 1
+            return None
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # One sleep and a non-blocking drain is much cheaper than a timed get()
+        # per item, and the first item never waits longer than max_wait.
+        if self._queue.qsize() < self.max_batch - 1:
+            time.sleep(self.max_wait)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.fn(items)
+            except Exception as exc:
+                logger.exception("microbatch of %d items failed", len(items))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+            if len(batch) > self.largest_batch:
+                self.largest_batch = len(batch)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "queue_capacity": self._queue.maxsize,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "overflow": self.overflow,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -0,0 +1,136 @@
+"""Read/write the prebuilt symptom model artifact.
+
+The artifact is a single file produced offline by ``build_model.py``:
+
+    MAGIC | uint32 format version | uint32 header length | JSON header | arrays
+
+The JSON header carries the small lookup tables (symptom names, disease labels,
+descriptions, precautions, severity, synonyms) and the dtype/shape/offset of
+every array.
+Arrays are 64-byte aligned and loaded with ``np.frombuffer`` over a read-only
+``mmap``, so every worker process maps the same page-cache pages instead of
+holding its own copy.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from ensemble import Ensemble, top_k
+from tree_engine import FlatTree
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'symptom_model.bin')
+
+MAGIC = b'SYMMODEL'
+ARTIFACT_VERSION = 4
+_PREFIX = struct.Struct('<8sII')
+_ALIGN = 64
+
+
+class ArtifactVersionError(ValueError):
+    """The artifact was written by an older/newer build_model.py and must be rebuilt."""
+
+
+def _pad(offset):
+    return (-offset) % _ALIGN
+
+
+def write_artifact(path, arrays, tables, model_id):
+    """Write ``arrays`` (name -> ndarray) and ``tables`` (JSON-able dict) to ``path``.
+
+    The file is written next to the target and renamed into place, so readers
+    never observe a half-written artifact.
+    """
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset += _pad(offset)
+        layout[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset += arr.nbytes
+
+    header = dict(tables)
+    header['format_version'] = ARTIFACT_VERSION
+    header['model_id'] = model_id
+    header['arrays'] = layout
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _PREFIX.size + len(header_bytes)
+    data_start += _pad(data_start)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, ARTIFACT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+        for name, arr in arrays.items():
+            f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(arr.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SymptomModel:
+    """A loaded artifact: lookup tables, the prediction ensemble and the read-only tree arrays.
+
+    The API predicts with ``ensemble``. ``tree`` answers ``chat_bot.py --kiosk``
+    and ``--batch``, which replay the original tree-walking CLI without sklearn.
+    """
+
+    def __init__(self, header, arrays, buffer=None):
+        self.model_id = header['model_id']
+        self.symptoms = header['symptoms']
+        self.classes = header['classes']
+        self.descriptions = header['descriptions']
+        self.precautions = header['precautions']
+        self.severity = header['severity']
+        self.synonyms = header.get('synonyms', {})
+        self.symptom_index = {symptom: index for index, symptom in enumerate(self.symptoms)}
+        self.arrays = arrays
+        self.tree = FlatTree(arrays['children_left'], arrays['children_right'],
+                             arrays['feature'], arrays['threshold'], arrays['value'])
+        self.ensemble = Ensemble(arrays['disease_symptom_freq'], arrays['linear_coef'],
+                                 arrays['linear_intercept'], header['ensemble'])
+        # Keep the mapping alive for as long as the arrays reference it.
+        self._buffer = buffer
+
+    @property
+    def n_symptoms(self):
+        return len(self.symptoms)
+
+    def differentials(self, proba, k):
+        """Top-``k`` ``[{"disease", "probability"}]`` for every row of a (n_samples, n_classes) probability matrix."""
+        idx = top_k(proba, k)
+        probabilities = np.take_along_axis(proba, idx, axis=-1).round(4).tolist()
+        return [
+            [{"disease": self.classes[i], "probability": p} for i, p in zip(row_idx, row_p)]
+            for row_idx, row_p in zip(idx.tolist(), probabilities)
+        ]
+
+
+def load_model(path=DEFAULT_MODEL_PATH):
+    """Memory-map the artifact at ``path`` and return a :class:`SymptomModel`."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a symptom model artifact")
+    if version != ARTIFACT_VERSION:
+        raise ArtifactVersionError(f"{path} has artifact format {version}, expected {ARTIFACT_VERSION}; rebuild it with build_model.py")
+
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_len]).decode('utf-8'))
+    data_start = _PREFIX.size + header_len
+    data_start += _pad(data_start)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arr = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+        arrays[name] = arr.reshape(spec['shape'])
+    return SymptomModel(header, arrays, buffer)
@@ -0,0 +1,235 @@
+"""Versioned model registry with background retraining and atomic swaps.
+
+Artifacts live in ``models_dir`` as ``<model_id>.bin``; a small ``CURRENT``
+file names the active one and is replaced atomically, so every worker process
+agrees on the live version. The registry hands out a ``ModelBundle`` - the
+memory-mapped model plus the lookup structures derived from it - and a request
+keeps using the bundle it started with, so a swap never changes the model
+under an in-flight request.
+
+Retraining runs ``build_model.py`` in a child process driven by a daemon
+thread: the fit never holds the GIL of the serving process, and request
+threads only ever see a single reference assignment when the new bundle goes
+live. Other workers notice the new ``CURRENT`` on their next request (the
+pointer file is stat'ed at most every ``check_interval`` seconds).
+
+Conversation state stores symptom indices, so retraining on a dataset with a
+different symptom vocabulary should be paired with a restart of open chats.
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from model_artifact import ARTIFACT_VERSION, BASE_DIR, ArtifactVersionError, load_model
+from question_planner import QuestionPlanner
+from symptom_extractor import SymptomExtractor
+from symptom_index import SymptomIndex
+from triage import severity_vector
+from typo_index import TypoIndex
+
+logger = logging.getLogger(__name__)
+
+POINTER = 'CURRENT'
+KEEP_VERSIONS = 3
+CHECK_INTERVAL = 5  # seconds between CURRENT checks
+BUILD_TIMEOUT = 30 * 60  # seconds
+
+
+class ModelBundle:
+    """A loaded model and everything derived from its vocabulary."""
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.loaded_at = time.time()
+        self.matcher = SymptomIndex(model.symptoms)
+        self.typo_index = TypoIndex(model.symptoms, model.synonyms)
+        self.extractor = SymptomExtractor(model.symptoms, model.synonyms)
+        self.planner = QuestionPlanner(model.arrays['disease_symptom_freq'], model.ensemble)
+        self.severity = severity_vector(model.symptoms, model.severity)
+
+    @property
+    def model_id(self):
+        return self.model.model_id
+
+
+class ModelRegistry:
+    def __init__(self, models_dir, seed_path=None, data_dir=BASE_DIR, check_interval=CHECK_INTERVAL):
+        self.models_dir = models_dir
+        self.seed_path = seed_path
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self._current = None
+        self._pointer_mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._retrain_thread = None
+        self._swap_listeners = []
+        self.last_error = None
+        self.last_retrain = None
+
+    # -- loading ---------------------------------------------------------
+
+    def _pointer_path(self):
+        return os.path.join(self.models_dir, POINTER)
+
+    def _read_pointer(self):
+        try:
+            with open(self._pointer_path()) as f:
+                name = f.read().strip()
+            return os.path.join(self.models_dir, name) if name else None
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Load the version named by ``CURRENT``, else the seed artifact (building it if needed)."""
+        path = self._read_pointer()
+        if path is None:
+            path = self.seed_path
+            try:
+                model = load_model(path)
+            except (FileNotFoundError, ArtifactVersionError):
+                # First run without the offline build step (or a stale artifact): build it once.
+                from build_model import build
+                build(path, self.data_dir)
+                model = load_model(path)
+        else:
+            model = load_model(path)
+        self._swap(ModelBundle(model, path))
+        return self._current
+
+    def on_swap(self, callback):
+        """Call ``callback(bundle)`` whenever a new version goes live."""
+        self._swap_listeners.append(callback)
+
+    def _swap(self, bundle):
+        previous = self._current
+        self._current = bundle
+        try:
+            self._pointer_mtime = os.stat(self._pointer_path()).st_mtime
+        except FileNotFoundError:
+            self._pointer_mtime = None
+        if previous is not None and previous.model.symptoms != bundle.model.symptoms:
+            logger.warning("model %s changed the symptom vocabulary; open conversations may be invalid",
+                           bundle.model_id)
+        for callback in self._swap_listeners:
+            callback(bundle)
+        logger.info("model %s is live", bundle.model_id)
+
+    def refresh(self):
+        """Pick up a version activated by another process, if ``CURRENT`` changed."""
+        try:
+            mtime = os.stat(self._pointer_path()).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        with self._lock:
+            path = self._read_pointer()
+            if path and (self._current is None or path != self._current.path):
+                try:
+                    self._swap(ModelBundle(load_model(path), path))
+                except (OSError, ValueError):
+                    logger.exception("could not load model %s", path)
+            self._pointer_mtime = mtime
+
+    @property
+    def ready(self):
+        return self._current is not None
+
+    @property
+    def current(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.refresh()
+        return self._current
+
+    # -- retraining ------------------------------------------------------
+
+    @property
+    def retraining(self):
+        return self._retrain_thread is not None and self._retrain_thread.is_alive()
+
+    def retrain_async(self):
+        """Start retraining in the background; returns False if one is already running."""
+        with self._lock:
+            if self.retraining:
+                return False
+            self._retrain_thread = threading.Thread(target=self._retrain, name='model-retrain', daemon=True)
+            self._retrain_thread.start()
+            return True
+
+    def _retrain(self):
+        os.makedirs(self.models_dir, exist_ok=True)
+        staging = os.path.join(self.models_dir, f".staging-{os.getpid()}.bin")
+        started = time.time()
+        try:
+            subprocess.run(
+                [sys.executable, os.path.join(BASE_DIR, 'build_model.py'),
+                 '--data-dir', self.data_dir, '--output', staging],
+                check=True, capture_output=True, timeout=BUILD_TIMEOUT,
+            )
+            model = load_model(staging)
+            path = os.path.join(self.models_dir, f"{model.model_id}.bin")
+            os.replace(staging, path)
+            self.activate(path)
+            self.last_error = None
+        except subprocess.CalledProcessError as exc:
+            self.last_error = exc.stderr.decode('utf-8', 'replace')[-2000:]
+            logger.error("model retraining failed:\n%s", self.last_error)
+        except Exception as exc:
+            self.last_error = str(exc)
+            logger.exception("model retraining failed")
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+            self.last_retrain = {'started_at': started, 'finished_at': time.time(), 'ok': self.last_error is None}
+
+    def activate(self, path):
+        """Make the artifact at ``path`` the live version for every worker."""
+        bundle = ModelBundle(load_model(path), path)
+        tmp = f"{self._pointer_path()}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            f.write(os.path.basename(path))
+        os.replace(tmp, self._pointer_path())
+        with self._lock:
+            self._swap(bundle)
+        self._prune()
+
+    def _prune(self):
+        versions = sorted(
+            (name for name in os.listdir(self.models_dir) if name.endswith('.bin') and not name.startswith('.')),
+            reverse=True,
+        )
+        active = os.path.basename(self._current.path)
+        for name in versions[KEEP_VERSIONS:]:
+            if name != active:
+                # Workers still mapping an old file keep their pages until they swap.
+                os.remove(os.path.join(self.models_dir, name))
+
+    def versions(self):
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(
+            (name[:-len('.bin')] for name in os.listdir(self.models_dir)
+             if name.endswith('.bin') and not name.startswith('.')),
+            reverse=True,
+        )
+
+    def status(self):
+        bundle = self.current
+        return {
+            "model_id": bundle.model_id,
+            "format_version": ARTIFACT_VERSION,
+            "loaded_at": bundle.loaded_at,
+            "symptoms": len(bundle.model.symptoms),
+            "diseases": len(bundle.model.classes),
+            "versions": self.versions(),
+            "retraining": self.retraining,
+            "last_retrain": self.last_retrain,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,68 @@
+"""Link a conversation to the logged-in patient through their access token.
+
+The patient id comes only from the ``patient_id`` claim of the
+``Authorization: Bearer`` access token issued by auth_service, never from the
+request body, so nobody can file draft records against another patient. The
+token is checked locally: an HS256 signature with the shared
+``JWT_SIGNING_KEY``, expiry and ``token_type == "access"``. Its JTI is then
+looked up once in auth_service's revoked-token list; a conversation start is
+rare enough to afford that call. A token that does not check out, or a lookup
+that fails, leaves the conversation anonymous instead of failing the request.
+"""
+import logging
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import jwt
+
+DEFAULT_TIMEOUT = 2  # seconds for the revocation lookup
+
+logger = logging.getLogger(__name__)
+
+
+class PatientAuthenticator:
+    def __init__(self, signing_key, revoked_url=None, timeout=DEFAULT_TIMEOUT, headers=None):
+        self.signing_key = signing_key
+        self.revoked_url = revoked_url
+        self.timeout = timeout
+        self.headers = headers or {}
+        if not signing_key:
+            logger.warning("JWT_SIGNING_KEY is not set; conversations will not be linked to patients")
+
+    def patient_id(self, authorization):
+        """The verified ``patient_id`` claim of a ``Bearer`` header value, else ``None``."""
+        if not self.signing_key or not authorization:
+            return None
+        scheme, _, raw = authorization.partition(' ')
+        if scheme.lower() != 'bearer' or not raw:
+            return None
+        try:
+            claims = jwt.decode(raw.strip(), self.signing_key, algorithms=['HS256'],
+                                options={'require': ['exp', 'jti']})
+        except jwt.InvalidTokenError:
+            return None
+        patient_id = claims.get('patient_id')
+        if claims.get('token_type') != 'access' or claims.get('role') != 'patient':
+            return None
+        if isinstance(patient_id, bool) or not isinstance(patient_id, int) or not 0 < patient_id < 2 ** 32:
+            return None
+        if self._revoked(str(claims['jti'])):
+            return None
+        return patient_id
+
+    def _revoked(self, jti):
+        if not self.revoked_url:
+            return False
+        url = f"{self.revoked_url}{urllib.parse.quote(jti, safe='')}/"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=self.headers), timeout=self.timeout):
+                return True
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return False
+            logger.warning("revocation lookup for %s failed: HTTP %s", jti, exc.code)
+        except (urllib.error.URLError, OSError) as exc:
+            logger.warning("revocation lookup for %s failed: %s", jti, exc)
+        # Cannot confirm the token is live: do not link the conversation.
+        return True
@@ -0,0 +1,64 @@
+"""Pick the next follow-up question by expected information gain.
+
+The artifact carries a disease x symptom frequency matrix (the share of each
+disease's training rows showing each symptom, i.e. ``reduced_data`` in
+``chat_bot.py`` with frequencies instead of a max).
+
+The belief over diseases is the calibrated ensemble's answer for the symptoms
+reported so far (see ``ensemble.py``). The next question is the unasked
+symptom whose yes/no answer is expected to reduce the entropy of that belief
+the most, with the answer's likelihood taken from the frequency matrix;
+questioning stops once one disease dominates or no question is informative.
+Because the stop rule reads the same probabilities the conversation is
+answered with, the disease that made questioning stop is the disease the
+patient is told about.
+"""
+import numpy as np
+
+from ensemble import EPS
+
+MAX_QUESTIONS = 10
+DOMINANCE = 0.9
+
+
+def _idx(items):
+    return np.fromiter(items, dtype=np.intp)
+
+
+def _entropy(p, axis=0):
+    return -(p * np.log(np.clip(p, 1e-12, None))).sum(axis=axis)
+
+
+class QuestionPlanner:
+    def __init__(self, disease_symptom_freq, ensemble, max_questions=MAX_QUESTIONS, dominance=DOMINANCE):
+        self.ensemble = ensemble
+        self.max_questions = max_questions
+        self.dominance = dominance
+        self.freq = np.clip(np.asarray(disease_symptom_freq, dtype=np.float64), EPS, 1 - EPS)
+
+    def posterior(self, present, absent):
+        """``(disease rows, probabilities)`` of the diseases still possible given the answers so far."""
+        proba = self.ensemble.proba_indices(present, absent)
+        rows = np.flatnonzero(proba > 0)
+        return rows, proba[rows] / proba[rows].sum()
+
+    def next_question(self, present, absent, asked=0):
+        """Symptom index to ask about next, or ``None`` when questioning should stop."""
+        if asked >= self.max_questions:
+            return None
+        rows, post = self.posterior(present, absent)
+        if post.max() >= self.dominance:
+            return None
+
+        p = self.freq[rows]
+        p_yes = post @ p
+        post_yes = post[:, None] * p / p_yes
+        post_no = post[:, None] * (1 - p) / (1 - p_yes)
+        gain = _entropy(post) - p_yes * _entropy(post_yes) - (1 - p_yes) * _entropy(post_no)
+        gain[_idx(present)] = -np.inf
+        gain[_idx(absent)] = -np.inf
+
+        best = int(np.argmax(gain))
+        if gain[best] <= 1e-6:
+            return None
+        return best
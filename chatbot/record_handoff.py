@@ -0,0 +1,179 @@
+"""Deliver finished assessments to the medical_record service in the background.
+
+``submit`` only appends to a bounded in-memory queue, so the chat response
+never waits on another service; a full queue drops the record and counts it.
+A daemon thread groups queued records into batches (up to ``batch_size``, or
+whatever arrived within ``flush_interval``) and posts them to the draft batch
+endpoint on a small thread pool, with at most ``concurrency`` requests in
+flight. Connection errors, 429 and 5xx responses are retried with jittered
+exponential backoff; every record carries an ``external_id``, so a retried
+batch does not create duplicates. Other 4xx responses are not retried.
+
+Records are held in memory only: whatever is still queued when the process is
+killed is lost (they are drafts, and the conversation itself is unaffected).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_CONCURRENCY = 2
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_TIMEOUT = 10  # seconds per request
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_MAX = 30  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, retryable):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RecordHandoff:
+    def __init__(self, url, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_queue=DEFAULT_MAX_QUEUE, concurrency=DEFAULT_CONCURRENCY,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=DEFAULT_TIMEOUT, headers=None):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._pool = None
+        self._slots = None
+        self.queued = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retries = 0
+        atexit.register(self.close)
+
+    def _ensure_worker(self):
+        # Started lazily so that each forked worker has its own thread and pool.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize)
+                self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='record-handoff')
+                self._slots = threading.BoundedSemaphore(self.concurrency)
+                self._thread = threading.Thread(target=self._run, name='record-handoff', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, record):
+        """Queue one draft record; returns False if it was dropped because the queue is full."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("record hand-off queue full; dropped %s", record.get('external_id'))
+            return False
+        self.queued += 1
+        return True
+
+    def _drain(self):
+        records = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                records.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return records
+
+    def _run(self):
+        while True:
+            records = self._drain()
+            stop = None in records
+            records = [r for r in records if r is not None]
+            if records:
+                # Blocks while `concurrency` batches are in flight; the queue absorbs the wait.
+                self._slots.acquire()
+                self._pool.submit(self._deliver, records)
+            if stop:
+                return
+
+    def _deliver(self, records):
+        try:
+            for attempt in range(self.max_attempts):
+                try:
+                    result = self._post(records)
+                except DeliveryError as exc:
+                    if not exc.retryable or attempt + 1 == self.max_attempts:
+                        self.failed += len(records)
+                        logger.error("could not hand off %d records: %s", len(records), exc)
+                        return
+                    self.retries += 1
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                    continue
+                self.delivered += result.get('created', 0)
+                self.duplicates += len(result.get('duplicates', []))
+                rejected = result.get('rejected', [])
+                if rejected:
+                    self.rejected += len(rejected)
+                    logger.warning("medical_record rejected %d drafts: %s", len(rejected), rejected[:5])
+                return
+        finally:
+            self._slots.release()
+
+    def _post(self, records):
+        body = json.dumps({'records': records}).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read() or b'{}')
+        except urllib.error.HTTPError as exc:
+            retryable = exc.code == 429 or exc.code >= 500
+            raise DeliveryError(f"HTTP {exc.code}", retryable) from exc
+        except (urllib.error.URLError, OSError, ValueError) as exc:
+            raise DeliveryError(str(exc), True) from exc
+
+    def close(self, timeout=10):
+        """Hand off what is queued (best effort, bounded by ``timeout``) at exit."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._pool.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
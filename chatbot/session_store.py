@@ -0,0 +1,211 @@
+"""Server-side session backends for the chatbot.
+
+The chatbot session only ever holds the packed ``ConversationState`` (a few
+dozen bytes, see ``conversation_state.py``), so the stores here keep raw bytes
+per session id instead of pickled dicts:
+
+* ``MemoryStore`` - in-process LRU with a TTL; O(1) get/set, bounded size.
+  Sessions live in one process, so use it with a single worker.
+* ``SQLiteStore`` - one SQLite file in WAL mode, shared by every worker on the
+  host; readers never block the writer.
+
+Both expire entries after ``ttl`` seconds of inactivity. ``start_sweeper``
+runs a daemon thread that purges expired sessions in the background, so
+abandoned conversations do not pile up the way ``flask_session/`` files do.
+``StateSessionInterface`` plugs a store into Flask.
+"""
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+DEFAULT_TTL = 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 100_000
+SWEEP_INTERVAL = 60  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # sid -> (expires_at, bytes), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._data[sid]
+                return None
+            self._data[sid] = (now + self.ttl, entry[1])
+            self._data.move_to_end(sid)
+            return entry[1]
+
+    def set(self, sid, data):
+        with self._lock:
+            self._data[sid] = (time.monotonic() + self.ttl, data)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self):
+        # Every access refreshes the TTL and moves the entry to the end, so the
+        # expired entries are exactly the ones at the front.
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._data:
+                sid, (expires_at, _) = next(iter(self._data.items()))
+                if expires_at > now:
+                    break
+                del self._data[sid]
+                removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        # A connection must not cross fork() either (gunicorn preloads, then forks).
+        os.register_at_fork(after_in_child=self._reset_connections)
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads; keep one per thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _reset_connections(self):
+        self._local = threading.local()
+
+    def get(self, sid):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute('SELECT data, expires_at FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        conn.execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (now + self.ttl, sid))
+        return bytes(row[0])
+
+    def set(self, sid, data):
+        self._conn().execute(
+            'INSERT INTO sessions (sid, data, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at',
+            (sid, data, time.time() + self.ttl),
+        )
+
+    def delete(self, sid):
+        self._conn().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self):
+        return self._conn().execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+def start_sweeper(store, interval=SWEEP_INTERVAL):
+    """Purge expired sessions every ``interval`` seconds from a daemon thread.
+
+    Threads do not survive fork(), so each forked worker starts its own sweeper.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.sweep()
+            except Exception:
+                logger.exception("session sweep failed")
+
+    def start():
+        thread = threading.Thread(target=run, name='session-sweeper', daemon=True)
+        thread.start()
+        return thread
+
+    os.register_at_fork(after_in_child=start)
+    return start()
+
+
+class StateSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class StateSessionInterface(SessionInterface):
+    """Keeps ``session['state']`` (bytes) in a store, keyed by a signed cookie."""
+
+    def __init__(self, store, ttl=DEFAULT_TTL):
+        self.store = store
+        self.ttl = ttl
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='chatbot-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return StateSession({'state': data}, sid=sid)
+        return StateSession(sid=secrets.token_urlsafe(16), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+        self.store.set(session.sid, session['state'])
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode('ascii'),
+            max_age=self.ttl,
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path,
+        )
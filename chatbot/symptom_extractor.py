@@ -0,0 +1,124 @@
+"""Extract every symptom (and a duration) from one free-text message.
+
+An Aho-Corasick automaton is built once over the normalized symptom names and
+synonyms, so a sentence such as "fever, headache and joint pain for 3 days" is
+scanned in a single linear pass. Overlapping hits are resolved leftmost-longest
+and only whole-word matches are kept.
+
+A symptom mentioned after a negation cue ("no", "not", "without", "denies",
+...) in the same clause is dropped, so "no fever but cough for a week" yields
+only cough. Clauses end at punctuation and at contrasting words such as "but".
+"""
+import re
+
+from symptom_index import normalize
+
+_UNIT_DAYS = {'day': 1, 'days': 1, 'week': 7, 'weeks': 7, 'month': 30, 'months': 30}
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'couple': 2, 'few': 3,
+}
+_NEGATIONS = {'no', 'not', 'without', 'deny', 'denies', 'denied', 'never', 'nor', 'neither'}
+# Raw-text clause boundaries: punctuation and words that start a new statement.
+_CLAUSE = re.compile(r"[.,;:!?\n]|\b(?:but|however|although|though|except|yet|apart from)\b", re.IGNORECASE)
+_CONTRACTION = re.compile(r"n[’']t\b", re.IGNORECASE)  # "don't" -> "do not"
+_DURATION = re.compile(r'\b(\d{1,3}|' + '|'.join(_NUMBER_WORDS) + r')\s+(?:of\s+)?(' + '|'.join(_UNIT_DAYS) + r')\b')
+
+
+class AhoCorasick:
+    def __init__(self, patterns):
+        """``patterns`` is an iterable of ``(text, value)`` pairs."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for text, value in patterns:
+            node = 0
+            for ch in text:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(text), value))
+
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text):
+        """Yield ``(start, end, value)`` for every occurrence of every pattern."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, value in self._out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+class SymptomExtractor:
+    def __init__(self, symptoms, synonyms=None):
+        self.symptoms = list(symptoms)
+        symptom_ids = {symptom: i for i, symptom in enumerate(self.symptoms)}
+        patterns = [(normalize(symptom), i) for i, symptom in enumerate(self.symptoms)]
+        for phrase, symptom in (synonyms or {}).items():
+            if symptom in symptom_ids:
+                patterns.append((normalize(phrase), symptom_ids[symptom]))
+        self._automaton = AhoCorasick(p for p in patterns if p[0])
+
+    def _clause_ids(self, clause):
+        """Symptom ids in ``clause`` (normalized) that no negation cue precedes."""
+        hits = [
+            (start, end, value) for start, end, value in self._automaton.iter(clause)
+            if (start == 0 or clause[start - 1] == ' ') and (end == len(clause) or clause[end] == ' ')
+        ]
+        hits.sort(key=lambda hit: (hit[0], -hit[1]))
+
+        # Everything after the first cue is negated ("no fever or chills").
+        negated_from = len(clause)
+        position = 0
+        for word in clause.split(' '):
+            if word in _NEGATIONS:
+                negated_from = position
+                break
+            position += len(word) + 1
+
+        covered = 0
+        for start, end, value in hits:
+            if start < covered:
+                continue
+            covered = end
+            if start < negated_from:
+                yield value
+
+    def extract_ids(self, text):
+        """Return ``(symptom ids in order of mention, days or None)``."""
+        found = []
+        for clause in _CLAUSE.split(_CONTRACTION.sub(' not', text)):
+            for value in self._clause_ids(normalize(clause)):
+                if value not in found:
+                    found.append(value)
+        return found, parse_days(text)
+
+    def extract(self, text):
+        ids, days = self.extract_ids(text)
+        return [self.symptoms[i] for i in ids], days
+
+
+def parse_days(text):
+    """Duration in days from phrases like "3 days", "two weeks" or "a month"."""
+    match = _DURATION.search(normalize(text))
+    if not match:
+        return None
+    count, unit = match.groups()
+    count = int(count) if count.isdigit() else _NUMBER_WORDS[count]
+    return count * _UNIT_DAYS[unit]
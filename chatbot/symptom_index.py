@@ -0,0 +1,90 @@
+"""Prebuilt lookup index over the symptom vocabulary.
+
+Replaces compiling the user's input as a regex and scanning every symptom
+column with it. The index is built once from the symptom names and treats
+queries as literal text:
+
+* names are normalized to lowercase space-separated tokens
+  (``"spotting_ urination"`` -> ``"spotting urination"``);
+* a prefix trie over whole names and over each token answers prefix queries;
+* trigram postings narrow down substring candidates before a plain ``in`` check.
+
+``search`` returns symptom names ranked exact, then prefix, then substring,
+each group in vocabulary order.
+"""
+import re
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+NGRAM = 3
+
+
+def normalize(text):
+    return ' '.join(_NON_WORD.sub(' ', text.lower()).split())
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class SymptomIndex:
+    def __init__(self, symptoms):
+        self.symptoms = list(symptoms)
+        self.normalized = [normalize(s) for s in self.symptoms]
+
+        self._exact = {}
+        for i, name in enumerate(self.normalized):
+            self._exact.setdefault(name, []).append(i)
+
+        # Trie nodes are dicts of child characters; the '' key holds the ids of
+        # every name with that prefix (on the whole name or on one of its tokens).
+        self._trie = {'': []}
+        for i, name in enumerate(self.normalized):
+            starts = {name} | set(name.split(' '))
+            seen = set()
+            for start in starts:
+                node = self._trie
+                for ch in start:
+                    node = node.setdefault(ch, {'': []})
+                    if id(node) not in seen:
+                        seen.add(id(node))
+                        node[''].append(i)
+
+        self._postings = {}
+        for i, name in enumerate(self.normalized):
+            for gram in _ngrams(name):
+                self._postings.setdefault(gram, []).append(i)
+
+    def _prefix(self, query):
+        node = self._trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node['']
+
+    def _substring(self, query):
+        grams = _ngrams(query)
+        if grams:
+            postings = [self._postings.get(g) for g in grams]
+            if not all(postings):
+                return []
+            candidates = set(min(postings, key=len)).intersection(*postings)
+        else:
+            candidates = range(len(self.normalized))
+        return [i for i in candidates if query in self.normalized[i]]
+
+    def search_ids(self, text):
+        """Ranked symptom ids matching ``text``: exact, then prefix, then substring."""
+        query = normalize(text)
+        if not query:
+            return []
+        ranked = list(self._exact.get(query, []))
+        seen = set(ranked)
+        for group in (self._prefix(query), self._substring(query)):
+            for i in sorted(set(group) - seen):
+                ranked.append(i)
+                seen.add(i)
+        return ranked
+
+    def search(self, text):
+        return [self.symptoms[i] for i in self.search_ids(text)]
@@ -0,0 +1,111 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    env = {
+        'CHATBOT_SECRET_KEY': 'test-secret',
+        'CHATBOT_STATE_MODE': 'token',
+        'CHATBOT_MODEL_DIR': str(tmp_path_factory.mktemp('models')),
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in env.items():
+            mp.setenv(name, value)
+        sys.modules.pop('chatbot_api', None)
+        yield importlib.import_module('chatbot_api')
+        sys.modules.pop('chatbot_api', None)
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+def test_batch_scores_each_row(client):
+    resp = client.post('/chatbot/predict/batch', json={'symptoms': [['itching', 'skin_rash'], ['high_fever', 'headache']]})
+    assert resp.status_code == 200
+    results = resp.get_json()['results']
+    assert len(results) == 2
+    assert all('error' not in result for result in results)
+
+
+@pytest.mark.parametrize('body', [None, [['itching']], {'symptoms': 'itching'}, {'rows': [['itching']]}])
+def test_batch_needs_an_object_with_a_symptoms_list(client, body):
+    resp = client.post('/chatbot/predict/batch', json=body)
+    assert resp.status_code == 400
+    assert 'symptoms' in resp.get_json()['error']
+
+
+def test_batch_reports_bad_rows_without_failing_the_rest(client):
+    resp = client.post('/chatbot/predict/batch', json={'symptoms': ['itching', ['itching'], ['not_a_symptom'], []]})
+    results = resp.get_json()['results']
+    assert results[0] == {'error': 'Each row must be a list of symptoms.'}
+    assert 'error' not in results[1]
+    assert results[2] == {'error': 'No known symptoms in this row.', 'unknown_symptoms': ['not_a_symptom']}
+    assert results[3] == {'error': 'No known symptoms in this row.'}
+
+
+def test_batch_ndjson_rows(client):
+    body = '["itching"]\n{"symptoms": ["not_a_symptom"]}\n"itching"\n'
+    resp = client.post('/chatbot/predict/batch', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 200
+    lines = resp.get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+    assert '"error"' not in lines[0]
+    assert 'No known symptoms' in lines[1]
+    assert 'must be a list' in lines[2]
+
+
+def test_conversation_and_batch_give_the_same_answer(api, client):
+    bundle = api.registry.current
+    presentation = ['itching', 'skin_rash', 'nodal_skin_eruptions']
+    present = [bundle.model.symptom_index[name] for name in presentation]
+    batch = client.post('/chatbot/predict/batch', json={'symptoms': [presentation]}).get_json()['results'][0]
+    assert api.predict_disease(bundle, present) == batch
+    assert api.compute_predictions([(bundle, present, [], api.TOP_K)]) == [batch]
+
+
+def test_triage_scores_one_patient(client):
+    resp = client.post('/chatbot/triage', json={'symptoms': ['chest_pain', 'not_a_symptom'], 'days': 2})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['unknown_symptoms'] == ['not_a_symptom']
+    assert 'error' not in body
+
+
+@pytest.mark.parametrize('days', ['Infinity', '-Infinity', 'NaN', '1e308', '-1', '65535', 'true', '"many"', 'null'])
+def test_triage_rejects_days_out_of_range(client, days):
+    body = '{"symptoms": ["chest_pain"], "days": %s}' % days
+    resp = client.post('/chatbot/triage', data=body, content_type='application/json')
+    assert resp.status_code == 400
+    assert "'days' between 0 and 65534" in resp.get_json()['error']
+
+
+@pytest.mark.parametrize('body', ['null', '[]', '{"days": 2}', '{"symptoms": "chest_pain", "days": 2}', 'not json'])
+def test_triage_rejects_a_bad_body(client, body):
+    assert client.post('/chatbot/triage', data=body, content_type='application/json').status_code == 400
+
+
+@pytest.mark.parametrize('body', [None, [], {'patients': {'symptoms': ['chest_pain']}}])
+def test_triage_batch_needs_a_patients_list(client, body):
+    resp = client.post('/chatbot/triage/batch', json=body)
+    assert resp.status_code == 400
+    assert 'patients' in resp.get_json()['error']
+
+
+def test_triage_batch_puts_invalid_entries_last(client):
+    patients = [{'id': 'a', 'symptoms': ['chest_pain'], 'days': float('inf')},
+                {'id': 'b', 'symptoms': ['itching'], 'days': 1},
+                'x',
+                {'id': 'c', 'symptoms': ['chest_pain', 'breathlessness'], 'days': 65534}]
+    # json.dumps writes inf as Infinity, which Flask's parser reads back.
+    resp = client.post('/chatbot/triage/batch', data=json.dumps({'patients': patients}), content_type='application/json')
+    results = resp.get_json()['results']
+    assert [r['index'] for r in results] == [3, 1, 0, 2]
+    assert [r.get('id') for r in results] == ['c', 'b', 'a', None]
+    assert ['error' in r for r in results] == [False, False, True, True]
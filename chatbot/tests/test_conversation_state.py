@@ -0,0 +1,72 @@
+import base64
+from unittest import mock
+
+import pytest
+
+from conversation_state import MAX_DAYS, STATE_VERSION, ConversationState, TokenCodec
+
+
+def state(**fields):
+    defaults = dict(step='follow_up', present=(1 << 3) | (1 << 130), absent=1 << 7, days=4, current=12,
+                    candidates=[3, 9], asked=2, name='Ann', patient_id=42)
+    return ConversationState(**{**defaults, **fields})
+
+
+def fields(s):
+    return (s.step, s.present, s.absent, s.days, s.current, list(s.candidates), s.asked, s.name,
+            s.conversation_id, s.patient_id)
+
+
+def test_pack_round_trip():
+    original = state()
+    assert fields(ConversationState.unpack(original.pack())) == fields(original)
+
+
+def test_unset_fields_round_trip():
+    original = ConversationState()
+    restored = ConversationState.unpack(original.pack())
+    assert (restored.days, restored.current, restored.patient_id, restored.name) == (None, None, None, '')
+
+
+def test_days_are_capped_and_long_names_cut_on_a_character_boundary():
+    restored = ConversationState.unpack(state(days=10 ** 6, name='é' * 100).pack())
+    assert restored.days == MAX_DAYS
+    assert restored.name == 'é' * 32
+
+
+def test_other_state_versions_are_refused():
+    packed = bytearray(state().pack())
+    packed[0] = STATE_VERSION - 1
+    with pytest.raises(ValueError):
+        ConversationState.unpack(bytes(packed))
+
+
+def test_token_round_trip():
+    codec = TokenCodec('secret')
+    original = state()
+    assert fields(codec.loads(codec.dumps(original))) == fields(original)
+
+
+def test_tampered_or_foreign_tokens_are_rejected():
+    codec = TokenCodec('secret')
+    token = codec.dumps(state())
+    payload, rest = token.split('.', 1)
+    raw = bytearray(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    raw[-1] ^= 1  # flip a bit in the name
+    forged = base64.urlsafe_b64encode(bytes(raw)).rstrip(b'=').decode() + '.' + rest
+
+    assert codec.loads(forged) is None
+    assert codec.loads(token[:-2]) is None
+    assert TokenCodec('other secret').loads(token) is None
+    assert codec.loads('') is None
+    assert codec.loads('garbage') is None
+
+
+def test_expired_tokens_are_rejected():
+    codec = TokenCodec('secret', max_age=60)
+    with mock.patch('time.time', return_value=1_000_000):
+        token = codec.dumps(state())
+    with mock.patch('time.time', return_value=1_000_000 + 59):
+        assert codec.loads(token) is not None
+    with mock.patch('time.time', return_value=1_000_000 + 61):
+        assert codec.loads(token) is None
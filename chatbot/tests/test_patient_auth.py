@@ -0,0 +1,91 @@
+import io
+import time
+import urllib.error
+from unittest import mock
+
+import jwt
+import pytest
+
+import patient_auth
+from patient_auth import PatientAuthenticator
+
+KEY = 'k' * 64
+REVOKED_URL = 'http://auth_service/api/auth/revoked/'
+
+
+def access_token(key=KEY, **claims):
+    claims = {'token_type': 'access', 'exp': int(time.time()) + 300, 'jti': 'abc/123', 'user_id': 7,
+              'role': 'patient', 'patient_id': 3, **claims}
+    return 'Bearer ' + jwt.encode({k: v for k, v in claims.items() if v is not None}, key, algorithm='HS256')
+
+
+def http_error(code):
+    return urllib.error.HTTPError(REVOKED_URL, code, 'error', {}, io.BytesIO())
+
+
+@pytest.fixture
+def auth():
+    return PatientAuthenticator(KEY, REVOKED_URL)
+
+
+def lookup(response):
+    if isinstance(response, Exception):
+        return mock.patch.object(patient_auth.urllib.request, 'urlopen', side_effect=response)
+    return mock.patch.object(patient_auth.urllib.request, 'urlopen', return_value=response)
+
+
+def test_live_token_gives_its_patient_id(auth):
+    with lookup(http_error(404)) as urlopen:
+        assert auth.patient_id(access_token()) == 3
+    # the JTI is quoted into one path segment
+    assert urlopen.call_args.args[0].full_url == REVOKED_URL + 'abc%2F123/'
+
+
+def test_revoked_token_is_anonymous(auth):
+    with lookup(io.BytesIO(b'{}')):
+        assert auth.patient_id(access_token()) is None
+
+
+@pytest.mark.parametrize('failure', [http_error(500), urllib.error.URLError('refused'), TimeoutError()])
+def test_failed_lookup_is_anonymous(auth, failure):
+    with lookup(failure):
+        assert auth.patient_id(access_token()) is None
+
+
+@pytest.mark.parametrize('authorization', [
+    access_token(key='x' * 64),
+    access_token(exp=int(time.time()) - 1),
+    access_token(exp=None),
+    access_token(jti=None),
+    access_token(token_type='refresh'),
+    access_token(role='doctor'),
+    access_token(role=None),
+    access_token(patient_id=None),
+    access_token(patient_id='3'),
+    access_token(patient_id=True),
+    access_token(patient_id=0),
+    access_token(patient_id=2 ** 32),
+    'Bearer not-a-jwt',
+    'Token ' + access_token()[len('Bearer '):],
+    'Bearer',
+    '',
+    None,
+])
+def test_rejected_tokens_are_anonymous_without_a_lookup(auth, authorization):
+    with lookup(http_error(404)) as urlopen:
+        assert auth.patient_id(authorization) is None
+    urlopen.assert_not_called()
+
+
+def test_other_algorithms_are_refused(auth):
+    token = jwt.encode({'token_type': 'access', 'exp': int(time.time()) + 300, 'jti': 'a',
+                        'role': 'patient', 'patient_id': 3}, KEY, algorithm='HS512')
+    with lookup(http_error(404)):
+        assert auth.patient_id(f'Bearer {token}') is None
+
+
+def test_no_signing_key_links_nothing():
+    with mock.patch.object(patient_auth.logger, 'warning'):
+        auth = PatientAuthenticator(None, REVOKED_URL)
+    with lookup(http_error(404)):
+        assert auth.patient_id(access_token()) is None
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import threading
+import urllib.error
+from unittest import mock
+
+import pytest
+
+import record_handoff
+from record_handoff import RecordHandoff
+
+URL = 'http://medical_record/api/medical-records/drafts/batch/'
+
+
+def ok(body):
+    return io.BytesIO(json.dumps(body).encode())
+
+
+def http_error(code):
+    return urllib.error.HTTPError(URL, code, 'error', {}, io.BytesIO())
+
+
+@pytest.fixture
+def handoff():
+    handoff = RecordHandoff(URL, max_queue=2, max_attempts=3)
+    # No worker thread: the tests call _deliver themselves, holding a slot as _run does.
+    handoff._slots = threading.BoundedSemaphore(1)
+    handoff._pid = os.getpid()
+    yield handoff
+    handoff._pid = None
+
+
+@pytest.fixture
+def sleep():
+    with mock.patch.object(record_handoff.time, 'sleep') as sleep:
+        yield sleep
+
+
+def deliver(handoff, records, *responses):
+    handoff._slots.acquire()
+    with mock.patch.object(record_handoff.urllib.request, 'urlopen', side_effect=responses) as urlopen:
+        handoff._deliver(records)
+    return urlopen
+
+
+def test_counts_created_duplicates_and_rejected(handoff, sleep):
+    records = [{'external_id': f'chatbot-{i}'} for i in range(4)]
+    urlopen = deliver(handoff, records, ok({'created': 2, 'duplicates': ['chatbot-1'],
+                                            'rejected': [{'external_id': 'chatbot-3', 'error': 'Invalid patient'}]}))
+    request = urlopen.call_args.args[0]
+    assert json.loads(request.data) == {'records': records}
+    assert handoff.stats() == {
+        'queue_depth': 0, 'queue_capacity': 2, 'queued': 0, 'dropped': 0,
+        'delivered': 2, 'duplicates': 1, 'rejected': 1, 'failed': 0, 'retries': 0}
+    sleep.assert_not_called()
+
+
+def test_retries_5xx_429_and_connection_errors_with_backoff(handoff, sleep):
+    records = [{'external_id': 'chatbot-1'}]
+    handoff.max_attempts = 4
+    urlopen = deliver(handoff, records, http_error(503), http_error(429), urllib.error.URLError('refused'),
+                      ok({'created': 0, 'duplicates': ['chatbot-1']}))
+    assert urlopen.call_count == 4
+    assert (handoff.retries, handoff.delivered, handoff.duplicates, handoff.failed) == (3, 0, 1, 0)
+    # 0.5s doubling per attempt, with up to half of it taken off as jitter
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert len(delays) == 3
+    assert all(base / 2 <= delay <= base for base, delay in zip((0.5, 1.0, 2.0), delays))
+
+
+def test_gives_up_after_max_attempts(handoff, sleep):
+    urlopen = deliver(handoff, [{'external_id': 'a'}, {'external_id': 'b'}], *[http_error(500)] * 3)
+    assert urlopen.call_count == 3
+    assert (handoff.retries, handoff.failed, handoff.delivered) == (2, 2, 0)
+
+
+def test_does_not_retry_other_4xx(handoff, sleep):
+    urlopen = deliver(handoff, [{'external_id': 'a'}], http_error(400))
+    assert urlopen.call_count == 1
+    assert (handoff.retries, handoff.failed) == (0, 1)
+    sleep.assert_not_called()
+
+
+def test_slot_is_released_whatever_happens(handoff, sleep):
+    deliver(handoff, [{'external_id': 'a'}], http_error(400))
+    deliver(handoff, [{'external_id': 'b'}], ok({'created': 1}))
+    assert handoff._slots.acquire(blocking=False)
+
+
+def test_full_queue_drops_and_counts(handoff):
+    assert handoff.submit({'external_id': 'a'})
+    assert handoff.submit({'external_id': 'b'})
+    assert not handoff.submit({'external_id': 'c'})
+    assert handoff.stats()['queued'] == 2
+    assert handoff.stats()['dropped'] == 1
+    assert handoff.stats()['queue_depth'] == 2
@@ -0,0 +1,115 @@
+from unittest import mock
+
+import pytest
+from flask import Flask, session
+
+import session_store
+from session_store import MemoryStore, SQLiteStore, StateSessionInterface
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with mock.patch.object(session_store.time, 'monotonic', clock), mock.patch.object(session_store.time, 'time', clock):
+        yield clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, clock):
+    if request.param == 'memory':
+        return MemoryStore(ttl=60)
+    return SQLiteStore(str(tmp_path / 'sessions.db'), ttl=60)
+
+
+def test_get_set_delete(store):
+    store.set('a', b'state')
+    assert store.get('a') == b'state'
+    store.set('a', b'newer')
+    assert store.get('a') == b'newer'
+    store.delete('a')
+    assert store.get('a') is None
+
+
+def test_sessions_expire_after_ttl_of_inactivity(store, clock):
+    store.set('a', b'1')
+    store.set('b', b'2')
+    clock.now += 50
+    assert store.get('a') == b'1'  # touching a session renews it
+    clock.now += 20
+    assert store.get('b') is None
+    assert store.get('a') == b'1'
+
+
+def test_sweep_removes_only_expired_sessions(store, clock):
+    store.set('old', b'1')
+    clock.now += 30
+    store.set('mid', b'2')
+    store.set('touched', b'3')
+    clock.now += 20
+    store.get('touched')
+    clock.now += 15  # old expired at 60, mid and touched later
+    assert store.sweep() == 1
+    clock.now += 30  # mid expired; touched was renewed
+    assert store.sweep() == 1
+    assert store.get('touched') == b'3'
+    assert store.sweep() == 0
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemoryStore(ttl=60, max_entries=2)
+    store.set('a', b'1')
+    store.set('b', b'2')
+    store.get('a')
+    store.set('c', b'3')
+    assert (store.get('a'), store.get('b'), store.get('c')) == (b'1', None, b'3')
+    assert len(store) == 2
+
+
+def app_with(store):
+    app = Flask(__name__)
+    app.secret_key = 'secret'
+    app.session_interface = StateSessionInterface(store, ttl=60)
+
+    @app.route('/set/<value>')
+    def set_state(value):
+        session['state'] = value.encode()
+        return ''
+
+    @app.route('/get')
+    def get_state():
+        return session.get('state', b'-')
+
+    @app.route('/clear')
+    def clear_state():
+        session.clear()
+        return ''
+
+    return app
+
+
+def test_session_interface_keeps_only_the_state_in_the_store():
+    store = MemoryStore(ttl=60)
+    client = app_with(store).test_client()
+    client.get('/set/abc')
+    assert client.get('/get').data == b'abc'
+    assert len(store) == 1 and next(iter(store._data.values()))[1] == b'abc'
+    client.get('/clear')
+    assert len(store) == 0
+    assert client.get('/get').data == b'-'
+
+
+def test_session_interface_ignores_a_forged_cookie():
+    store = MemoryStore(ttl=60)
+    client = app_with(store).test_client()
+    client.get('/set/abc')
+    sid = next(iter(store._data))
+    client.set_cookie('session', f'{sid}.forged')
+    assert client.get('/get').data == b'-'
@@ -0,0 +1,48 @@
+import pytest
+
+from symptom_extractor import SymptomExtractor, parse_days
+
+SYMPTOMS = ['high_fever', 'cough', 'headache', 'chills', 'joint_pain', 'skin_rash']
+SYNONYMS = {'fever': 'high_fever', 'head ache': 'headache'}
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return SymptomExtractor(SYMPTOMS, SYNONYMS)
+
+
+def test_several_symptoms_and_a_duration_in_one_message(extractor):
+    assert extractor.extract('Fever, headache and joint pain for 3 days') == (
+        ['high_fever', 'headache', 'joint_pain'], 3)
+
+
+@pytest.mark.parametrize('text, symptoms', [
+    ('no fever but cough for a week', ['cough']),
+    ('cough, no fever or chills', ['cough']),
+    ("I don't have chills. Head ache since two days", ['headache']),
+    ('without fever; skin rash', ['skin_rash']),
+    ('denies joint pain, however has a cough', ['cough']),
+    ('not sure, fever', ['high_fever']),  # the cue only negates its own clause
+])
+def test_negated_symptoms_are_dropped(extractor, text, symptoms):
+    assert extractor.extract(text)[0] == symptoms
+
+
+def test_negation_cue_after_the_symptom_does_not_apply(extractor):
+    assert extractor.extract('fever and no cough')[0] == ['high_fever']
+
+
+def test_only_whole_words_match(extractor):
+    assert extractor.extract('coughing up chillsome stuff')[0] == []
+
+
+def test_longest_match_wins_and_repeats_count_once(extractor):
+    extractor = SymptomExtractor(['pain', 'joint_pain'])
+    assert extractor.extract('joint pain, joint pain and pain')[0] == ['joint_pain', 'pain']
+
+
+@pytest.mark.parametrize('text, days', [
+    ('for 3 days', 3), ('two weeks', 14), ('a month', 30), ('a couple of days', 2), ('since yesterday', None),
+])
+def test_parse_days(text, days):
+    assert parse_days(text) == days
@@ -0,0 +1,41 @@
+from typo_index import TypoIndex, edit_distance
+
+SYMPTOMS = ['headache', 'high_fever', 'skin_rash', 'stomach_pain', 'cough']
+SYNONYMS = {'tummy ache': 'stomach_pain', 'temperature': 'high_fever', 'fatigue': 'not_a_symptom'}
+
+
+def index():
+    return TypoIndex(SYMPTOMS, SYNONYMS)
+
+
+def test_misspellings_resolve_to_the_symptom():
+    assert index().lookup('headake') == ['headache']
+    assert index().lookup('hedache') == ['headache']
+    assert index().lookup('skin rsah') == ['skin_rash']
+
+
+def test_adjacent_transposition_is_one_edit():
+    assert edit_distance('haedache', 'headache', 2) == 1
+    assert index().lookup('haedache', max_distance=1) == ['headache']
+
+
+def test_synonyms_and_their_typos_point_at_the_canonical_symptom():
+    assert index().lookup('tummy ache') == ['stomach_pain']
+    assert index().lookup('temprature') == ['high_fever']
+    assert index().lookup('fatigue') == []  # synonym of a symptom the model does not know
+
+
+def test_nearest_match_comes_first():
+    index = TypoIndex(['cough', 'couch_potato', 'coughs'])
+    assert index.lookup('cough') == ['cough', 'coughs']
+
+
+def test_short_queries_allow_fewer_edits():
+    assert index().lookup('cogh') == ['cough']  # four letters: one edit allowed
+    assert index().lookup('ha') == []
+    assert index().lookup('') == []
+
+
+def test_too_many_edits_is_no_match():
+    assert index().lookup('hdch') == []
+    assert edit_distance('abcdef', 'uvwxyz', 2) == 3  # stops once the bound is exceeded
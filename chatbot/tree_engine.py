@@ -0,0 +1,85 @@
+"""Decision tree inference over flattened scikit-learn tree arrays.
+
+``FlatTree`` walks ``children_left``/``children_right``/``feature``/``threshold``
+and picks the leaf label from ``value`` the same way ``DecisionTreeClassifier``
+does (``x <= threshold`` goes left, ties in ``value`` resolve to the first
+class), so predictions match scikit-learn exactly without importing it.
+``chat_bot.py --kiosk`` and ``--batch`` walk it one record at a time;
+``build_model.py`` checks both walks against scikit-learn before writing an
+artifact.
+"""
+import numpy as np
+
+TREE_LEAF = -1
+
+
+class FlatTree:
+    def __init__(self, children_left, children_right, feature, threshold, value):
+        self.children_left = np.asarray(children_left)
+        self.children_right = np.asarray(children_right)
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.value = np.asarray(value)
+        self.leaf_class = np.argmax(self.value, axis=1)
+
+        # Features are 0/1, so each split's outcome for "absent" and "present" is
+        # fixed. Precompute the next node for both cases as plain lists, which are
+        # much cheaper than numpy scalar indexing in the single-sample walk.
+        is_leaf = self.children_left == TREE_LEAF
+        absent_left = 0.0 <= self.threshold
+        present_left = 1.0 <= self.threshold
+        self._feature = self.feature.tolist()
+        self._is_leaf = is_leaf.tolist()
+        self._next_absent = np.where(absent_left, self.children_left, self.children_right).tolist()
+        self._next_present = np.where(present_left, self.children_left, self.children_right).tolist()
+        self._leaf_class = self.leaf_class.tolist()
+        self.max_depth = self._depth()
+
+    def _depth(self):
+        depth = 0
+        stack = [(0, 0)]
+        while stack:
+            node, d = stack.pop()
+            if self._is_leaf[node]:
+                depth = max(depth, d)
+            else:
+                stack.append((int(self.children_left[node]), d + 1))
+                stack.append((int(self.children_right[node]), d + 1))
+        return depth
+
+    def apply_indices(self, active):
+        """Return the leaf reached by the sample whose present features are ``active``."""
+        if not isinstance(active, (set, frozenset)):
+            active = set(active)
+        is_leaf = self._is_leaf
+        feature = self._feature
+        node = 0
+        while not is_leaf[node]:
+            if feature[node] in active:
+                node = self._next_present[node]
+            else:
+                node = self._next_absent[node]
+        return node
+
+    def predict_indices(self, active):
+        """Class index for one sample given the set of present feature indices."""
+        return self._leaf_class[self.apply_indices(active)]
+
+    def apply(self, X):
+        """Vectorized leaf lookup for a dense (n_samples, n_features) matrix."""
+        X = np.asarray(X)
+        n = X.shape[0]
+        rows = np.arange(n)
+        nodes = np.zeros(n, dtype=np.intp)
+        for _ in range(self.max_depth):
+            left = self.children_left[nodes]
+            internal = left != TREE_LEAF
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+        return nodes
+
+    def predict(self, X):
+        """Class indices for every row of a dense 0/1 matrix."""
+        return self.leaf_class[self.apply(X)]
@@ -0,0 +1,47 @@
+"""Severity triage score, vectorized.
+
+``calc_condition`` in ``chat_bot.py`` sums the severity weight of every
+reported symptom and scales it by the number of days:
+
+    score = sum(severity) * days / (n_symptoms + 1)
+
+Here the weights from ``Symptom_severity.csv`` become one vector aligned with
+the model's symptom columns, so the sum is a dot product with the 0/1 symptom
+row and a whole waiting list is scored with a single matrix-vector product.
+Above ``CONSULT_THRESHOLD`` (the threshold ``calc_condition`` uses) a doctor
+should be consulted.
+"""
+import numpy as np
+
+CONSULT_THRESHOLD = 13
+ADVICE = {
+    'self_care': "It might not be that bad but you should take precautions.",
+    'consult': "You should take the consultation from doctor.",
+}
+
+
+def severity_vector(symptoms, severity):
+    """Severity weight per symptom column; symptoms without a weight count 0."""
+    return np.array([severity.get(symptom, 0) for symptom in symptoms], dtype=np.float64)
+
+
+def scores(X, days, weights):
+    """Triage score for each row of the 0/1 symptom matrix ``X``."""
+    X = np.asarray(X)
+    days = np.asarray(days, dtype=np.float64)
+    return (X @ weights) * days / (X.sum(axis=1) + 1)
+
+
+def score_indices(indices, days, weights):
+    """Triage score for one set of symptom indices."""
+    indices = list(indices)
+    return float(weights[indices].sum()) * days / (len(indices) + 1)
+
+
+def tier(score):
+    return 'consult' if score > CONSULT_THRESHOLD else 'self_care'
+
+
+def assessment(score):
+    tier_name = tier(score)
+    return {"score": round(float(score), 2), "tier": tier_name, "advice": ADVICE[tier_name]}
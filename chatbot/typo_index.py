@@ -0,0 +1,93 @@
+"""Typo-tolerant symptom lookup (SymSpell-style symmetric delete index).
+
+Every symptom name and curated synonym (``symptom_synonyms.csv``) is
+normalized, and all variants of its first ``prefix_length`` characters with up
+to ``max_distance`` characters deleted are stored in a dict. A query generates
+the same deletes for its own prefix, so candidate lookup costs a bounded number
+of dict probes regardless of vocabulary size; candidates are then confirmed
+with an edit distance (adjacent transpositions count as one edit) that stops
+as soon as the bound is exceeded.
+"""
+from itertools import combinations
+
+from symptom_index import normalize
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+
+def _deletes(text, max_distance):
+    variants = {text}
+    for k in range(1, min(max_distance, len(text)) + 1):
+        for drop in combinations(range(len(text)), k):
+            variants.add(''.join(ch for i, ch in enumerate(text) if i not in drop))
+    return variants
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or ``max_distance + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def allowed_distance(query, max_distance=MAX_DISTANCE):
+    # Very short inputs would match half the vocabulary at distance 2.
+    if len(query) < 3:
+        return 0
+    if len(query) < 6:
+        return min(1, max_distance)
+    return max_distance
+
+
+class TypoIndex:
+    def __init__(self, symptoms, synonyms=None, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.symptoms = list(symptoms)
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        symptom_ids = {symptom: i for i, symptom in enumerate(self.symptoms)}
+
+        # (normalized term, symptom id); synonyms point at their canonical symptom
+        self.terms = [(normalize(symptom), i) for i, symptom in enumerate(self.symptoms)]
+        for phrase, symptom in (synonyms or {}).items():
+            if symptom in symptom_ids:
+                self.terms.append((normalize(phrase), symptom_ids[symptom]))
+
+        self._deletes = {}
+        for term_id, (term, _) in enumerate(self.terms):
+            for variant in _deletes(term[:prefix_length], max_distance):
+                self._deletes.setdefault(variant, []).append(term_id)
+
+    def lookup_ids(self, text, max_distance=None):
+        """Symptom ids within edit distance of ``text``, nearest first."""
+        query = normalize(text)
+        if not query:
+            return []
+        limit = allowed_distance(query, self.max_distance if max_distance is None else max_distance)
+
+        candidates = set()
+        for variant in _deletes(query[:self.prefix_length], limit):
+            candidates.update(self._deletes.get(variant, ()))
+
+        best = {}
+        for term_id in candidates:
+            term, symptom_id = self.terms[term_id]
+            distance = edit_distance(query, term, limit)
+            if distance <= limit and distance < best.get(symptom_id, limit + 1):
+                best[symptom_id] = distance
+        return sorted(best, key=lambda i: (best[i], i))
+
+    def lookup(self, text, max_distance=None):
+        return [self.symptoms[i] for i in self.lookup_ids(text, max_distance)]
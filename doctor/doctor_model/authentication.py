@@ -0,0 +1,130 @@
+"""Stateless JWT authentication: no database access per request.
+
+``StatelessJWTAuthentication`` checks an access token's signature, expiry and
+type locally (simplejwt's ``AccessToken`` with the shared ``SIMPLE_JWT``
+signing key) and sets ``request.user`` to a ``TokenPrincipal`` built from its
+claims. Decoded tokens are kept in a small TTL cache keyed by a hash of the
+raw token, so a client sending the same token again skips the signature
+check; a cached entry never outlives the token's own ``exp``. Revoked tokens
+(logout) are rejected through ``revocation.revoked``, which is checked on
+every request, cached or not.
+
+An expired, invalid or revoked token is rejected with 401 only where the view
+needs a user. On views that allow anyone (``AllowAny``) the request goes on as
+anonymous, as if no token had been sent: the web app attaches its stored token
+to every request, and a stale token must not break public pages.
+
+The same module is copied into every service that authenticates requests.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework import authentication, exceptions
+from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .revocation import revoked
+
+CACHE_SIZE = 4096
+CACHE_TTL = 60  # seconds
+
+
+class TokenPrincipal:
+    """``request.user`` for a valid access token: its claims, no database row."""
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.user_id = claims.get("user_id")
+        self.role = claims.get("role")
+        self.full_name = claims.get("full_name")
+        # id of the user's record in patient_service / doctor_service, if any
+        self.patient_id = claims.get("patient_id")
+        self.doctor_id = claims.get("doctor_id")
+        # the user's own flags, as IsAdminUser saw them when it loaded the user;
+        # tokens issued before these claims existed fall back to the admin role
+        self.is_staff = bool(claims.get("is_staff", self.role == "admin"))
+        self.is_superuser = bool(claims.get("is_superuser", self.role == "admin"))
+
+    @property
+    def id(self):
+        return self.user_id
+
+    pk = id
+
+    def __str__(self):
+        return f"user {self.user_id} ({self.role})"
+
+
+class ClaimsCache:
+    """LRU of ``token hash -> (principal, expires_at)``, safe to share between threads."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, principal, exp):
+        with self._lock:
+            self._data[key] = (principal, min(time.time() + self.ttl, exp))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+claims_cache = ClaimsCache()
+
+
+class StatelessJWTAuthentication(authentication.BaseAuthentication):
+    keyword = b"bearer"
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword:
+            return None
+        if len(header) != 2:
+            return self._reject(request, "Authorization header must be 'Bearer <token>'")
+        raw = header[1]
+
+        key = hashlib.blake2b(raw, digest_size=16).digest()
+        principal = claims_cache.get(key)
+        if principal is None:
+            try:
+                token = AccessToken(raw.decode("ascii", "replace"))
+            except TokenError as exc:
+                return self._reject(request, str(exc))
+            principal = TokenPrincipal(dict(token.payload))
+            claims_cache.put(key, principal, token["exp"])
+        if revoked.is_revoked(principal.claims.get("jti", "")):
+            return self._reject(request, "Token has been revoked")
+        return principal, principal.claims
+
+    def _reject(self, request, detail):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if view is not None and all(isinstance(p, AllowAny) for p in view.get_permissions()):
+            return None
+        raise exceptions.AuthenticationFailed(detail)
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
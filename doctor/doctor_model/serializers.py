@@ -4,4 +4,9 @@ from .models import Doctor
 class DoctorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class DoctorBatchItemSerializer(DoctorSerializer):
+    """Như DoctorSerializer nhưng không kiểm tra unique(user_id) từng dòng;
+    DoctorBatchCreateAPIView kiểm tra cả batch bằng một query."""
+    user_id = serializers.IntegerField()
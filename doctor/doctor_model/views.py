@@ -2,7 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Doctor
-from .serializers import DoctorSerializer
+from .serializers import DoctorSerializer, DoctorBatchItemSerializer
 from django.db.models import Q
 
 # API để lấy danh sách tất cả bác sĩ hoặc tạo bác sĩ mới
@@ -118,4 +118,51 @@ class DoctorSearchAPIView(APIView):
 
         doctors = Doctor.objects.filter(filters)
         serializer = DoctorSerializer(doctors, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+# Tạo nhiều doctor một lần (auth_service outbox, tạo tài khoản hàng loạt)
+class DoctorBatchCreateAPIView(APIView):
+    """``{"records": [{"user_id", "full_name", ...}]}`` -> ``{"results": [...]}`` theo đúng thứ tự.
+
+    Mỗi kết quả là ``{"status": "created" | "existing", "record": ...}`` hoặc
+    ``{"status": "rejected", "errors": ...}``. Idempotent theo user_id: gửi lại
+    một batch chỉ trả về các record đã có.
+    """
+    MAX_BATCH = 500
+
+    def post(self, request):
+        records = request.data.get("records") if isinstance(request.data, dict) else None
+        if not isinstance(records, list) or not records:
+            return Response({"error": "'records' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.MAX_BATCH:
+            return Response({"error": f"At most {self.MAX_BATCH} records per batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(records)
+        user_ids = [None] * len(records)
+        valid = {}  # user_id -> validated data (cùng user_id hai lần là một record)
+        for i, item in enumerate(records):
+            serializer = DoctorBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                user_ids[i] = serializer.validated_data["user_id"]
+                valid.setdefault(user_ids[i], serializer.validated_data)
+            else:
+                results[i] = {"status": "rejected", "errors": serializer.errors}
+
+        existing = set(Doctor.objects.filter(user_id__in=valid).values_list("user_id", flat=True))
+        # ignore_conflicts: một batch khác có thể vừa tạo cùng user_id
+        Doctor.objects.bulk_create(
+            [Doctor(**data) for user_id, data in valid.items() if user_id not in existing],
+            ignore_conflicts=True,
+        )
+        saved = {doctor.user_id: doctor for doctor in Doctor.objects.filter(user_id__in=valid)}
+
+        for i, user_id in enumerate(user_ids):
+            if results[i] is not None:
+                continue
+            results[i] = {
+                "status": "existing" if user_id in existing else "created",
+                "record": DoctorSerializer(saved[user_id]).data,
+            }
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_record_model', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalrecord',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='medicalrecord',
+            name='source',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='medicalrecord',
+            name='status',
+            field=models.CharField(choices=[('final', 'Final'), ('draft', 'Draft')], default='final', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='doctor_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
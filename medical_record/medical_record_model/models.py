@@ -2,8 +2,16 @@ from django.db import models
 
 # Create your models here.
 class MedicalRecord(models.Model):
+    STATUS_FINAL = 'final'
+    STATUS_DRAFT = 'draft'
+    STATUS_CHOICES = [
+        (STATUS_FINAL, 'Final'),
+        (STATUS_DRAFT, 'Draft'),
+    ]
+
     patient_id = models.IntegerField()
-    doctor_id = models.IntegerField()
+    # Drafts created by the chatbot have no doctor until one reviews them.
+    doctor_id = models.IntegerField(null=True, blank=True)
     appointment_id = models.IntegerField(null=True, blank=True)
     subject = models.CharField(max_length=200)
     content = models.TextField()
@@ -11,4 +19,8 @@ class MedicalRecord(models.Model):
     symtoms = models.TextField(null=True, blank=True)
     treatment = models.TextField(null=True, blank=True)
     prescription = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_FINAL)
+    source = models.CharField(max_length=50, null=True, blank=True)
+    # Sender-chosen key, so a retried delivery does not create a second record.
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
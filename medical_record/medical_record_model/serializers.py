@@ -5,4 +5,14 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+class MedicalRecordDraftSerializer(serializers.ModelSerializer):
+    # Declared explicitly so that validation does not query for uniqueness per
+    # record; duplicates are resolved for the whole batch in the view.
+    external_id = serializers.CharField(max_length=100)
+
+    class Meta:
+        model = MedicalRecord
+        fields = ['external_id', 'patient_id', 'appointment_id', 'subject', 'content',
+                  'diagnosis', 'symtoms', 'treatment', 'prescription', 'source']
@@ -1,3 +1,249 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+import requests
 from django.test import TestCase
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication, revocation, views
+from .models import MedicalRecord
+
+KNOWN_PATIENTS = {1, 2}
+
+
+def patient_response(url, **kwargs):
+    resp = requests.Response()
+    patient_id = int(url.rstrip("/").rsplit("/", 1)[1])
+    resp.status_code = 200 if patient_id in KNOWN_PATIENTS else 404
+    return resp
+
+
+def draft(external_id, patient_id=1, **fields):
+    return {"external_id": external_id, "patient_id": patient_id, "subject": "Chatbot assessment",
+            "content": "Reported for 3 days.", "source": "chatbot", **fields}
+
+
+class DraftBatchTests(TestCase):
+    """``/api/medical-records/drafts/batch/`` is what the chatbot's RecordHandoff posts to."""
+
+    def post(self, records):
+        with mock.patch.object(views.requests, "get", side_effect=patient_response) as get:
+            resp = APIClient().post("/api/medical-records/drafts/batch/", {"records": records}, format="json")
+        self.lookups = get.call_count
+        return resp
+
+    def test_creates_drafts_checking_each_patient_once(self):
+        resp = self.post([draft("chatbot-1"), draft("chatbot-2"), draft("chatbot-3", patient_id=2)])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"created": 3, "duplicates": [], "rejected": []})
+        self.assertEqual(self.lookups, 2)
+        self.assertEqual(set(MedicalRecord.objects.values_list("status", flat=True)), {MedicalRecord.STATUS_DRAFT})
+
+    def test_redelivered_external_id_is_a_duplicate(self):
+        self.post([draft("chatbot-1")])
+        resp = self.post([draft("chatbot-1"), draft("chatbot-2")])
+        self.assertEqual(resp.json(), {"created": 1, "duplicates": ["chatbot-1"], "rejected": []})
+        self.assertEqual(MedicalRecord.objects.filter(external_id="chatbot-1").count(), 1)
+
+    def test_same_external_id_twice_in_one_batch_is_one_record(self):
+        resp = self.post([draft("chatbot-1"), draft("chatbot-1")])
+        self.assertEqual(resp.json()["created"], 1)
+        self.assertEqual(MedicalRecord.objects.count(), 1)
+
+    def test_invalid_items_are_rejected_without_failing_the_batch(self):
+        resp = self.post([draft("chatbot-1", patient_id=99), {"external_id": "chatbot-2"}, "x", draft("chatbot-3")])
+        body = resp.json()
+        self.assertEqual(body["created"], 1)
+        rejected = {item["external_id"]: item["error"] for item in body["rejected"]}
+        self.assertEqual(rejected["chatbot-1"], "Invalid patient")
+        self.assertIn("patient_id", rejected["chatbot-2"])
+        self.assertIn(None, rejected)
+        self.assertEqual(list(MedicalRecord.objects.values_list("external_id", flat=True)), ["chatbot-3"])
+
+    def test_unreachable_patient_service_fails_the_whole_batch(self):
+        with mock.patch.object(views.requests, "get", side_effect=requests.Timeout):
+            resp = APIClient().post("/api/medical-records/drafts/batch/", {"records": [draft("chatbot-1")]},
+                                    format="json")
+        self.assertEqual(resp.status_code, 503)
+        self.assertFalse(MedicalRecord.objects.exists())
+
+    def test_rejects_a_body_without_records(self):
+        client = APIClient()
+        self.assertEqual(client.post("/api/medical-records/drafts/batch/", {"records": []}, format="json").status_code, 400)
+        self.assertEqual(client.post("/api/medical-records/drafts/batch/", [1], format="json").status_code, 400)
+
+
+class WhoAmIView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return Response({"anonymous": True})
+        return Response({"user_id": user.user_id, "role": user.role, "patient_id": user.patient_id,
+                         "doctor_id": user.doctor_id, "is_staff": user.is_staff})
+
+
+class SignedInView(WhoAmIView):
+    permission_classes = [IsAuthenticated]
+
+
+class StaffView(WhoAmIView):
+    permission_classes = [IsAdminUser]
+
+
+def access_token(**claims):
+    token = AccessToken()
+    token["user_id"] = 7
+    for name, value in claims.items():
+        token[name] = value
+    return token
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    """This service's copy of ``authentication``, with nothing revoked and no sync thread."""
+
+    def setUp(self):
+        self.revoked = revocation.RevocationList(lambda cursor: ([], cursor), lambda jti: True)
+        self.revoked._ensure_worker = lambda: None
+        patcher = mock.patch.object(authentication, "revoked", self.revoked)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        authentication.claims_cache.clear()
+        self.addCleanup(authentication.claims_cache.clear)
+
+    def get(self, view, authorization):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=authorization)
+        return view.as_view()(request)
+
+    def test_claims_become_the_request_user(self):
+        token = access_token(role="patient", full_name="Pat", patient_id=3, is_staff=False, is_superuser=False)
+        resp = self.get(SignedInView, f"Bearer {token}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {"user_id": 7, "role": "patient", "patient_id": 3, "doctor_id": None,
+                                     "is_staff": False})
+
+    def test_staff_comes_from_the_is_staff_claim(self):
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='admin', is_staff=False)}").status_code, 403)
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='doctor', is_staff=True)}").status_code, 200)
+        # tokens issued before the claim existed fall back to the admin role
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='admin')}").status_code, 200)
+
+    def test_bad_token_is_anonymous_where_anyone_is_allowed(self):
+        expired = access_token(role="patient")
+        expired.set_exp(lifetime=timedelta(seconds=-1))
+        revoked = access_token(role="patient")
+        self.revoked.add(revoked["jti"])
+        for authorization in ("Bearer not-a-jwt", f"Bearer {expired}", f"Bearer {revoked}", "Bearer a b"):
+            with self.subTest(authorization=authorization[:20]):
+                self.assertEqual(self.get(WhoAmIView, authorization).data, {"anonymous": True})
+                self.assertEqual(self.get(SignedInView, authorization).status_code, 401)
+
+    def test_cached_token_is_still_checked_for_revocation(self):
+        token = access_token(role="patient")
+        self.assertEqual(self.get(SignedInView, f"Bearer {token}").status_code, 200)
+        self.revoked.add(token["jti"])
+        self.assertEqual(self.get(SignedInView, f"Bearer {token}").status_code, 401)
+
+
+def auth_response(status, body=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = b"{}" if body is None else json.dumps(body).encode()
+    return resp
+
+
+def revoked_page(jtis, cursor, more=False):
+    return auth_response(200, {"jtis": jtis, "cursor": cursor, "more": more})
+
+
+class RevocationListTests(TestCase):
+    """This service's copy of ``revocation``, which asks auth_service over HTTP."""
+
+    def setUp(self):
+        self.revoked = revocation.RevocationList(revocation._fetch_since, revocation._confirm)
+        self.revoked._ensure_worker = lambda: None
+
+    def auth_service(self, *responses, **kwargs):
+        return mock.patch.object(revocation.requests, "get", *responses, **kwargs)
+
+    def test_sync_pulls_every_page_after_the_cursor(self):
+        with self.auth_service(side_effect=[revoked_page(["a"], 1, more=True), revoked_page(["b"], 2)]) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {"after": 1})
+        self.assertEqual(self.revoked.stats()["cursor"], 2)
+        with self.auth_service(side_effect=[revoked_page(["c"], 3)]) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {"after": 2})
+        with self.auth_service(return_value=auth_response(200)):
+            self.assertTrue(all(self.revoked.is_revoked(jti) for jti in "abc"))
+
+    def test_token_revoked_at_auth_service_is_refused_after_sync(self):
+        token = access_token(role="patient")
+        authentication.claims_cache.clear()
+        self.addCleanup(authentication.claims_cache.clear)
+        with mock.patch.object(authentication, "revoked", self.revoked):
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(SignedInView.as_view()(request).status_code, 200)
+            with self.auth_service(return_value=revoked_page([token["jti"]], 1)):
+                self.revoked.sync()
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            with self.auth_service(return_value=auth_response(200)):
+                self.assertEqual(SignedInView.as_view()(request).status_code, 401)
+
+    def test_unrevoked_token_does_not_call_auth_service(self):
+        with self.auth_service() as get:
+            self.assertFalse(self.revoked.is_revoked("live"))
+        get.assert_not_called()
+        self.assertEqual(self.revoked.confirmations, 0)
+
+    def test_bloom_false_positive_is_confirmed_once(self):
+        self.revoked._filter.add("live")
+        with self.auth_service(return_value=auth_response(404)) as get:
+            self.assertFalse(self.revoked.is_revoked("live"))
+            self.assertFalse(self.revoked.is_revoked("live"))
+        self.assertEqual(get.call_count, 1)
+
+    def test_token_confirmed_live_and_revoked_later_is_refused_after_sync(self):
+        self.revoked._filter.add("x")
+        with self.auth_service(return_value=auth_response(404)):
+            self.assertFalse(self.revoked.is_revoked("x"))
+        with self.auth_service(return_value=revoked_page(["x"], 1)):
+            self.revoked.sync()
+        with self.auth_service() as get:
+            self.assertTrue(self.revoked.is_revoked("x"))
+        get.assert_not_called()
+
+    def test_unconfirmed_positive_counts_as_revoked(self):
+        self.revoked._filter.add("maybe")
+        for failure in (requests.ConnectionError(), auth_response(503)):
+            kwargs = {"side_effect": failure} if isinstance(failure, Exception) else {"return_value": failure}
+            with self.subTest(failure=failure), self.auth_service(**kwargs), self.assertLogs(revocation.logger):
+                self.assertTrue(self.revoked.is_revoked("maybe"))
+        self.assertNotIn("maybe", self.revoked._confirmed)
+
+    def test_failed_sync_keeps_what_was_already_synced(self):
+        with self.auth_service(return_value=revoked_page(["a"], 1)):
+            self.revoked.sync()
+        for failure in ({"side_effect": requests.ConnectionError()}, {"return_value": auth_response(500)}):
+            with self.auth_service(**failure), self.assertRaises(requests.RequestException):
+                self.revoked.sync()
+        self.assertEqual(self.revoked.stats()["cursor"], 1)
+        with self.auth_service(return_value=auth_response(200)):
+            self.assertTrue(self.revoked.is_revoked("a"))
 
-# Create your tests here.
+    def test_rebuild_drops_revocations_that_expired(self):
+        self.revoked.rebuild_interval = 0  # every sync is a full rebuild
+        with self.auth_service(return_value=revoked_page(["old"], 1)):
+            self.revoked.sync()
+        with self.auth_service(return_value=revoked_page(["new"], 2)) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {})
+        with self.auth_service(return_value=auth_response(404)) as get:
+            self.assertFalse(self.revoked.is_revoked("old"))
+        get.assert_not_called()
@@ -3,12 +3,14 @@ from .views import (
     MedicalRecordListCreateAPIView,
     MedicalRecordDetailAPIView,
     MedicalRecordByPatientAPIView,
-    MedicalRecordByDoctorAPIView
+    MedicalRecordByDoctorAPIView,
+    MedicalRecordDraftBatchAPIView
 )
 
 
 urlpatterns = [
     path('api/medical-records/', MedicalRecordListCreateAPIView.as_view(), name='medical-record-list-create'),
+    path('api/medical-records/drafts/batch/', MedicalRecordDraftBatchAPIView.as_view(), name='medical-record-draft-batch'),
     path('api/medical-records/<int:record_id>/', MedicalRecordDetailAPIView.as_view(), name='medical-record-detail'),
     path('api/medical-records/patient/<int:patient_id>/', MedicalRecordByPatientAPIView.as_view(), name='medical-record-by-patient'),
     path('api/medical-records/doctor/<int:doctor_id>/', MedicalRecordByDoctorAPIView.as_view(), name='medical-record-by-doctor'),
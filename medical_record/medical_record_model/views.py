@@ -2,7 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import MedicalRecord
-from .serializers import MedicalRecordSerializer
+from .serializers import MedicalRecordSerializer, MedicalRecordDraftSerializer
 import requests
 
 # API để lấy danh sách tất cả medical records hoặc tạo mới
@@ -199,4 +199,77 @@ class MedicalRecordByDoctorAPIView(APIView):
             )
 
         serializer = MedicalRecordSerializer(records, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+# API để nhận hàng loạt bản nháp (draft) từ chatbot
+class MedicalRecordDraftBatchAPIView(APIView):
+    """Create draft records in bulk: ``{"records": [{"external_id", "patient_id", "subject", "content", ...}]}``.
+
+    Each distinct patient is checked once with patient_service, valid drafts are
+    written with a single ``bulk_create``, and an ``external_id`` that already
+    exists is reported as a duplicate, so the sender can safely retry a batch.
+    If patient_service cannot be reached the batch gets 503 and nothing is written.
+    """
+    MAX_BATCH = 500
+    PATIENT_TIMEOUT = 5  # seconds per patient_service lookup
+
+    def post(self, request):
+        records = request.data.get("records") if isinstance(request.data, dict) else None
+        if not isinstance(records, list) or not records:
+            return Response({"error": "'records' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.MAX_BATCH:
+            return Response({"error": f"At most {self.MAX_BATCH} records per batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        rejected = []
+        drafts = {}
+        for item in records:
+            serializer = MedicalRecordDraftSerializer(data=item)
+            if serializer.is_valid():
+                # the same external_id twice in one batch is one record
+                drafts.setdefault(serializer.validated_data["external_id"], serializer.validated_data)
+            else:
+                external_id = item.get("external_id") if isinstance(item, dict) else None
+                rejected.append({"external_id": external_id, "error": serializer.errors})
+        drafts = list(drafts.values())
+
+        # Gọi nội bộ tới patient_service, mỗi bệnh nhân một lần
+        valid_patients = set()
+        for patient_id in {draft["patient_id"] for draft in drafts}:
+            try:
+                patient_response = requests.get(
+                    f"http://patient_service:8000/api/patient/{patient_id}/",
+                    headers={'Host': 'localhost'},
+                    timeout=self.PATIENT_TIMEOUT,
+                )
+            except requests.RequestException:
+                patient_response = None
+            # patient_service down or failing: 503 so the sender retries the whole batch
+            if patient_response is None or patient_response.status_code >= 500:
+                return Response({"error": "patient_service unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if patient_response.status_code == 200:
+                valid_patients.add(patient_id)
+
+        accepted = []
+        for draft in drafts:
+            if draft["patient_id"] in valid_patients:
+                accepted.append(draft)
+            else:
+                rejected.append({"external_id": draft["external_id"], "error": "Invalid patient"})
+
+        external_ids = [draft["external_id"] for draft in accepted]
+        existing = set(
+            MedicalRecord.objects.filter(external_id__in=external_ids).values_list("external_id", flat=True)
+        )
+        new = [
+            MedicalRecord(**draft, status=MedicalRecord.STATUS_DRAFT)
+            for draft in accepted if draft["external_id"] not in existing
+        ]
+        # ignore_conflicts covers a concurrent retry of the same batch
+        MedicalRecord.objects.bulk_create(new, ignore_conflicts=True)
+
+        return Response({
+            "created": len(new),
+            "duplicates": sorted(existing),
+            "rejected": rejected,
+        }, status=status.HTTP_200_OK)
@@ -4,4 +4,9 @@ from .models import Patient
 class PatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class PatientBatchItemSerializer(PatientSerializer):
+    """Như PatientSerializer nhưng không kiểm tra unique(user_id) từng dòng;
+    PatientBatchCreateAPIView kiểm tra cả batch bằng một query."""
+    user_id = serializers.IntegerField()
@@ -1,3 +1,240 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+import requests
 from django.test import TestCase
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication, revocation
+from .models import Patient
+
+
+class PatientBatchCreateTests(TestCase):
+    """``/api/patient/batch/`` is what auth_service's outbox delivers to."""
+
+    def post(self, records):
+        return APIClient().post("/api/patient/batch/", {"records": records}, format="json")
+
+    def test_creates_records_in_order(self):
+        resp = self.post([
+            {"user_id": 1, "full_name": "A", "idempotency_key": "provision_patient-1"},
+            {"user_id": 2, "full_name": "B", "idempotency_key": "provision_patient-2"},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "created"])
+        self.assertEqual([r["record"]["user_id"] for r in results], [1, 2])
+        self.assertEqual(Patient.objects.count(), 2)
+
+    def test_redelivered_batch_returns_existing_records(self):
+        records = [{"user_id": 1, "full_name": "A"}, {"user_id": 2, "full_name": "B"}]
+        first = self.post(records).json()["results"]
+        again = self.post(records).json()["results"]
+        self.assertEqual([r["status"] for r in again], ["existing", "existing"])
+        self.assertEqual([r["record"]["id"] for r in again], [r["record"]["id"] for r in first])
+        self.assertEqual(Patient.objects.count(), 2)
+
+    def test_same_user_twice_in_one_batch_is_one_record(self):
+        results = self.post([{"user_id": 5, "full_name": "A"}, {"user_id": 5, "full_name": "A"}]).json()["results"]
+        self.assertEqual(results[0]["record"]["id"], results[1]["record"]["id"])
+        self.assertEqual(Patient.objects.filter(user_id=5).count(), 1)
+
+    def test_invalid_record_is_rejected_without_failing_the_batch(self):
+        results = self.post([{"user_id": "x"}, {"user_id": 3, "full_name": "C"}]).json()["results"]
+        self.assertEqual(results[0]["status"], "rejected")
+        self.assertIn("user_id", results[0]["errors"])
+        self.assertEqual(results[1]["status"], "created")
+
+    def test_result_uses_the_validated_user_id(self):
+        # "7.0" passes the IntegerField but is not something int() accepts
+        results = self.post([{"user_id": "7.0", "full_name": "E"}]).json()["results"]
+        self.assertEqual(results[0]["status"], "created")
+        self.assertEqual(results[0]["record"]["user_id"], 7)
+        self.assertEqual(Patient.objects.filter(user_id=7).count(), 1)
+
+    def test_rejects_a_body_without_records(self):
+        self.assertEqual(APIClient().post("/api/patient/batch/", {"records": []}, format="json").status_code, 400)
+        self.assertEqual(APIClient().post("/api/patient/batch/", [1], format="json").status_code, 400)
+
+    def test_single_create_is_idempotent_on_user_id(self):
+        client = APIClient()
+        first = client.post("/api/patient/", {"user_id": 9, "full_name": "D"}, format="json")
+        again = client.post("/api/patient/", {"user_id": 9, "full_name": "D"}, format="json")
+        self.assertEqual((first.status_code, again.status_code), (201, 200))
+        self.assertEqual(first.json()["id"], again.json()["id"])
+
+
+class WhoAmIView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return Response({"anonymous": True})
+        return Response({"user_id": user.user_id, "role": user.role, "patient_id": user.patient_id,
+                         "doctor_id": user.doctor_id, "is_staff": user.is_staff})
+
+
+class SignedInView(WhoAmIView):
+    permission_classes = [IsAuthenticated]
+
+
+class StaffView(WhoAmIView):
+    permission_classes = [IsAdminUser]
+
+
+def access_token(**claims):
+    token = AccessToken()
+    token["user_id"] = 7
+    for name, value in claims.items():
+        token[name] = value
+    return token
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    """This service's copy of ``authentication``, with nothing revoked and no sync thread."""
+
+    def setUp(self):
+        self.revoked = revocation.RevocationList(lambda cursor: ([], cursor), lambda jti: True)
+        self.revoked._ensure_worker = lambda: None
+        patcher = mock.patch.object(authentication, "revoked", self.revoked)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        authentication.claims_cache.clear()
+        self.addCleanup(authentication.claims_cache.clear)
+
+    def get(self, view, authorization):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=authorization)
+        return view.as_view()(request)
+
+    def test_claims_become_the_request_user(self):
+        token = access_token(role="patient", full_name="Pat", patient_id=3, is_staff=False, is_superuser=False)
+        resp = self.get(SignedInView, f"Bearer {token}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {"user_id": 7, "role": "patient", "patient_id": 3, "doctor_id": None,
+                                     "is_staff": False})
+
+    def test_staff_comes_from_the_is_staff_claim(self):
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='admin', is_staff=False)}").status_code, 403)
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='doctor', is_staff=True)}").status_code, 200)
+        # tokens issued before the claim existed fall back to the admin role
+        self.assertEqual(self.get(StaffView, f"Bearer {access_token(role='admin')}").status_code, 200)
+
+    def test_bad_token_is_anonymous_where_anyone_is_allowed(self):
+        expired = access_token(role="patient")
+        expired.set_exp(lifetime=timedelta(seconds=-1))
+        revoked = access_token(role="patient")
+        self.revoked.add(revoked["jti"])
+        for authorization in ("Bearer not-a-jwt", f"Bearer {expired}", f"Bearer {revoked}", "Bearer a b"):
+            with self.subTest(authorization=authorization[:20]):
+                self.assertEqual(self.get(WhoAmIView, authorization).data, {"anonymous": True})
+                self.assertEqual(self.get(SignedInView, authorization).status_code, 401)
+
+    def test_cached_token_is_still_checked_for_revocation(self):
+        token = access_token(role="patient")
+        self.assertEqual(self.get(SignedInView, f"Bearer {token}").status_code, 200)
+        self.revoked.add(token["jti"])
+        self.assertEqual(self.get(SignedInView, f"Bearer {token}").status_code, 401)
+
+
+def auth_response(status, body=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = b"{}" if body is None else json.dumps(body).encode()
+    return resp
+
+
+def revoked_page(jtis, cursor, more=False):
+    return auth_response(200, {"jtis": jtis, "cursor": cursor, "more": more})
+
+
+class RevocationListTests(TestCase):
+    """This service's copy of ``revocation``, which asks auth_service over HTTP."""
+
+    def setUp(self):
+        self.revoked = revocation.RevocationList(revocation._fetch_since, revocation._confirm)
+        self.revoked._ensure_worker = lambda: None
+
+    def auth_service(self, *responses, **kwargs):
+        return mock.patch.object(revocation.requests, "get", *responses, **kwargs)
+
+    def test_sync_pulls_every_page_after_the_cursor(self):
+        with self.auth_service(side_effect=[revoked_page(["a"], 1, more=True), revoked_page(["b"], 2)]) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {"after": 1})
+        self.assertEqual(self.revoked.stats()["cursor"], 2)
+        with self.auth_service(side_effect=[revoked_page(["c"], 3)]) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {"after": 2})
+        with self.auth_service(return_value=auth_response(200)):
+            self.assertTrue(all(self.revoked.is_revoked(jti) for jti in "abc"))
+
+    def test_token_revoked_at_auth_service_is_refused_after_sync(self):
+        token = access_token(role="patient")
+        authentication.claims_cache.clear()
+        self.addCleanup(authentication.claims_cache.clear)
+        with mock.patch.object(authentication, "revoked", self.revoked):
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(SignedInView.as_view()(request).status_code, 200)
+            with self.auth_service(return_value=revoked_page([token["jti"]], 1)):
+                self.revoked.sync()
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            with self.auth_service(return_value=auth_response(200)):
+                self.assertEqual(SignedInView.as_view()(request).status_code, 401)
+
+    def test_unrevoked_token_does_not_call_auth_service(self):
+        with self.auth_service() as get:
+            self.assertFalse(self.revoked.is_revoked("live"))
+        get.assert_not_called()
+        self.assertEqual(self.revoked.confirmations, 0)
+
+    def test_bloom_false_positive_is_confirmed_once(self):
+        self.revoked._filter.add("live")
+        with self.auth_service(return_value=auth_response(404)) as get:
+            self.assertFalse(self.revoked.is_revoked("live"))
+            self.assertFalse(self.revoked.is_revoked("live"))
+        self.assertEqual(get.call_count, 1)
+
+    def test_token_confirmed_live_and_revoked_later_is_refused_after_sync(self):
+        self.revoked._filter.add("x")
+        with self.auth_service(return_value=auth_response(404)):
+            self.assertFalse(self.revoked.is_revoked("x"))
+        with self.auth_service(return_value=revoked_page(["x"], 1)):
+            self.revoked.sync()
+        with self.auth_service() as get:
+            self.assertTrue(self.revoked.is_revoked("x"))
+        get.assert_not_called()
+
+    def test_unconfirmed_positive_counts_as_revoked(self):
+        self.revoked._filter.add("maybe")
+        for failure in (requests.ConnectionError(), auth_response(503)):
+            kwargs = {"side_effect": failure} if isinstance(failure, Exception) else {"return_value": failure}
+            with self.subTest(failure=failure), self.auth_service(**kwargs), self.assertLogs(revocation.logger):
+                self.assertTrue(self.revoked.is_revoked("maybe"))
+        self.assertNotIn("maybe", self.revoked._confirmed)
+
+    def test_failed_sync_keeps_what_was_already_synced(self):
+        with self.auth_service(return_value=revoked_page(["a"], 1)):
+            self.revoked.sync()
+        for failure in ({"side_effect": requests.ConnectionError()}, {"return_value": auth_response(500)}):
+            with self.auth_service(**failure), self.assertRaises(requests.RequestException):
+                self.revoked.sync()
+        self.assertEqual(self.revoked.stats()["cursor"], 1)
+        with self.auth_service(return_value=auth_response(200)):
+            self.assertTrue(self.revoked.is_revoked("a"))
 
-# Create your tests here.
+    def test_rebuild_drops_revocations_that_expired(self):
+        self.revoked.rebuild_interval = 0  # every sync is a full rebuild
+        with self.auth_service(return_value=revoked_page(["old"], 1)):
+            self.revoked.sync()
+        with self.auth_service(return_value=revoked_page(["new"], 2)) as get:
+            self.revoked.sync()
+        self.assertEqual(get.call_args.kwargs["params"], {})
+        with self.auth_service(return_value=auth_response(404)) as get:
+            self.assertFalse(self.revoked.is_revoked("old"))
+        get.assert_not_called()
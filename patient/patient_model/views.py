@@ -2,7 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Patient
-from .serializers import PatientSerializer
+from .serializers import PatientSerializer, PatientBatchItemSerializer
 from django.db.models import Q
 
 # API để lấy danh sách tất cả bệnh nhân hoặc tạo bệnh nhân mới
@@ -13,12 +13,28 @@ class PatientListCreateAPIView(APIView):
         return Response(serializer.data)
 
     def post(self, request):
+        # Idempotent theo user_id: auth_service gửi lại cùng yêu cầu khi retry (outbox),
+        # nên nếu patient của user đã tồn tại thì trả về record đó thay vì lỗi.
+        existing = self.existing_for_user(request.data.get("user_id"))
+        if existing:
+            return Response(PatientSerializer(existing).data, status=status.HTTP_200_OK)
         serializer = PatientSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # Hai lần gửi đồng thời: lần sau thua unique(user_id) nhưng vẫn là thành công
+        existing = self.existing_for_user(request.data.get("user_id"))
+        if existing:
+            return Response(PatientSerializer(existing).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def existing_for_user(user_id):
+        try:
+            return Patient.objects.filter(user_id=int(user_id)).first()
+        except (TypeError, ValueError):
+            return None
+
 # API để lấy chi tiết, cập nhật hoặc xóa một bệnh nhân
 class PatientDetailAPIView(APIView):
     def get_object(self, patient_id):
@@ -92,4 +108,51 @@ class PatientSearchAPIView(APIView):
 
         patients = Patient.objects.filter(filters)
         serializer = PatientSerializer(patients, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+# Tạo nhiều patient một lần (auth_service outbox, tạo tài khoản hàng loạt)
+class PatientBatchCreateAPIView(APIView):
+    """``{"records": [{"user_id", "full_name", ...}]}`` -> ``{"results": [...]}`` theo đúng thứ tự.
+
+    Mỗi kết quả là ``{"status": "created" | "existing", "record": ...}`` hoặc
+    ``{"status": "rejected", "errors": ...}``. Idempotent theo user_id: gửi lại
+    một batch chỉ trả về các record đã có.
+    """
+    MAX_BATCH = 500
+
+    def post(self, request):
+        records = request.data.get("records") if isinstance(request.data, dict) else None
+        if not isinstance(records, list) or not records:
+            return Response({"error": "'records' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.MAX_BATCH:
+            return Response({"error": f"At most {self.MAX_BATCH} records per batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(records)
+        user_ids = [None] * len(records)
+        valid = {}  # user_id -> validated data (cùng user_id hai lần là một record)
+        for i, item in enumerate(records):
+            serializer = PatientBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                user_ids[i] = serializer.validated_data["user_id"]
+                valid.setdefault(user_ids[i], serializer.validated_data)
+            else:
+                results[i] = {"status": "rejected", "errors": serializer.errors}
+
+        existing = set(Patient.objects.filter(user_id__in=valid).values_list("user_id", flat=True))
+        # ignore_conflicts: một batch khác có thể vừa tạo cùng user_id
+        Patient.objects.bulk_create(
+            [Patient(**data) for user_id, data in valid.items() if user_id not in existing],
+            ignore_conflicts=True,
+        )
+        saved = {patient.user_id: patient for patient in Patient.objects.filter(user_id__in=valid)}
+
+        for i, user_id in enumerate(user_ids):
+            if results[i] is not None:
+                continue
+            results[i] = {
+                "status": "existing" if user_id in existing else "created",
+                "record": PatientSerializer(saved[user_id]).data,
+            }
+        return Response({"results": results}, status=status.HTTP_200_OK)
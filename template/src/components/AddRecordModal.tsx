@@ -34,7 +34,9 @@ const AddRecordModal: React.FC<Props> = ({ visible, onClose, patient, onCreated
             setDoctorId(null);
             (async () => {
                 try {
-                    if (user?.id) {
+                    if (user?.doctor_id) {
+                        setDoctorId(user.doctor_id);
+                    } else if (user?.id) {
                         const res = await axios.get(`${BASE_URL}/api/doctor/user/${user.id}/`);
                         const doc = Array.isArray(res.data) ? res.data[0] : res.data;
                         setDoctorId(doc?.id || null);
@@ -71,11 +71,15 @@ const BookAppointmentModal: React.FC<Props> = ({ visible, onClose, onCreated })
                 return;
             }
 
-            const patientRes = await axios.get(`${BASE_URL}/api/patient/user/${user.id}/`, {
-                headers: token ? { Authorization: `Bearer ${token}` } : undefined,
-            });
-            const patient = patientRes.data;
-            const patientId = patient?.id ?? patient?.patient_id;
+            // patient_id comes with the login response; look it up only if provisioning was still pending then
+            let patientId = user.patient_id;
+            if (!patientId) {
+                const patientRes = await axios.get(`${BASE_URL}/api/patient/user/${user.id}/`, {
+                    headers: token ? { Authorization: `Bearer ${token}` } : undefined,
+                });
+                const patient = patientRes.data;
+                patientId = patient?.id ?? patient?.patient_id;
+            }
 
             if (!patientId) {
                 message.error('No patient record found for this user');
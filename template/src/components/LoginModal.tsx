@@ -44,30 +44,19 @@ const LoginModal: React.FC<Props> = ({ visible, onClose }) => {
 
             if (refresh) localStorage.setItem('refresh', refresh);
 
-            let userObj: any = null;
+            let userObj: any = res.data?.user ?? null;
 
             if (access) {
-                // try to fetch user details using the token
-                const payload = parseJwt(access);
-                const userId = payload?.user_id ?? payload?.user ?? payload?.userId;
-
-                // prefer endpoint that returns current user
-                try {
-                    const userRes = await axios.get(`${BASE_URL}/api/auth/users/${userId}/`, {
-                        headers: { Authorization: `Bearer ${access}` },
-                    });
-                    userObj = userRes.data;
-                } catch (err) {
-                    message.error('Failed to fetch user details');
-                }
-
-                // if we still don't have a user object, create a minimal one
+                // login response already carries the profile (role, full_name, patient_id/doctor_id)
                 if (!userObj) {
+                    const payload = parseJwt(access);
                     userObj = {
-                        id: userId || 0,
+                        id: payload?.user_id ?? 0,
                         email: values.email || '',
-                        full_name: '',
-                        role: '',
+                        full_name: payload?.full_name ?? '',
+                        role: payload?.role ?? '',
+                        patient_id: payload?.patient_id ?? null,
+                        doctor_id: payload?.doctor_id ?? null,
                     };
                 }
 
@@ -42,27 +42,16 @@ const RegisterModal: React.FC<Props> = ({ visible, onClose }) => {
 
             if (refresh) localStorage.setItem('refresh', refresh);
 
-            let userObj: any = null;
+            // register response carries the profile; patient_id stays null until provisioning finishes
+            let userObj: any = res.data?.user ?? null;
             if (access) {
-                const payload = parseJwt(access);
-                const userId = payload?.user_id ?? payload?.user ?? payload?.userId;
-
-                // Try to fetch current user via auth endpoint
-                try {
-                    const userRes = await axios.get(`${BASE_URL}/api/auth//users/${userId}/`, {
-                        headers: { Authorization: `Bearer ${access}` },
-                    });
-                    userObj = userRes.data;
-                } catch (err) {
-                    message.error('Failed to fetch user details after registration');
-                }
-
                 if (!userObj) {
+                    const payload = parseJwt(access);
                     userObj = {
-                        id: userId || 0,
+                        id: payload?.user_id ?? 0,
                         email: values.email || '',
                         full_name: values.full_name || '',
-                        role: '',
+                        role: payload?.role ?? '',
                     };
                 }
 
@@ -7,6 +7,9 @@ interface User {
     role: string;
     full_name: string;
     id: number;
+    // id của record Patient/Doctor (theo role); null khi chưa provision xong
+    patient_id?: number | null;
+    doctor_id?: number | null;
 }
 
 interface AuthContextType {
@@ -28,6 +31,8 @@ export const AuthContext = createContext<AuthContextType>({
     logout: () => { },
 });
 
+const BASE_URL = import.meta.env.VITE_BASE_URL || 'http://localhost:8080';
+
 export const AuthProvider = ({ children }: { children: ReactNode }) => {
     const [user, setUser] = useState<User | null>(null);
     const [token, setToken] = useState<string | null>(null);
@@ -87,10 +92,19 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     };
 
     const logout = () => {
+        // Thu hồi token ở server (best effort); token hết hạn thì server trả 401, bỏ qua
+        const currentToken = token ?? localStorage.getItem("token");
+        const refresh = localStorage.getItem("refresh");
+        if (currentToken) {
+            axios.post(`${BASE_URL}/api/auth/logout/`, refresh ? { refresh } : {}, {
+                headers: { Authorization: `Bearer ${currentToken}` },
+            }).catch(() => { });
+        }
         setUser(null);
         setToken(null);
         localStorage.removeItem("user");
         localStorage.removeItem("token");
+        localStorage.removeItem("refresh");
         // remove axios default header
         delete axios.defaults.headers.common['Authorization'];
     };
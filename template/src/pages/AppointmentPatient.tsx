@@ -39,10 +39,13 @@ const AppointmentPatient = () => {
     const fetchAppointments = async () => {
         if (!user?.id) return;
         try {
-            // First fetch patient record associated with this user
-            const patientRes = await axios.get(`${BASE_URL}/api/patient/user/${user.id}/`);
-            const patient = patientRes.data;
-            const patientId = patient?.id ?? patient?.patient_id ?? null;
+            // patient_id comes with the login response; otherwise fetch the patient record for this user
+            let patientId = user.patient_id ?? null;
+            if (!patientId) {
+                const patientRes = await axios.get(`${BASE_URL}/api/patient/user/${user.id}/`);
+                const patient = patientRes.data;
+                patientId = patient?.id ?? patient?.patient_id ?? null;
+            }
 
             if (!patientId) {
                 message.error('No patient record found for this user');
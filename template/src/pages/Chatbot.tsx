@@ -4,6 +4,7 @@ import { Avatar, Button, Input, message } from 'antd';
 import { SendOutlined, MessageOutlined } from '@ant-design/icons';
 import NavbarDark from '../components/NavbarDark';
 import Footer from '../components/Footer';
+import { useAuth } from '../contexts/AuthContext';
 
 const USER_AVATAR = "https://www.svgrepo.com/show/384670/account-avatar-profile-user.svg";
 const BOT_AVATAR = "https://img.freepik.com/premium-vector/support-bot-ai-assistant-flat-icon-with-blue-support-bot-white-background_194782-1421.jpg?semt=ais_hybrid&w=740";
@@ -18,11 +19,15 @@ const Chatbot: React.FC = () => {
     const [input, setInput] = useState<string>('');
     const [isFinished, setIsFinished] = useState<boolean>(false);
     const chatEndRef = useRef<HTMLDivElement>(null);
+    // Signed conversation state, only returned when the chatbot runs in token mode
+    const tokenRef = useRef<string | undefined>(undefined);
     const CHATBOT_URL = import.meta.env.VITE_CHATBOT_URL || 'http://localhost:5000';
+    const { user, token } = useAuth();
 
+    // Restart once the saved login is loaded, so the assessment is linked to the patient
     useEffect(() => {
         startConversation();
-    }, []);
+    }, [user?.id]);
 
     useEffect(() => {
         scrollToBottom();
@@ -34,7 +39,17 @@ const Chatbot: React.FC = () => {
 
     const startConversation = async () => {
         try {
-            const res = await axios.post(`${CHATBOT_URL}/chatbot/start`, {}, { withCredentials: true });
+            // The chatbot links the chat (and its draft medical record) to the patient
+            // named in this token; it never trusts a patient id sent in the body.
+            const res = await axios.post(
+                `${CHATBOT_URL}/chatbot/start`,
+                {},
+                {
+                    withCredentials: true,
+                    headers: token && user?.role === 'patient' ? { Authorization: `Bearer ${token}` } : undefined,
+                },
+            );
+            tokenRef.current = res.data.token;
             setMessages([{ text: res.data.message, sender: 'bot' }]);
             setIsFinished(false);
         } catch (err) {
@@ -49,7 +64,8 @@ const Chatbot: React.FC = () => {
         const userMessage: Message = { text: input, sender: 'user' };
         setMessages((prev) => [...prev, userMessage]);
         try {
-            const res = await axios.post(`${CHATBOT_URL}/chatbot/respond`, { input }, { withCredentials: true });
+            const res = await axios.post(`${CHATBOT_URL}/chatbot/respond`, { input, token: tokenRef.current }, { withCredentials: true });
+            tokenRef.current = res.data.token;
             const botMessage: Message = { text: res.data.message, sender: 'bot' };
             setMessages((prev) => [...prev, botMessage]);
             if (res.data.finished) {
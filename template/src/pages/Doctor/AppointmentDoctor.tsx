@@ -38,10 +38,13 @@ const AppointmentDoctor = () => {
     const fetchAppointments = async () => {
         if (!user?.id) return;
         try {
-            // First fetch doctor record associated with this user
-            const doctorRes = await axios.get(`${BASE_URL}/api/doctor/user/${user.id}/`);
-            const doctor = doctorRes.data;
-            const doctorId = doctor?.id ?? doctor?.patient_id ?? null;
+            // doctor_id comes with the login response; otherwise fetch the doctor record for this user
+            let doctorId = user.doctor_id ?? null;
+            if (!doctorId) {
+                const doctorRes = await axios.get(`${BASE_URL}/api/doctor/user/${user.id}/`);
+                const doctor = doctorRes.data;
+                doctorId = doctor?.id ?? doctor?.patient_id ?? null;
+            }
 
             if (!doctorId) {
                 message.error('No doctor record found for this user');
@@ -1,7 +1,7 @@
 import { useEffect, useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { Table, Button, message, Card, Input } from 'antd';
+import { Table, Button, message, Card, Input, Tag } from 'antd';
 import Loading from '../../components/Loading';
 import { FaSearch } from 'react-icons/fa';
 import AddRecordModal from '../../components/AddRecordModal';
@@ -10,7 +10,7 @@ import { RiStickyNoteAddLine } from 'react-icons/ri';
 type MedicalRecord = {
     id: number;
     patient_id: number;
-    doctor_id: number;
+    doctor_id?: number | null;
     appointment_id?: number;
     subject: string;
     content?: string;
@@ -18,6 +18,9 @@ type MedicalRecord = {
     symtoms?: string;
     treatment?: string;
     prescription?: any;
+    // 'draft' records come from the chatbot and have not been reviewed by a doctor yet
+    status?: 'draft' | 'final';
+    source?: string | null;
     created_at?: string;
 };
 
@@ -111,7 +114,15 @@ const MedicalRecord = () => {
 
     const columns = [
         { title: 'Subject', dataIndex: 'subject', key: 'subject' },
-        { title: 'Doctor ID', dataIndex: 'doctor_id', key: 'doctor_id', width: 120 },
+        {
+            title: 'Status', dataIndex: 'status', key: 'status', width: 150,
+            render: (value: string, record: MedicalRecord) => value === 'draft'
+                ? <Tag color="orange">Draft{record.source ? ` (${record.source})` : ''}</Tag>
+                : <Tag color="green">Final</Tag>,
+            filters: [{ text: 'Draft', value: 'draft' }, { text: 'Final', value: 'final' }],
+            onFilter: (value: any, record: MedicalRecord) => (record.status || 'final') === value,
+        },
+        { title: 'Doctor ID', dataIndex: 'doctor_id', key: 'doctor_id', width: 120, render: (v?: number | null) => v ?? '-' },
         { title: 'Diagnosis', dataIndex: 'diagnosis', key: 'diagnosis' },
         { title: 'Created At', dataIndex: 'created_at', key: 'created_at', render: (v: string) => v ? new Date(v).toLocaleString() : '-', sorter: (a: MedicalRecord, b: MedicalRecord) => new Date(a.created_at || 0).getTime() - new Date(b.created_at || 0).getTime() },
         {